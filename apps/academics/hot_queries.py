@@ -0,0 +1,17 @@
+# /apps/academics/hot_queries.py
+
+from django.db.models import Count
+
+from apps.core.queryplans import register_hot_query
+from .models import Unit
+
+
+@register_hot_query('academics.grade_units')
+def grade_units():
+    # The unit map of academics:unit_list.
+    return Unit.objects.filter(grade_id=1).annotate(question_count=Count('questions')).order_by('unit_number')
+
+
+@register_hot_query('academics.published_units')
+def published_units():
+    return Unit.objects.filter(grade_id=1, is_published=True).order_by('unit_number')
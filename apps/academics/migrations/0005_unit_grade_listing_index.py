@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['grade', 'is_published', 'unit_number'], name='academics_unit_grade_listing'),
+        ),
+    ]
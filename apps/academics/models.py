@@ -44,6 +44,9 @@ class Unit(models.Model):
     is_published = models.BooleanField(
     default=False,
     help_text="Check this box to make the unit visible to students.")
+    # Bumped whenever the unit, its questions, answers or matching pairs change.
+    # Cached data derived from the unit's content is keyed on this value.
+    content_version = models.PositiveIntegerField(default=1, editable=False)
     
     def __str__(self):
         return f"{self.grade.name}: {self.title}"
@@ -52,3 +55,4 @@ class Unit(models.Model):
         verbose_name = _('Unit')
         verbose_name_plural = _('Units')
         ordering = ['grade', 'unit_number']
+        indexes = [models.Index(fields=['grade', 'is_published', 'unit_number'], name='academics_unit_grade_listing')]
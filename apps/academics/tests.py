@@ -1,3 +1,92 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from apps.core.staticfiles import PLAIN_STATIC_STORAGES
+from apps.quizzes.mistakes import MISTAKES_PER_PAGE, record_mistakes
+from apps.quizzes.models import LeaderboardEntry, Question, QuizResult, StudentAnswer
+from apps.users.models import User
+
+from .models import Grade, Unit
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False)
+class LeaderboardViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = Grade.objects.create(name='Grade 1')
+        # student00 has the best average score, student13 the worst.
+        cls.students = [User.objects.create(username=f'student{n:02}', grade=cls.grade) for n in range(14)]
+        for n, student in enumerate(cls.students):
+            LeaderboardEntry.objects.create(student=student, grade=cls.grade, average_score=100 - n, completed_count=1)
+
+    def test_students_outside_the_top_ten_see_their_position(self):
+        self.client.force_login(self.students[12])
+        response = self.client.get(reverse('academics:leaderboard_detail', args=[self.grade.id]))
+        position = response.context['my_positions']['top_scorers']
+        self.assertEqual(position['rank'], 13)
+        self.assertEqual([(rank, entry.student.username) for rank, entry in position['entries']], [
+            (11, 'student10'), (12, 'student11'), (13, 'student12'), (14, 'student13'),
+        ])
+        self.assertContains(response, 'Your position: #13')
+        self.assertIsNone(response.context['my_positions']['fastest_solvers'])
+
+        self.client.force_login(self.students[0])
+        response = self.client.get(reverse('academics:leaderboard_detail', args=[self.grade.id]))
+        self.assertEqual(response.context['my_positions']['top_scorers']['rank'], 1)
+        self.assertNotContains(response, 'Your position')
+
+    def test_other_grades_redirect_to_the_students_grade(self):
+        other = Grade.objects.create(name='Grade 2')
+        self.client.force_login(self.students[0])
+        response = self.client.get(reverse('academics:leaderboard_detail', args=[other.id]))
+        self.assertRedirects(response, reverse('academics:leaderboard_detail', args=[self.grade.id]))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False)
+class ReviewMistakesViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.student = User.objects.create(username='student', grade=grade)
+        # One more wrong answer than fits on a page of the mistake bank.
+        unit = Unit.objects.create(grade=grade, title='Unit 1', unit_number=1, is_published=True)
+        result = QuizResult.objects.create(student=cls.student, unit=unit)
+        for order in range(1, MISTAKES_PER_PAGE + 2):
+            question = Question.objects.create(unit=unit, question_text=f'Question {order}', question_type='SA', order=order)
+            StudentAnswer.objects.create(quiz_result=result, question=question, text_answer='wrong', is_correct=False)
+        QuizResult.objects.filter(pk=result.pk).update(score=0, completed_at=timezone.now())
+        record_mistakes([result.id])
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def questions(self, response):
+        return [mistake['question'].id for mistakes in response.context['mistakes_by_unit'].values() for mistake in mistakes]
+
+    def test_the_next_page_starts_after_the_cursor(self):
+        response = self.client.get(reverse('academics:review_mistakes'))
+        cursor = response.context['next_cursor']
+        first = self.questions(response)
+        self.assertEqual(len(first), MISTAKES_PER_PAGE)
+        self.assertContains(response, f'?after={cursor}')
+        self.assertNotContains(response, 'Back to Start')
+
+        response = self.client.get(reverse('academics:review_mistakes'), {'after': cursor})
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertContains(response, 'Back to Start')
+        last = self.questions(response)
+        self.assertEqual(len(last), 1)
+        self.assertEqual(
+            first + last, list(Question.objects.order_by('order').values_list('id', flat=True)),
+        )
+
+    def test_bad_cursors_show_the_first_page(self):
+        first = self.questions(self.client.get(reverse('academics:review_mistakes')))
+        for cursor in ('nonsense', '1-2', '-'.join(['0'] * 4 + ['x'])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('academics:review_mistakes'), {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.questions(response), first)
@@ -4,7 +4,11 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Avg, Count
 from .models import Unit, Grade
-from apps.quizzes.models import QuizResult, StudentBadge # استيراد نموذج شارات الطالب
+from apps.core.etags import conditional_page, page_etag
+from apps.quizzes.leaderboards import student_positions, top_entries
+from apps.quizzes.mistakes import mistakes_page
+from apps.quizzes.models import QuizResult, StudentBadge, StudentGradeStats # استيراد نموذج شارات الطالب
+from apps.quizzes.stamps import attempts_stamp, badges_stamp, leaderboard_stamp, units_stamp
 from apps.users.models import User
 from collections import defaultdict
 from django.db.models import Avg, Count, F, Q # Import Q object
@@ -16,7 +20,12 @@ from django.shortcuts import get_object_or_404, redirect
 
 # /apps/academics/views.py
 
+def unit_list_etag(request):
+    return page_etag(request, units_stamp(request.user.grade_id), attempts_stamp(request.user.pk))
+
+
 @login_required
+@conditional_page(unit_list_etag)
 def unit_list_view(request):
     """
     يعرض خريطة مغامرات للوحدات الدراسية الخاصة بالطالب.
@@ -57,7 +66,12 @@ def unit_list_view(request):
 
 
 
+def student_profile_etag(request):
+    return page_etag(request, attempts_stamp(request.user.pk), badges_stamp(request.user.pk))
+
+
 @login_required
+@conditional_page(student_profile_etag)
 def student_profile_view(request):
     """
     Displays the student's profile with their progress statistics for COMPLETED quizzes,
@@ -65,36 +79,28 @@ def student_profile_view(request):
     """
     student = request.user
 
-    # FIX #1: The main query now ONLY fetches results for COMPLETED quizzes.
-    results = QuizResult.objects.filter(
-        student=student, 
-        completed_at__isnull=False
-    ).select_related('unit__grade').order_by('-completed_at')
-
-    progress_by_grade = defaultdict(lambda: {'results': [], 'total_quizzes': 0, 'total_score': 0})
-
-    for result in results:
-        grade = result.unit.grade
-        
-        # FIX #2: A safety check to ensure the score is not None before adding.
-        if result.score is not None:
-            progress_by_grade[grade]['results'].append(result)
-            progress_by_grade[grade]['total_quizzes'] += 1
-            progress_by_grade[grade]['total_score'] += result.score
-
-    # Calculate the average score for each grade
-    for grade, data in progress_by_grade.items():
-        if data['total_quizzes'] > 0:
-            data['average_score'] = data['total_score'] / data['total_quizzes']
-        else:
-            data['average_score'] = 0
-    
+    # Totals come from the precomputed per-grade stats; only the five most recent
+    # results of each grade are loaded for the activity list.
+    progress_by_grade = {}
+    grade_stats = StudentGradeStats.objects.filter(student=student).select_related('grade').order_by('-last_completed_at')
+    for stats in grade_stats:
+        progress_by_grade[stats.grade] = {
+            'total_quizzes': stats.completed_count,
+            'average_score': stats.average_score,
+            'results': QuizResult.objects.filter(
+                student=student,
+                unit__grade=stats.grade,
+                completed_at__isnull=False,
+                score__isnull=False,
+            ).select_related('unit').order_by('-completed_at')[:5],
+        }
+
     # Fetch the student's badges
     student_badges = StudentBadge.objects.filter(student=student).select_related('badge').order_by('-awarded_at')
 
     context = {
         'student': student,
-        'progress_by_grade': dict(progress_by_grade),
+        'progress_by_grade': progress_by_grade,
         'student_badges': student_badges,
     }
     return render(request, 'academics/student_profile.html', context)
@@ -115,7 +121,14 @@ def leaderboard_selection_view(request):
         # If they don't have a grade, send them back to their main dashboard
         return redirect('academics:unit_list')
 
+def leaderboard_etag(request, grade_id):
+    if request.user.grade_id != int(grade_id):
+        return None  # Redirected to the student's own grade.
+    return page_etag(request, leaderboard_stamp(request.user.grade_id))
+
+
 @login_required
+@conditional_page(leaderboard_etag)
 def leaderboard_view(request, grade_id):
     student = request.user
     if not student.grade or student.grade.id != int(grade_id):
@@ -123,28 +136,20 @@ def leaderboard_view(request, grade_id):
 
     grade = get_object_or_404(Grade, id=grade_id)
 
-    # --- FIX: Use 'quizresult' (singular) instead of 'quiz_results' ---
-    students_in_grade = User.objects.filter(grade=grade, user_type='STUDENT').annotate(
-        total_quizzes=Count('quizresult', filter=Q(quizresult__completed_at__isnull=False)),
-        average_score=Avg('quizresult__score', filter=Q(quizresult__completed_at__isnull=False))
-    ).filter(total_quizzes__gt=0)
-
-    top_scorers = students_in_grade.order_by('-average_score', '-total_quizzes')[:10]
-    most_active = students_in_grade.order_by('-total_quizzes', '-average_score')[:10]
+    # The boards are read from the materialized LeaderboardEntry rows, in index order.
+    top_scorers = top_entries(grade, 'top_scorers')
+    most_active = top_entries(grade, 'most_active')
+    fastest_solvers = top_entries(grade, 'fastest_solvers')
 
-    fastest_solvers = User.objects.filter(
-        grade=grade,
-        user_type='STUDENT',
-        quizresult__score=100
-    ).annotate(
-        avg_time_seconds=Avg('quizresult__time_taken_seconds', filter=Q(quizresult__score=100))
-    ).order_by('avg_time_seconds')[:10]
+    # Where the student stands on each board, with the students just around them.
+    my_positions = student_positions(student)
 
     context = {
         'grade': grade,
         'top_scorers': top_scorers,
         'most_active': most_active,
         'fastest_solvers': fastest_solvers,
+        'my_positions': my_positions,
     }
     return render(request, 'academics/leaderboard_detail.html', context)
 
@@ -153,33 +158,14 @@ def leaderboard_view(request, grade_id):
 @login_required
 def review_mistakes_view(request):
     """
-    Displays the review mistakes page, where all questions
-    the student answered incorrectly are grouped by unit.
+    Displays the review mistakes page, where the questions the student answered
+    incorrectly are grouped by unit. The bank is paged with a keyset cursor (?after=...).
     """
-    student = request.user
-    
-    # Fetch all of the student's incorrect answers
-    incorrect_answers = StudentAnswer.objects.filter(
-        quiz_result__student=student,  # <-- CORRECTED THIS LINE
-        is_correct=False
-    ).select_related('question__unit').order_by('question__unit__unit_number', 'question__order')
-
-    # Group the answers by unit using an ordered dictionary
-    mistakes_by_unit = OrderedDict()
-    for answer in incorrect_answers:
-        unit = answer.question.unit
-        if unit not in mistakes_by_unit:
-            mistakes_by_unit[unit] = []
-        
-        # Add details for review
-        correct_answer_obj = answer.question.answers.filter(is_correct=True).first()
-        mistakes_by_unit[unit].append({
-            'question': answer.question,
-            'student_answer': answer.text_answer or answer.selected_answer,
-            'correct_answer': correct_answer_obj
-        })
+    page = mistakes_page(request.user, cursor=request.GET.get('after'))
 
     context = {
-        'mistakes_by_unit': mistakes_by_unit
+        'mistakes_by_unit': page['mistakes_by_unit'],
+        'next_cursor': page['next_cursor'],
+        'is_first_page': not request.GET.get('after'),
     }
     return render(request, 'academics/review_mistakes.html', context)
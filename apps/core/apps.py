@@ -1,7 +1,14 @@
 # /apps/core/apps.py
 
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.core' # <-- This line is very important!
\ No newline at end of file
+    name = 'apps.core' # <-- This line is very important!
+
+    def ready(self):
+        # Registers the background jobs defined in each app's jobs.py
+        # and the hot queries whose plans check_query_plans verifies.
+        autodiscover_modules('jobs')
+        autodiscover_modules('hot_queries')
@@ -0,0 +1,66 @@
+# /apps/core/etags.py
+
+import functools
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.middleware.csrf import get_token
+from django.template import engines
+from django.utils.crypto import salted_hmac
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+
+def release_stamp():
+    """
+    Changes when a deploy changes what pages render: the newest template file, and the
+    manifest of the collected static files (pages link the hashed names it lists).
+    Computed once per process, since a deploy restarts the processes, except with DEBUG,
+    where templates are edited while the development server runs.
+    """
+    if settings.DEBUG:
+        return _release_stamp.__wrapped__()
+    return _release_stamp()
+
+
+@functools.lru_cache(maxsize=None)
+def _release_stamp():
+    newest = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    newest = max(newest, os.stat(os.path.join(root, name)).st_mtime_ns)
+    return f'{newest}:{getattr(staticfiles_storage, "manifest_hash", "")}'
+
+
+def page_etag(request, *stamps):
+    """
+    The ETag of a page rendered for request.user from data identified by `stamps`
+    (version numbers, counts, timestamps: anything that changes when the data does).
+    Besides the stamps it covers what every page shows of the user (the menu depends on
+    their account type) and the CSRF secret of the forms in the page, which login rotates.
+    """
+    user = request.user
+    # Makes sure the CSRF secret exists on a first visit, as the page's forms will.
+    get_token(request)
+    value = repr((
+        release_stamp(),
+        user.pk, user.username, user.get_full_name(), user.user_type, user.grade_id,
+        request.META['CSRF_COOKIE'],
+        stamps,
+    ))
+    return salted_hmac('apps.core.etags.page_etag', value).hexdigest()
+
+
+def conditional_page(etag_func):
+    """
+    Answers a GET whose If-None-Match matches etag_func(request, *args, **kwargs) with
+    a 304 before the view runs, so neither its queries nor its template rendering happen.
+    etag_func returns None to let the view run without a validator (e.g. for a 404).
+    The response must be revalidated on every use and may only be cached by the browser.
+    """
+    def decorator(view):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag_func)(view))
+    return decorator
@@ -0,0 +1,95 @@
+# /apps/core/images.py
+
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Derivatives are stored under this media directory, mirroring the path of their source.
+DERIVATIVES_DIR = 'derivatives'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+
+def has_transparency(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _save(storage, name, image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    # Regenerating an image keeps its derivative names, so the old files are replaced.
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(field_file, boxes):
+    """
+    Resizes an uploaded image to fit each square bounding box in `boxes` (in pixels)
+    and stores every size as WebP and in a fallback format: PNG when the image has
+    transparency, JPEG otherwise. Boxes larger than the image are capped at its size.
+    Returns the metadata the {% picture %} tag renders:
+        {'source': name, 'width': w, 'height': h,
+         'variants': [{'width': w, 'height': h, 'webp': name, 'fallback': name}, ...]}
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    transparent = has_transparency(image)
+    image = image.convert('RGBA' if transparent else 'RGB')
+
+    root = f'{DERIVATIVES_DIR}/{os.path.splitext(field_file.name)[0]}'
+    variants = []
+    for box in sorted(boxes):
+        resized = image.copy()
+        resized.thumbnail((box, box), Image.LANCZOS)
+        if variants and variants[-1]['width'] == resized.width:
+            # The image is smaller than this box: the previous size already covers it.
+            continue
+        suffix = f'{resized.width}w'
+        if transparent:
+            fallback = _save(storage, f'{root}_{suffix}.png', resized, 'PNG', optimize=True)
+        else:
+            fallback = _save(storage, f'{root}_{suffix}.jpg', resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants.append({
+            'width': resized.width,
+            'height': resized.height,
+            'webp': _save(storage, f'{root}_{suffix}.webp', resized, 'WEBP', quality=WEBP_QUALITY, method=6),
+            'fallback': fallback,
+        })
+    return {'source': field_file.name, 'width': image.width, 'height': image.height, 'variants': variants}
+
+
+def refresh_variants(instance, field_name, boxes, force=False):
+    """
+    Brings `<field_name>_variants` of a model instance in line with its image: builds the
+    derivatives when the image changed (or with `force`), clears them when it was removed.
+    The field is written with an UPDATE, so no save signals run again.
+    Returns True when the variants changed.
+    """
+    field_file = getattr(instance, field_name)
+    variants_field = f'{field_name}_variants'
+    current = getattr(instance, variants_field) or {}
+    if not field_file:
+        variants = {}
+    elif force or current.get('source') != field_file.name:
+        try:
+            variants = build_variants(field_file, boxes)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+            # Templates fall back to the original image.
+            logger.warning('Could not build the derivatives of %s: %s', field_file.name, exc)
+            variants = {}
+    else:
+        return False
+    if variants == current:
+        return False
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    setattr(instance, variants_field, variants)
+    return True
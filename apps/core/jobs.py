@@ -0,0 +1,132 @@
+# /apps/core/jobs.py
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# name -> callable. Filled by the @register_job decorator in each app's jobs.py,
+# which CoreConfig.ready() imports.
+JOB_REGISTRY = {}
+
+# A RUNNING job whose worker has been silent for this long is considered abandoned.
+JOB_LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def register_job(name):
+    """
+    Registers a function so it can be enqueued by name.
+    Job functions receive the payload as keyword arguments and must be idempotent,
+    since a failed job is retried.
+    """
+    def decorator(func):
+        JOB_REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=3, **payload):
+    """
+    Adds a job to the queue. When called inside a transaction the job row is written
+    in that same transaction, so it only becomes visible if the caller's work commits.
+
+    With settings.JOB_QUEUE_EAGER (the default) the job runs right after commit instead,
+    so a site without a `run_jobs` worker still runs its jobs.
+    """
+    if name not in JOB_REGISTRY:
+        raise KeyError(f'Unknown job "{name}".')
+    if getattr(settings, 'JOB_QUEUE_EAGER', False):
+        transaction.on_commit(lambda: JOB_REGISTRY[name](**payload))
+        return None
+    return Job.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+
+
+def claim_next_job(now=None):
+    """
+    Atomically claims the oldest due pending job and returns it, or None.
+    The claim is a conditional UPDATE, so two workers can never run the same job.
+    """
+    now = now or timezone.now()
+    candidate_ids = list(
+        Job.objects.filter(status=Job.Status.PENDING, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidate_ids:
+        claimed = Job.objects.filter(pk=job_id, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Executes a claimed job and records the outcome. Failed jobs are rescheduled
+    with exponential backoff until they run out of attempts.
+    """
+    now = timezone.now()
+    func = JOB_REGISTRY.get(job.name)
+    try:
+        if func is None:
+            raise KeyError(f'Unknown job "{job.name}".')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed on attempt %s.', job.id, job.name, job.attempts)
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status=Job.Status.FAILED, last_error=error, finished_at=now, locked_at=None)
+        else:
+            retry_at = now + timedelta(seconds=10 * 2 ** job.attempts)
+            Job.objects.filter(pk=job.pk).update(status=Job.Status.PENDING, last_error=error, run_after=retry_at, locked_at=None)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.Status.DONE, finished_at=now, locked_at=None)
+    return True
+
+
+def release_abandoned_jobs(now=None):
+    """
+    Puts jobs whose worker died mid-run back in the queue.
+    """
+    now = now or timezone.now()
+    return Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=now - JOB_LOCK_TIMEOUT).update(
+        status=Job.Status.PENDING,
+        locked_at=None,
+    )
+
+
+def purge_finished_jobs(older_than=timedelta(days=7)):
+    """
+    Deletes successfully finished jobs so the table stays small.
+    Failed jobs are kept for inspection in the admin.
+    """
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status=Job.Status.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def run_pending_jobs(limit=None):
+    """
+    Runs due jobs until the queue is empty (or `limit` jobs have run).
+    Returns the number of jobs executed. Useful in tests and one-off scripts.
+    """
+    executed = 0
+    while limit is None or executed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        executed += 1
+    return executed
@@ -0,0 +1,308 @@
+# /apps/core/management/commands/benchmark_views.py
+
+import json
+import math
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.academics.models import Grade, Unit
+from apps.core.scratch import copy_database, scratch_database
+from apps.core.staticfiles import in_process_settings
+from apps.quizzes.grading import CHOICE_TYPES, MATCHING_TYPES, build_answer_key, get_answer_key, grade_submission
+from apps.quizzes.models import Question, QuizResult, StudentAnswer, StudentStats
+from apps.quizzes.submissions import submission_writer
+from apps.users.models import User
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    return sorted_values[max(1, math.ceil(pct / 100 * len(sorted_values))) - 1]
+
+
+class Command(BaseCommand):
+    help = ('Times every student and dashboard view and the grading path against a scratch copy of the '
+            'current database, and writes the results to a JSON report that can be compared between releases.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeats', type=int, default=10, help='Timed runs per case (after one warm-up run).')
+        parser.add_argument('--output', type=str, default='benchmark_report.json', help='Where to write the JSON report.')
+        parser.add_argument('--compare', type=str, help='A previous report to compare against.')
+        parser.add_argument('--threshold', type=float, default=20.0, help='Slowdown (in percent) reported as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a regression is found.')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every run.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark runs against a copy of the SQLite database; the default database is not SQLite.')
+        self.repeats = max(1, options['repeats'])
+        self.cold = options['cold']
+
+        # The benchmark's accounts, attempts and jobs are written to a copy of the database,
+        # which is deleted afterwards.
+        scratch_dir = tempfile.mkdtemp(prefix='benchmark_views_')
+        try:
+            with scratch_database(copy_database(scratch_dir, 'views')):
+                try:
+                    report = self.run()
+                finally:
+                    # The submission queue's writer thread holds a connection to the copy.
+                    submission_writer.stop()
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.print_report(report)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}.'))
+
+        if options['compare']:
+            regressions = self.compare(report, options['compare'], options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} case(s) regressed: {", ".join(regressions)}.')
+
+    def run(self):
+        fixtures = self.pick_fixtures()
+        # Counted before the benchmark adds its own accounts and attempts.
+        dataset = {
+            'grades': Grade.objects.count(),
+            'units': Unit.objects.count(),
+            'questions': Question.objects.count(),
+            'students': User.objects.filter(user_type=User.UserType.STUDENT).count(),
+            'quiz_results': QuizResult.objects.count(),
+            'student_answers': StudentAnswer.objects.count(),
+        }
+
+        # The benchmark's own accounts: an admin, and throwaway students for the write paths.
+        self.tag = uuid.uuid4().hex[:8]
+        self.admin = User.objects.create(username=f'__benchmark__{self.tag}_admin', user_type=User.UserType.ADMIN, is_staff=True)
+        self.temp_count = 0
+        cases = {}
+        with in_process_settings():
+            cases.update(self.student_views(fixtures))
+            cases.update(self.dashboard_views(fixtures))
+            cases.update(self.grading_path(fixtures))
+
+        return {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+            },
+            'dataset': dataset,
+            'repeats': self.repeats,
+            'cold_cache': self.cold,
+            'cases': cases,
+        }
+
+    # --- Fixtures ---
+
+    def pick_fixtures(self):
+        """
+        The busiest student (most completed attempts) and their data: the views are
+        measured on the largest per-student pages the dataset has.
+        """
+        stats = StudentStats.objects.filter(student__user_type=User.UserType.STUDENT, student__grade__isnull=False).order_by('-completed_count').first()
+        if stats is None:
+            raise CommandError('No student has completed a quiz; run generate_data first.')
+        student = stats.student
+        result = QuizResult.objects.filter(student=student, completed_at__isnull=False).select_related('unit').order_by('-score', 'id').first()
+        open_unit = (
+            Unit.objects.filter(grade=student.grade, is_published=True, questions__isnull=False)
+            .exclude(quizresult__student=student).distinct().first()
+        ) or result.unit
+        return {'student': student, 'result': result, 'unit': result.unit, 'open_unit': open_unit}
+
+    def temp_student(self, grade):
+        self.temp_count += 1
+        return User.objects.create(
+            username=f'__benchmark__{self.tag}_{self.temp_count}',
+            grade=grade, user_type=User.UserType.STUDENT, password=make_password(None),
+        )
+
+    # --- Measurement ---
+
+    def measure(self, run, before=None):
+        """
+        Runs `run` once to warm up and then `repeats` times, timing each run and counting
+        its queries. `before` prepares each run outside the timing.
+        """
+        timings, queries, status = [], 0, None
+        for repeat in range(self.repeats + 1):
+            context = before() if before else None
+            if self.cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                status = run(context)
+                elapsed = (time.perf_counter() - started) * 1000
+            if repeat:
+                timings.append(elapsed)
+                queries = len(ctx)
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'min_ms': round(timings[0], 3),
+            'max_ms': round(timings[-1], 3),
+            'queries': queries,
+            'status': status,
+        }
+
+    def get(self, client, path):
+        def run(context):
+            return client.get(path).status_code
+        return self.measure(run)
+
+    def student_views(self, fixtures):
+        client = Client()
+        client.force_login(fixtures['student'])
+        result, unit = fixtures['result'], fixtures['unit']
+        paths = {
+            'student.home': reverse('core:home'),
+            'student.unit_list': reverse('academics:unit_list'),
+            'student.profile': reverse('academics:student_profile'),
+            'student.leaderboard_selection': reverse('academics:leaderboard_selection'),
+            'student.leaderboard_detail': reverse('academics:leaderboard_detail', args=[fixtures['student'].grade_id]),
+            'student.review_mistakes': reverse('academics:review_mistakes'),
+            'student.quiz_review': reverse('quizzes:take_quiz', args=[unit.id]),
+            'student.quiz_result': reverse('quizzes:quiz_result', args=[result.id]),
+        }
+        if result.score is not None and result.score >= 80:
+            paths['student.certificate'] = reverse('quizzes:certificate', args=[result.id])
+        cases = {}
+        for name, path in paths.items():
+            self.stdout.write(f'  {name}')
+            cases[name] = self.get(client, path)
+        return cases
+
+    def dashboard_views(self, fixtures):
+        client = Client()
+        client.force_login(self.admin)
+        paths = {
+            'dashboard.home': reverse('dashboard:home'),
+            'dashboard.grade_list': reverse('dashboard:grade_list'),
+            'dashboard.unit_list': reverse('dashboard:unit_list'),
+            'dashboard.question_list': reverse('dashboard:question_list'),
+            'dashboard.user_list': reverse('dashboard:user_list'),
+            'dashboard.badge_list': reverse('dashboard:badge_list'),
+            'dashboard.student_progress': reverse('dashboard:student_progress_detail', args=[fixtures['student'].id]),
+            'dashboard.quiz_attempt_detail': reverse('dashboard:quiz_attempt_detail', args=[fixtures['result'].id]),
+            'dashboard.unit_item_analysis': reverse('dashboard:unit_item_analysis', args=[fixtures['unit'].id]),
+            'dashboard.export_form': reverse('dashboard:export'),
+        }
+        cases = {}
+        for name, path in paths.items():
+            self.stdout.write(f'  {name}')
+            cases[name] = self.get(client, path)
+        return cases
+
+    def grading_path(self, fixtures):
+        unit = fixtures['open_unit']
+        answer_key = get_answer_key(unit)
+        submitted = self.correct_answers(unit)
+        cases = {}
+
+        self.stdout.write('  grading.build_answer_key')
+        cases['grading.build_answer_key'] = self.measure(lambda context: build_answer_key(unit) and None)
+        self.stdout.write('  grading.grade_submission')
+        cases['grading.grade_submission'] = self.measure(lambda context: grade_submission(answer_key, submitted) and None)
+
+        # A new attempt and its submission, each by a fresh student so every run does the full work.
+        take_path = reverse('quizzes:take_quiz', args=[unit.id])
+        submit_path = reverse('quizzes:submit_quiz', args=[unit.id])
+
+        def new_client():
+            client = Client()
+            client.force_login(self.temp_student(unit.grade))
+            return client
+
+        def started_client():
+            client = new_client()
+            client.get(take_path)
+            return client
+
+        self.stdout.write('  quiz.take_new_attempt')
+        cases['quiz.take_new_attempt'] = self.measure(lambda client: client.get(take_path).status_code, before=new_client)
+        self.stdout.write('  quiz.submit')
+        cases['quiz.submit'] = self.measure(
+            lambda client: client.post(
+                submit_path, json.dumps({'answers': submitted, 'time_taken_seconds': 60}), content_type='application/json'
+            ).status_code,
+            before=started_client,
+        )
+        return cases
+
+    def correct_answers(self, unit):
+        answer_key = get_answer_key(unit)
+        submitted = {}
+        for question in unit.questions.prefetch_related('answers', 'matching_pairs'):
+            if question.question_type in CHOICE_TYPES:
+                submitted[str(question.id)] = str(min(answer_key['correct_ids'].get(question.id) or [0]))
+            elif question.question_type in MATCHING_TYPES:
+                submitted[str(question.id)] = {str(pair.id): str(pair.id) for pair in question.matching_pairs.all()}
+            else:
+                submitted[str(question.id)] = answer_key['text_answers'].get(question.id, '')
+        return submitted
+
+    # --- Reporting ---
+
+    def print_report(self, report):
+        dataset = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in report['dataset'].items())
+        self.stdout.write(f'\nDataset: {dataset}')
+        self.stdout.write(f'{"case":<32} {"median ms":>10} {"p95 ms":>10} {"max ms":>10} {"queries":>8} {"status":>7}')
+        for name, case in report['cases'].items():
+            line = (
+                f'{name:<32} {case["median_ms"]:>10.2f} {case["p95_ms"]:>10.2f} {case["max_ms"]:>10.2f} '
+                f'{case["queries"]:>8} {case["status"] or "-":>7}'
+            )
+            failed = case['status'] is not None and case['status'] >= 400
+            self.stdout.write(self.style.ERROR(line) if failed else line)
+
+    def compare(self, report, baseline_path, threshold):
+        """
+        Prints the change of every case against a previous report and returns the
+        names of the cases that got slower than the threshold or run more queries.
+        """
+        try:
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read the baseline report: {exc}')
+
+        self.stdout.write(f'\nCompared with {baseline_path} ({baseline.get("created_at", "unknown date")}):')
+        regressions = []
+        for name, case in report['cases'].items():
+            previous = baseline.get('cases', {}).get(name)
+            if previous is None:
+                self.stdout.write(f'{name:<32} new')
+                continue
+            change = (case['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100 if previous['median_ms'] else 0
+            query_change = case['queries'] - previous['queries']
+            line = f'{name:<32} {change:>+8.1f}%  queries {previous["queries"]} -> {case["queries"]}'
+            if change > threshold or query_change > 0:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            elif change < -threshold or query_change < 0:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+        return regressions
@@ -0,0 +1,34 @@
+# /apps/core/management/commands/build_css.py
+
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SOURCE = settings.BASE_DIR / 'apps' / 'core' / 'assets' / 'app.css'
+OUTPUT = settings.BASE_DIR / 'static' / 'css' / 'app.css'
+
+
+class Command(BaseCommand):
+    help = ('Builds static/css/app.css from apps/core/assets/app.css with the Tailwind CLI: only the utilities '
+            'used in templates, forms and static/js, minified. Commit the result, then run collectstatic on the server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Rebuild whenever a scanned file changes.')
+
+    def handle(self, *args, **options):
+        cli = shutil.which(settings.TAILWIND_CLI)
+        if cli is None:
+            raise CommandError(
+                f'The Tailwind CLI "{settings.TAILWIND_CLI}" was not found. Install it with '
+                f'"pip install tailwindcss-bin" or point the TAILWIND_CLI setting at the standalone binary.'
+            )
+        command = [cli, '--input', str(SOURCE), '--output', str(OUTPUT), '--minify']
+        if options['watch']:
+            command.append('--watch')
+        try:
+            subprocess.run(command, cwd=settings.BASE_DIR, check=True)
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f'The Tailwind CLI failed with exit code {exc.returncode}.')
+        self.stdout.write(self.style.SUCCESS(f'Built {OUTPUT.relative_to(settings.BASE_DIR)} ({OUTPUT.stat().st_size / 1024:.1f} KB).'))
@@ -0,0 +1,38 @@
+# /apps/core/management/commands/check_query_plans.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.queryplans import HOT_QUERY_REGISTRY, check_hot_queries
+
+
+class Command(BaseCommand):
+    help = ('Runs EXPLAIN on every registered hot query (see each app\'s hot_queries.py) '
+            'and fails when the database would read a table in full.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only check these hot queries.')
+        parser.add_argument('--show-plans', action='store_true', help='Print the plan of every query, not only the failing ones.')
+
+    def handle(self, *args, **options):
+        unknown = [name for name in options['names'] if name not in HOT_QUERY_REGISTRY]
+        if unknown:
+            raise CommandError(f'Unknown hot queries: {", ".join(unknown)}. Known: {", ".join(sorted(HOT_QUERY_REGISTRY))}.')
+        try:
+            report = check_hot_queries(options['names'])
+        except NotImplementedError as exc:
+            raise CommandError(str(exc))
+
+        failing = []
+        for name, (plan, scanned) in report.items():
+            if scanned:
+                failing.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: full scan of {", ".join(scanned)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if scanned or options['show_plans']:
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+
+        if failing:
+            raise CommandError(f'{len(failing)} of {len(report)} hot queries scan a table in full: {", ".join(failing)}.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(report)} hot queries use indexes.'))
@@ -0,0 +1,244 @@
+# /apps/core/management/commands/generate_data.py
+
+import io
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.academics.models import Grade, Unit
+from apps.quizzes.difficulty import reconcile_difficulty_stats
+from apps.quizzes.grading import CHOICE_TYPES, MATCHING_TYPES
+from apps.quizzes.leaderboards import rebuild_leaderboards
+from apps.quizzes.mistakes import record_mistakes_table
+from apps.quizzes.models import Answer, MatchingPair, Question, QuizResult, StudentAnswer, StudentMistake
+from apps.quizzes.stats import rebuild_student_stats
+from apps.users.models import User
+
+IMAGE_COLOURS = ('#e74c3c', '#3498db', '#2ecc71', '#f1c40f')
+IMAGE_DIR = 'answer_images/generated'
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with a reproducible, realistically sized dataset: grades, units, questions '
+            'of every type, students and their completed attempts. Derived tables are rebuilt at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; the same seed and sizes give the same data.')
+        parser.add_argument('--grades', type=int, default=6)
+        parser.add_argument('--units', type=int, default=10, help='Units per grade.')
+        parser.add_argument('--questions', type=int, default=14, help='Questions per unit (question types are cycled).')
+        parser.add_argument('--students', type=int, default=2000, help='Students in total, spread over the grades.')
+        parser.add_argument('--completion', type=float, default=0.8, help='Share of their grade\'s units each student has completed.')
+        parser.add_argument('--days', type=int, default=180, help='Completed attempts are spread over this many past days.')
+        parser.add_argument('--password', type=str, default='student123', help='Password of every generated student.')
+        parser.add_argument('--prefix', type=str, default='Generated', help='Prefix of generated grade names and usernames.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data with the same prefix first.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = max(1, options['batch_size'])
+        self.prefix = options['prefix']
+        self.started = time.monotonic()
+
+        if options['clear']:
+            self.clear()
+
+        grades = self.create_content(options['grades'], options['units'], options['questions'])
+        students = self.create_students(grades, options['students'], options['password'])
+        self.create_attempts(students, options['completion'], options['days'])
+
+        self.log('Rebuilding stats, leaderboards, difficulty counters and mistake banks...')
+        rebuild_student_stats()
+        rebuild_leaderboards()
+        reconcile_difficulty_stats()
+        record_mistakes_table(StudentAnswer, StudentMistake)
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - self.started:.1f}s.'))
+
+    def log(self, message):
+        self.stdout.write(f'[{time.monotonic() - self.started:7.1f}s] {message}')
+
+    def clear(self):
+        self.log(f'Deleting generated data with the prefix "{self.prefix}"...')
+        User.objects.filter(username__startswith=f'{self.prefix.lower()}_').delete()
+        Grade.objects.filter(name__startswith=f'{self.prefix} ').delete()
+
+    def placeholder_images(self):
+        """
+        A few small coloured squares for the image question types, written to media storage once.
+        """
+        from PIL import Image
+
+        names = []
+        for colour in IMAGE_COLOURS:
+            name = f'{IMAGE_DIR}/{colour.lstrip("#")}.png'
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                Image.new('RGB', (64, 64), colour).save(buffer, format='PNG')
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def create_content(self, grade_count, units_per_grade, questions_per_unit):
+        images = self.placeholder_images()
+        types = list(Question.QuestionType.values)
+        grades = Grade.objects.bulk_create([
+            Grade(name=f'{self.prefix} Grade {n + 1}', description='Generated test data.') for n in range(grade_count)
+        ])
+        units = Unit.objects.bulk_create([
+            Unit(grade=grade, title=f'{grade.name} - Unit {n + 1}', unit_number=n + 1, duration_minutes=10, is_published=True)
+            for grade in grades for n in range(units_per_grade)
+        ])
+        questions = Question.objects.bulk_create(
+            [
+                Question(
+                    unit=unit,
+                    question_text=f'Question {n + 1} of {unit.title}' + (' is ___?' if types[n % len(types)] == 'FITB' else '?'),
+                    question_type=types[n % len(types)],
+                    order=n + 1,
+                )
+                for unit in units for n in range(questions_per_unit)
+            ],
+            batch_size=self.batch_size,
+        )
+
+        answers, pairs = [], []
+        for question in questions:
+            kind = question.question_type
+            if kind == 'TF':
+                answers += [Answer(question=question, answer_text='True', is_correct=True),
+                            Answer(question=question, answer_text='False')]
+            elif kind in CHOICE_TYPES:
+                for n in range(4):
+                    answers.append(Answer(
+                        question=question,
+                        answer_text=f'Option {n + 1}' if kind == 'MCQ' else None,
+                        answer_image=images[n] if kind == 'MCQI' else None,
+                        is_correct=n == 0,
+                    ))
+            elif kind in MATCHING_TYPES:
+                for n in range(4):
+                    pairs.append(MatchingPair(
+                        question=question,
+                        prompt_text=f'Prompt {n + 1}' if kind == 'MATCH' else None,
+                        prompt_image=images[n] if kind == 'MATI' else None,
+                        match_text=f'Match {n + 1}',
+                    ))
+            else:
+                answers.append(Answer(question=question, answer_text=str(question.id % 97), is_correct=True))
+        Answer.objects.bulk_create(answers, batch_size=self.batch_size)
+        MatchingPair.objects.bulk_create(pairs, batch_size=self.batch_size)
+
+        # Everything a simulated student needs to answer, per unit and in quiz order:
+        # (question id, type, difficulty, correct value, wrong value)
+        choices = {}
+        for answer in answers:
+            choices.setdefault(answer.question_id, []).append(answer)
+        pair_ids = {}
+        for pair in pairs:
+            pair_ids.setdefault(pair.question_id, []).append(pair.id)
+        self.unit_questions = {}
+        for question in questions:
+            kind = question.question_type
+            if kind in CHOICE_TYPES:
+                options = choices[question.id]
+                right = next(answer.id for answer in options if answer.is_correct)
+                wrong = [answer.id for answer in options if not answer.is_correct]
+            elif kind in MATCHING_TYPES:
+                ids = pair_ids[question.id]
+                right = {str(pair_id): str(pair_id) for pair_id in ids}
+                swapped = ids[1:] + ids[:1]
+                wrong = [{str(pair_id): str(other) for pair_id, other in zip(ids, swapped)}]
+            else:
+                right = choices[question.id][0].answer_text
+                wrong = [str(int(right) + 1), '']
+            self.unit_questions.setdefault(question.unit_id, []).append(
+                (question.id, kind, self.rng.uniform(-1.5, 1.5), right, wrong)
+            )
+        self.units_by_grade = {}
+        for unit in units:
+            self.units_by_grade.setdefault(unit.grade_id, []).append(unit)
+        self.log(f'Created {len(grades)} grades, {len(units)} units, {len(questions)} questions.')
+        return grades
+
+    def create_students(self, grades, count, password):
+        # Every generated student gets the same password, so it is hashed once.
+        password_hash = make_password(password)
+        students = []
+        for n in range(count):
+            students.append(User(
+                username=f'{self.prefix.lower()}_{n + 1:06d}',
+                first_name=f'Student {n + 1}',
+                grade=grades[n % len(grades)],
+                user_type=User.UserType.STUDENT,
+                password=password_hash,
+            ))
+        students = User.objects.bulk_create(students, batch_size=self.batch_size)
+        self.log(f'Created {len(students)} students (password "{password}").')
+        return students
+
+    def answer(self, kind, right, wrong, correct):
+        if kind in CHOICE_TYPES:
+            return {'selected_answer_id': right if correct else self.rng.choice(wrong)}
+        if kind in MATCHING_TYPES:
+            return {'matching_answer': right if correct else wrong[0]}
+        return {'text_answer': right if correct else self.rng.choice(wrong)}
+
+    def create_attempts(self, students, completion, days):
+        """
+        Simulates each student completing a share of their grade's units. The chance of
+        a correct answer follows the student's skill against the question's difficulty.
+        Attempts and answers are written in batches, so any volume fits in memory.
+        """
+        now = timezone.now()
+        pending, pending_answers, attempt_count, answer_count = [], 0, 0, 0
+
+        def flush():
+            nonlocal pending, pending_answers, attempt_count, answer_count
+            if not pending:
+                return
+            with transaction.atomic():
+                results = QuizResult.objects.bulk_create([result for result, _ in pending])
+                # start_time is auto_now_add, so the back-dated value is written afterwards.
+                for result, _ in pending:
+                    result.start_time = result.completed_at - timedelta(seconds=result.time_taken_seconds)
+                QuizResult.objects.bulk_update(results, ['start_time'], batch_size=1000)
+                rows = [StudentAnswer(quiz_result=result, **values) for result, answers in pending for values in answers]
+                StudentAnswer.objects.bulk_create(rows, batch_size=self.batch_size)
+            attempt_count += len(pending)
+            answer_count += len(rows)
+            pending, pending_answers = [], 0
+            self.log(f'  ... {attempt_count} attempts, {answer_count} answers')
+
+        for student in students:
+            skill = self.rng.gauss(0, 1)
+            for unit in self.units_by_grade[student.grade_id]:
+                if self.rng.random() >= completion:
+                    continue
+                answers, correct_count = [], 0
+                for question_id, kind, difficulty, right, wrong in self.unit_questions[unit.id]:
+                    correct = self.rng.random() < 1 / (1 + math.exp(difficulty - skill))
+                    correct_count += correct
+                    answers.append({'question_id': question_id, 'is_correct': correct, **self.answer(kind, right, wrong, correct)})
+                pending.append((
+                    QuizResult(
+                        student=student,
+                        unit=unit,
+                        score=correct_count / len(answers) * 100 if answers else 0,
+                        completed_at=now - timedelta(seconds=self.rng.randint(60, days * 86400)),
+                        time_taken_seconds=self.rng.randint(30, unit.duration_minutes * 60),
+                    ),
+                    answers,
+                ))
+                pending_answers += len(answers)
+                if pending_answers >= self.batch_size * 4:
+                    flush()
+        flush()
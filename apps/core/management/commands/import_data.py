@@ -1,8 +1,61 @@
 import json
+import time
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Max
 from apps.academics.models import Grade, Unit
-from apps.quizzes.models import Question, Answer, MatchingPair
+from apps.quizzes.grading import invalidate_unit_content
+from apps.quizzes.import_keys import question_import_key
+from apps.quizzes.models import Question, Answer, MatchingPair, StudentAnswer
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    """
+    Yields the elements of a top-level JSON array one at a time, reading the file in
+    chunks, so a large question bank never has to be held in memory as a whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('The questions file must contain a JSON array.')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # The element continues in the next chunk.
+            if end == len(buffer) and chunk:
+                break  # A value touching the end of the buffer may still be incomplete.
+            yield item
+            position = end
+        if not chunk:
+            raise ValueError('Unexpected end of the questions file.')
+
+
+def question_key(q_data):
+    """
+    The stable key of an imported question: its "key" field when the file provides one,
+    otherwise a hash of its unit, type and text.
+    """
+    if q_data.get('key'):
+        return str(q_data['key'])[:64]
+    return question_import_key(q_data['topic'], q_data['question_type'], q_data['question_text'])
+
 
 class Command(BaseCommand):
     help = 'Imports grades, units, and questions from JSON files into the database.'
@@ -11,89 +64,234 @@ class Command(BaseCommand):
         # We define arguments to accept file paths from the command line
         parser.add_argument('--structure-file', type=str, help='The path to the JSON file with grades and units.')
         parser.add_argument('--questions-file', type=str, help='The path to the JSON file with questions.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of questions written per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Run the whole import, report what would change, then roll everything back.')
 
-    @transaction.atomic # This ensures that all database operations are done in one transaction. If anything fails, everything is rolled back.
     def handle(self, *args, **options):
-        structure_file_path = options['structure_file']
-        questions_file_path = options['questions_file']
-
-        # Import Grades and Units first if the file is provided
-        if structure_file_path:
-            self.stdout.write(self.style.SUCCESS(f'Starting import from {structure_file_path}...'))
-            with open(structure_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-                # Import Grades
-                for grade_data in data.get('grades', []):
-                    grade, created = Grade.objects.update_or_create(
-                        name=grade_data['name'],
-                        defaults={'description': grade_data.get('description', '')}
-                    )
-                    if created:
-                        self.stdout.write(self.style.SUCCESS(f'Created Grade: "{grade.name}"'))
-                    else:
-                        self.stdout.write(self.style.WARNING(f'Updated Grade: "{grade.name}"'))
-                
-                # Import Units
-                for unit_data in data.get('units', []):
-                    try:
-                        # Find the grade object based on the name provided in the JSON
-                        grade = Grade.objects.get(name=unit_data['grade_name'])
-                        unit, created = Unit.objects.update_or_create(
-                            grade=grade,
-                            unit_number=unit_data['unit_number'],
-                            defaults={
-                                'title': unit_data['title'],
-                                'description': unit_data.get('description', ''),
-                                'duration_minutes': unit_data.get('duration_minutes', 10)
-                            }
-                        )
-                        if created:
-                            self.stdout.write(self.style.SUCCESS(f'  - Created Unit: "{unit.title}" for {grade.name}'))
-                        else:
-                             self.stdout.write(self.style.WARNING(f'  - Updated Unit: "{unit.title}" for {grade.name}'))
-                    except Grade.DoesNotExist:
-                        self.stdout.write(self.style.ERROR(f'Grade "{unit_data["grade_name"]}" not found. Skipping unit "{unit_data["title"]}".'))
-        
-        # Import Questions if the file is provided
-        if questions_file_path:
-            self.stdout.write(self.style.SUCCESS(f'\nStarting question import from {questions_file_path}...'))
-            with open(questions_file_path, 'r', encoding='utf-8') as f:
-                questions_data = json.load(f)
-
-                for q_data in questions_data:
-                    try:
-                        # Find the related unit. We are matching based on the "topic" field from the JSON.
-                        # This assumes the 'topic' field starts with the Unit title.
-                        unit_title = q_data['topic']
-                        unit = Unit.objects.get(title=unit_title)
-
-                        # Create the question object
-                        question = Question.objects.create(
-                            unit=unit,
-                            question_text=q_data['question_text'],
-                            question_type=q_data['question_type'],
-                            order=Question.objects.filter(unit=unit).count() + 1 # Auto-increment order
-                        )
-
-                        # Create related Answer objects
-                        for answer_data in q_data.get('answers', []):
-                            Answer.objects.create(
-                                question=question,
-                                answer_text=answer_data['answer_text'],
-                                is_correct=answer_data['is_correct']
-                            )
-                        
-                        # Create related MatchingPair objects
-                        for pair_data in q_data.get('matching_pairs', []):
-                            MatchingPair.objects.create(
-                                question=question,
-                                prompt_text=pair_data['prompt_text'],
-                                match_text=pair_data['match_text']
-                            )
-
-                        self.stdout.write(f'    - Imported question: "{question.question_text[:50]}..."')
-                    except Unit.DoesNotExist:
-                        self.stdout.write(self.style.ERROR(f'Unit with title "{q_data["topic"]}" not found. Skipping question.'))
-
-        self.stdout.write(self.style.SUCCESS('\nImport process finished.'))
\ No newline at end of file
+        self.batch_size = max(1, options['batch_size'])
+        # Everything runs in one transaction: if anything fails (or this is a dry run),
+        # everything is rolled back.
+        with transaction.atomic():
+            if options['structure_file']:
+                self.import_structure(options['structure_file'])
+            if options['questions_file']:
+                self.import_questions(options['questions_file'])
+            if options['dry_run']:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING('\nDry run: no changes were saved.'))
+
+        self.stdout.write(self.style.SUCCESS('\nImport process finished.'))
+
+    def import_structure(self, structure_file_path):
+        self.stdout.write(self.style.SUCCESS(f'Starting import from {structure_file_path}...'))
+        # The structure file only lists grades and units, so it is small enough to load whole.
+        with open(structure_file_path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+
+        grades = {}
+        for grade_data in data.get('grades', []):
+            grade, created = Grade.objects.update_or_create(
+                name=grade_data['name'],
+                defaults={'description': grade_data.get('description', '')}
+            )
+            grades[grade.name] = grade
+            if created:
+                self.stdout.write(self.style.SUCCESS(f'Created Grade: "{grade.name}"'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Updated Grade: "{grade.name}"'))
+
+        unknown = {unit_data['grade_name'] for unit_data in data.get('units', [])} - set(grades)
+        grades.update({grade.name: grade for grade in Grade.objects.filter(name__in=unknown)})
+
+        for unit_data in data.get('units', []):
+            grade = grades.get(unit_data['grade_name'])
+            if grade is None:
+                self.stdout.write(self.style.ERROR(f'Grade "{unit_data["grade_name"]}" not found. Skipping unit "{unit_data["title"]}".'))
+                continue
+            unit, created = Unit.objects.update_or_create(
+                grade=grade,
+                unit_number=unit_data['unit_number'],
+                defaults={
+                    'title': unit_data['title'],
+                    'description': unit_data.get('description', ''),
+                    'duration_minutes': unit_data.get('duration_minutes', 10)
+                }
+            )
+            if created:
+                self.stdout.write(self.style.SUCCESS(f'  - Created Unit: "{unit.title}" for {grade.name}'))
+            else:
+                self.stdout.write(self.style.WARNING(f'  - Updated Unit: "{unit.title}" for {grade.name}'))
+
+    def import_questions(self, questions_file_path):
+        self.stdout.write(self.style.SUCCESS(f'\nStarting question import from {questions_file_path}...'))
+
+        # Questions are matched to units by title ("topic" in the JSON), resolved from memory.
+        self.units_by_title = {}
+        self.ambiguous_titles = set()
+        for unit_id, title in Unit.objects.values_list('id', 'title'):
+            if title in self.units_by_title:
+                self.ambiguous_titles.add(title)
+            self.units_by_title[title] = unit_id
+        self.next_order = {
+            row['unit_id']: row['max_order'] or 0
+            for row in Question.objects.values('unit_id').annotate(max_order=Max('order')).order_by()
+        }
+        self.touched_units = set()
+        self.seen_keys = set()
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'retired': 0, 'skipped': 0}
+
+        started = time.monotonic()
+        processed = 0
+        batch = []
+        with open(questions_file_path, 'r', encoding='utf-8-sig') as f:
+            for q_data in iter_json_array(f):
+                batch.append(q_data)
+                if len(batch) >= self.batch_size:
+                    processed += self.import_question_batch(batch)
+                    batch = []
+                    self.report_progress(processed, started)
+            if batch:
+                processed += self.import_question_batch(batch)
+                self.report_progress(processed, started)
+
+        # Bulk writes bypass the model signals, so refresh the cached unit content here.
+        for unit_id in self.touched_units:
+            invalidate_unit_content(unit_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Questions: {self.counts["created"]} created, {self.counts["updated"]} updated, '
+            f'{self.counts["unchanged"]} unchanged, {self.counts["skipped"]} skipped.'
+        ))
+        if self.counts['retired']:
+            self.stdout.write(self.style.WARNING(
+                f'{self.counts["retired"]} removed answer(s) were chosen by students; they are no longer '
+                f'offered but kept for those students\' answers.'
+            ))
+
+    def report_progress(self, processed, started):
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(f'  ... {processed} questions processed ({rate:.0f}/s)')
+
+    def import_question_batch(self, batch):
+        """
+        Upserts one batch of questions with a fixed number of queries: existing questions
+        are matched by their stable key, new ones are bulk-inserted, and answers and
+        matching pairs are reconciled per question.
+        """
+        rows = {}
+        for q_data in batch:
+            title = q_data['topic']
+            if title not in self.units_by_title:
+                self.counts['skipped'] += 1
+                self.stdout.write(self.style.ERROR(f'Unit with title "{title}" not found. Skipping question.'))
+                continue
+            if title in self.ambiguous_titles:
+                self.counts['skipped'] += 1
+                self.stdout.write(self.style.ERROR(f'More than one unit is titled "{title}". Skipping question.'))
+                continue
+            key = question_key(q_data)
+            if key in self.seen_keys:
+                # Without this the later entry would overwrite the earlier one.
+                self.counts['skipped'] += 1
+                if q_data.get('key'):
+                    message = f'The key "{key}" is used by more than one question. Skipping question "{q_data["question_text"]}".'
+                else:
+                    message = (f'Unit "{title}" has more than one {q_data["question_type"]} question "{q_data["question_text"]}"; '
+                               f'give them distinct "key" fields. Skipping the repeated one.')
+                self.stdout.write(self.style.ERROR(message))
+                continue
+            self.seen_keys.add(key)
+            rows[key] = q_data
+
+        existing = {question.import_key: question for question in Question.objects.filter(import_key__in=rows)}
+
+        new_questions, changed_questions = [], []
+        for key, q_data in rows.items():
+            unit_id = self.units_by_title[q_data['topic']]
+            question = existing.get(key)
+            if question is None:
+                self.next_order[unit_id] = self.next_order.get(unit_id, 0) + 1
+                new_questions.append(Question(
+                    unit_id=unit_id,
+                    question_text=q_data['question_text'],
+                    question_type=q_data['question_type'],
+                    order=self.next_order[unit_id],
+                    import_key=key,
+                ))
+            elif (question.unit_id, question.question_text, question.question_type) != (unit_id, q_data['question_text'], q_data['question_type']):
+                self.touched_units.add(question.unit_id)
+                question.unit_id = unit_id
+                question.question_text = q_data['question_text']
+                question.question_type = q_data['question_type']
+                changed_questions.append(question)
+
+        Question.objects.bulk_create(new_questions, batch_size=self.batch_size)
+        Question.objects.bulk_update(changed_questions, ['unit', 'question_text', 'question_type'], batch_size=self.batch_size)
+        questions = {**existing, **{question.import_key: question for question in new_questions}}
+
+        # Reconcile answers and matching pairs with what is already stored.
+        answers_by_question, pairs_by_question = {}, {}
+        existing_ids = [question.id for question in existing.values()]
+        # Active answers last, so they win over a retired one with the same text.
+        for answer in Answer.objects.filter(question_id__in=existing_ids).order_by('is_active', 'id'):
+            answers_by_question.setdefault(answer.question_id, {})[answer.answer_text] = answer
+        for pair in MatchingPair.objects.filter(question_id__in=existing_ids):
+            pairs_by_question.setdefault(pair.question_id, {})[pair.prompt_text] = pair
+
+        new_answers, changed_answers, stale_answers = [], [], []
+        new_pairs, changed_pairs, stale_pairs = [], [], []
+        changed_ids = {question.id for question in changed_questions}
+        for key, q_data in rows.items():
+            question = questions[key]
+            current_answers = answers_by_question.get(question.id, {})
+            current_pairs = pairs_by_question.get(question.id, {})
+            touched = key not in existing or question.id in changed_ids
+
+            wanted_answers = {answer_data['answer_text']: answer_data['is_correct'] for answer_data in q_data.get('answers', [])}
+            for text, is_correct in wanted_answers.items():
+                answer = current_answers.get(text)
+                if answer is None:
+                    new_answers.append(Answer(question_id=question.id, answer_text=text, is_correct=is_correct))
+                    touched = True
+                elif answer.is_correct != is_correct or not answer.is_active:
+                    answer.is_correct = is_correct
+                    answer.is_active = True
+                    changed_answers.append(answer)
+                    touched = True
+            stale = [answer.id for text, answer in current_answers.items() if text not in wanted_answers and answer.is_active]
+            stale_answers += stale
+
+            wanted_pairs = {pair_data['prompt_text']: pair_data['match_text'] for pair_data in q_data.get('matching_pairs', [])}
+            for prompt, match in wanted_pairs.items():
+                pair = current_pairs.get(prompt)
+                if pair is None:
+                    new_pairs.append(MatchingPair(question_id=question.id, prompt_text=prompt, match_text=match))
+                    touched = True
+                elif pair.match_text != match:
+                    pair.match_text = match
+                    changed_pairs.append(pair)
+                    touched = True
+            stale_pair_ids = [pair.id for prompt, pair in current_pairs.items() if prompt not in wanted_pairs]
+            stale_pairs += stale_pair_ids
+
+            touched = touched or bool(stale or stale_pair_ids)
+            if key not in existing:
+                self.counts['created'] += 1
+            elif touched:
+                self.counts['updated'] += 1
+            else:
+                self.counts['unchanged'] += 1
+            if touched:
+                self.touched_units.add(question.unit_id)
+
+        Answer.objects.bulk_create(new_answers, batch_size=self.batch_size)
+        Answer.objects.bulk_update(changed_answers, ['is_correct', 'is_active'], batch_size=self.batch_size)
+        # Deleting an answer students chose would delete their answers with it; those are retired instead.
+        chosen = set(StudentAnswer.objects.filter(selected_answer_id__in=stale_answers).values_list('selected_answer_id', flat=True))
+        self.counts['retired'] += Answer.objects.filter(id__in=chosen).update(is_active=False)
+        Answer.objects.filter(id__in=set(stale_answers) - chosen).delete()
+        MatchingPair.objects.bulk_create(new_pairs, batch_size=self.batch_size)
+        MatchingPair.objects.bulk_update(changed_pairs, ['match_text'], batch_size=self.batch_size)
+        MatchingPair.objects.filter(id__in=stale_pairs).delete()
+        return len(batch)
@@ -0,0 +1,41 @@
+# /apps/core/management/commands/run_jobs.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.jobs import purge_finished_jobs, release_abandoned_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (badge awarding, statistics updates, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run every due job once and exit instead of polling forever.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls when the queue is empty.')
+        parser.add_argument('--batch', type=int, default=100, help='Maximum number of jobs to run between housekeeping passes.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Job worker started.'))
+        if settings.JOB_QUEUE_EAGER:
+            self.stdout.write(self.style.WARNING(
+                'JOB_QUEUE_EAGER is on, so the site runs its jobs itself and only jobs queued earlier will run here. '
+                'Set JOB_QUEUE_EAGER=False for the site to hand its jobs to this worker.'
+            ))
+        while True:
+            released = release_abandoned_jobs()
+            if released:
+                self.stdout.write(self.style.WARNING(f'Re-queued {released} abandoned job(s).'))
+
+            executed = run_pending_jobs(limit=options['batch'])
+            if executed:
+                self.stdout.write(f'Ran {executed} job(s).')
+
+            if options['once'] and not executed:
+                break
+            if not executed:
+                purge_finished_jobs()
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS('Job worker finished.'))
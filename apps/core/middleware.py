@@ -0,0 +1,37 @@
+# /apps/core/middleware.py
+
+import logging
+
+from django.conf import settings
+
+from .querystats import QUERY_BUDGETS, count_queries, recorder
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the SQL queries and SQL time of every request and records them per URL name.
+    Requests that go over their view's budget in QUERY_BUDGETS are logged as warnings.
+    Queries run while a streaming response is being consumed are not counted.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_ENABLED:
+            return self.get_response(request)
+
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        if match is not None:
+            view_name = match.view_name
+            if recorder.record(view_name, counter.count, counter.seconds):
+                logger.warning(
+                    '%s ran %d queries (budget %d): %s', view_name, counter.count, QUERY_BUDGETS[view_name], request.path
+                )
+            if recorder.flush_due():
+                recorder.flush()
+        return response
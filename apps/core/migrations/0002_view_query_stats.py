@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewQueryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(help_text="The resolved URL name, e.g. 'dashboard:home'.", max_length=200, unique=True, verbose_name='View')),
+                ('requests', models.PositiveBigIntegerField(default=0, verbose_name='Requests')),
+                ('total_queries', models.PositiveBigIntegerField(default=0, verbose_name='Total Queries')),
+                ('max_queries', models.PositiveIntegerField(default=0, verbose_name='Most Queries')),
+                ('total_sql_ms', models.FloatField(default=0, verbose_name='Total SQL Time (ms)')),
+                ('max_sql_ms', models.FloatField(default=0, verbose_name='Longest SQL Time (ms)')),
+                ('over_budget_count', models.PositiveBigIntegerField(default=0, verbose_name='Requests Over Budget')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'View Query Stats',
+                'verbose_name_plural': 'View Query Stats',
+            },
+        ),
+    ]
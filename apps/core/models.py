@@ -1,3 +1,67 @@
+# /apps/core/models.py
+
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+class Job(models.Model):
+    """
+    A unit of background work stored in the project database.
+    Jobs are enqueued by views and executed by the `run_jobs` management command.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        DONE = 'DONE', _('Done')
+        FAILED = 'FAILED', _('Failed')
+
+    name = models.CharField(_('Job Name'), max_length=100, help_text="The registered name of the job function.")
+    payload = models.JSONField(_('Payload'), default=dict, blank=True)
+    status = models.CharField(_('Status'), max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    max_attempts = models.PositiveIntegerField(_('Max Attempts'), default=3)
+    run_after = models.DateTimeField(_('Run After'), default=timezone.now)
+    locked_at = models.DateTimeField(_('Locked At'), null=True, blank=True)
+    last_error = models.TextField(_('Last Error'), blank=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Finished At'), null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    class Meta:
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+        indexes = [
+            # The worker polls for the oldest due pending job.
+            models.Index(fields=['status', 'run_after'], name='core_job_status_run_after'),
+        ]
+
+
+class ViewQueryStats(models.Model):
+    """
+    Accumulated SQL query figures of one view, recorded by QueryStatsMiddleware.
+    """
+    view_name = models.CharField(_('View'), max_length=200, unique=True, help_text="The resolved URL name, e.g. 'dashboard:home'.")
+    requests = models.PositiveBigIntegerField(_('Requests'), default=0)
+    total_queries = models.PositiveBigIntegerField(_('Total Queries'), default=0)
+    max_queries = models.PositiveIntegerField(_('Most Queries'), default=0)
+    total_sql_ms = models.FloatField(_('Total SQL Time (ms)'), default=0)
+    max_sql_ms = models.FloatField(_('Longest SQL Time (ms)'), default=0)
+    over_budget_count = models.PositiveBigIntegerField(_('Requests Over Budget'), default=0)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    def __str__(self):
+        return self.view_name
+
+    @property
+    def average_queries(self):
+        return self.total_queries / self.requests if self.requests else 0
+
+    @property
+    def average_sql_ms(self):
+        return self.total_sql_ms / self.requests if self.requests else 0
 
-# Create your models here.
+    class Meta:
+        verbose_name = _('View Query Stats')
+        verbose_name_plural = _('View Query Stats')
@@ -0,0 +1,64 @@
+# /apps/core/queryplans.py
+
+import re
+
+from django.db import connection
+
+# name -> (callable returning a QuerySet, tables it may scan in full). Filled by the
+# @register_hot_query decorator in each app's hot_queries.py, which CoreConfig.ready() imports.
+HOT_QUERY_REGISTRY = {}
+
+# A full table scan in the plan text of each supported database, capturing the table name.
+# SQLite reports an index scan as "SCAN <table> USING [COVERING] INDEX ...", which is not a full scan.
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?:\s+AS\s+\w+)?\s*$'),
+    'postgresql': re.compile(r'\bSeq Scan on "?(\w+)"?'),
+}
+
+
+def register_hot_query(name, allow_scans=()):
+    """
+    Registers a function returning one of the project's frequent or expensive queries,
+    so check_query_plans can verify that the database answers it through an index.
+    The plan does not depend on the values in the query, so placeholder ids are fine.
+    `allow_scans` names tables the query is expected to read in full.
+    """
+    def decorator(func):
+        HOT_QUERY_REGISTRY[name] = (func, frozenset(allow_scans))
+        return func
+    return decorator
+
+
+def explain(queryset):
+    """
+    The database's query plan for a queryset, as a list of lines.
+    """
+    return [line for line in queryset.explain().splitlines() if line.strip()]
+
+
+def full_scans(plan, allow_scans=()):
+    """
+    The tables a plan reads in full, apart from the allowed ones.
+    """
+    pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        raise NotImplementedError(f'Query plans of the "{connection.vendor}" database are not supported.')
+    tables = []
+    for line in plan:
+        match = pattern.search(line)
+        if match and match.group(1) not in allow_scans:
+            tables.append(match.group(1))
+    return tables
+
+
+def check_hot_queries(names=None):
+    """
+    Explains every registered hot query (or the named ones) and returns
+    {name: (plan lines, tables scanned in full)}.
+    """
+    report = {}
+    for name in sorted(names or HOT_QUERY_REGISTRY):
+        func, allow_scans = HOT_QUERY_REGISTRY[name]
+        plan = explain(func())
+        report[name] = (plan, full_scans(plan, allow_scans))
+    return report
@@ -0,0 +1,143 @@
+# /apps/core/querystats.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import ViewQueryStats
+
+# The most SQL queries each view may run for one request, by URL name. The test suite
+# requests every view listed here against a dataset with several rows in every list
+# and fails when a view goes over its budget, so an N+1 regression shows up as a
+# failing test. Budgets are measured with an empty cache and include the session and
+# user lookups of an authenticated request.
+QUERY_BUDGETS = {
+    'core:home': 2,
+    # Pages with an ETag (apps/core/etags.py) also run the queries of its version stamps.
+    'academics:unit_list': 7,
+    'academics:student_profile': 8,
+    'academics:leaderboard_selection': 3,
+    'academics:leaderboard_detail': 15,
+    'academics:review_mistakes': 4,
+    # A student's first attempt (see test_first_attempt_stays_within_query_budget):
+    # creating it costs three queries more than resuming it, and its submission creates
+    # the student's two stats rows, six queries more than a later submission.
+    'quizzes:take_quiz': 13,
+    'quizzes:submit_quiz': 35,
+    # Merging into the draft locks it with a write before reading it (apps/quizzes/drafts.py).
+    'quizzes:autosave_quiz': 12,
+    'quizzes:quiz_result': 4,
+    'quizzes:certificate': 6,
+    'dashboard:home': 11,
+    'dashboard:grade_list': 3,
+    'dashboard:unit_list': 3,
+    'dashboard:question_list': 3,
+    'dashboard:user_list': 3,
+    'dashboard:badge_list': 3,
+    'dashboard:student_progress_detail': 5,
+    'dashboard:quiz_attempt_detail': 6,
+    'dashboard:unit_item_analysis': 8,
+    'dashboard:export': 4,
+    'dashboard:query_stats': 3,
+}
+
+# Budgets of the same pages when the browser's copy is still current and a 304 is
+# answered: the session, the user and the version stamps, nothing of the view itself.
+NOT_MODIFIED_QUERY_BUDGETS = {
+    'academics:unit_list': 4,
+    'academics:student_profile': 4,
+    'academics:leaderboard_detail': 3,
+    'quizzes:quiz_result': 3,
+    'quizzes:certificate': 3,
+}
+
+# Budgets for work done outside a request, by job name.
+JOB_QUERY_BUDGETS = {
+    'quizzes.award_badges': 7,
+}
+
+
+class QueryCounter:
+    """
+    A database execute wrapper that counts the queries run through it and their time.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the queries run on the default database inside the block, with or without DEBUG.
+    """
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+class QueryStatsRecorder:
+    """
+    Collects per-view query figures in memory and adds them to the ViewQueryStats table
+    at most every QUERY_STATS_FLUSH_SECONDS, so recording costs no writes per request.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def record(self, view_name, queries, seconds):
+        over_budget = queries > QUERY_BUDGETS.get(view_name, queries)
+        with self.lock:
+            totals = self.pending.setdefault(view_name, [0, 0, 0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += queries
+            totals[2] = max(totals[2], queries)
+            totals[3] += seconds * 1000
+            totals[4] = max(totals[4], seconds * 1000)
+            totals[5] += over_budget
+        return over_budget
+
+    def flush_due(self):
+        return time.monotonic() - self.last_flush >= settings.QUERY_STATS_FLUSH_SECONDS
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        for view_name, (requests, queries, max_queries, sql_ms, max_sql_ms, over_budget) in pending.items():
+            increments = {
+                'requests': F('requests') + requests,
+                'total_queries': F('total_queries') + queries,
+                'max_queries': Greatest(F('max_queries'), max_queries),
+                'total_sql_ms': F('total_sql_ms') + sql_ms,
+                'max_sql_ms': Greatest(F('max_sql_ms'), max_sql_ms),
+                'over_budget_count': F('over_budget_count') + over_budget,
+            }
+            if ViewQueryStats.objects.filter(view_name=view_name).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    ViewQueryStats.objects.create(
+                        view_name=view_name, requests=requests, total_queries=queries, max_queries=max_queries,
+                        total_sql_ms=sql_ms, max_sql_ms=max_sql_ms, over_budget_count=over_budget,
+                    )
+            except IntegrityError:
+                # Another process created the row first.
+                ViewQueryStats.objects.filter(view_name=view_name).update(**increments)
+
+
+recorder = QueryStatsRecorder()
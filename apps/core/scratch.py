@@ -0,0 +1,41 @@
+# /apps/core/scratch.py
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+def copy_database(scratch_dir, name):
+    """
+    Copies the real (SQLite) database into the scratch directory, so a benchmark can
+    write to it freely and every run starts from the same data. Returns the copy's path.
+    """
+    path = os.path.join(scratch_dir, f'{name}.sqlite3')
+    source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return path
+
+
+@contextmanager
+def scratch_database(path, **database_settings):
+    """
+    Points the default database at `path`, with `database_settings` (e.g. OPTIONS) on
+    top of the current ones, for every thread, and restores the real database afterwards.
+    """
+    settings_dict = connections['default'].settings_dict
+    saved = {key: settings_dict.get(key) for key in ('NAME', *database_settings)}
+    connections.close_all()
+    settings_dict.update({'NAME': path, **database_settings})
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict.update(saved)
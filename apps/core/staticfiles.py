@@ -0,0 +1,52 @@
+# /apps/core/staticfiles.py
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.test.utils import override_settings
+
+# The hashed static file names come from the manifest that collectstatic writes. Pages
+# rendered where it has not run (tests, the in-process benchmarks) link the plain names.
+PLAIN_STATIC_STORAGES = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+
+
+def in_process_settings(**overrides):
+    """
+    The settings of a command that sends requests through the WSGI app in this process
+    with the test client: its requests are addressed to the "testserver" host, and pages
+    link the plain static file names, so the command also runs before collectstatic.
+    """
+    return override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        STORAGES=PLAIN_STATIC_STORAGES,
+        **overrides,
+    )
+
+
+def uncollected_static_files():
+    """
+    The static files that are missing from the collectstatic manifest, which every page
+    linking one of them would fail on. Empty with DEBUG, where the plain names are linked.
+    """
+    if settings.DEBUG or not isinstance(staticfiles_storage, ManifestFilesMixin):
+        return []
+    collected = staticfiles_storage.hashed_files
+    return sorted({
+        path.replace('\\', '/')
+        for finder in finders.get_finders()
+        for path, _ in finder.list(['CVS', '.*', '*~'])
+        if path.replace('\\', '/') not in collected
+    })
+
+
+def check_static_manifest():
+    """
+    Refuses to serve pages while STATIC_ROOT is out of date (see the deploy steps in settings.py).
+    """
+    missing = uncollected_static_files()
+    if missing:
+        raise ImproperlyConfigured(
+            f'{len(missing)} static file(s), e.g. "{missing[0]}", are missing from the staticfiles manifest '
+            f'in {settings.STATIC_ROOT}. Run "python manage.py collectstatic --noinput" and reload the app.'
+        )
@@ -0,0 +1,39 @@
+# /apps/core/templatetags/pictures.py
+
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(storage, variants, key):
+    return ', '.join(f'{storage.url(variant[key])} {variant["width"]}w' for variant in variants)
+
+
+@register.simple_tag
+def picture(image, variants=None, sizes='100vw', alt='', css_class=''):
+    """
+    Renders an uploaded image with the derivatives built by apps.core.images.build_variants:
+    a WebP <source> and a fallback <img>, both with a srcset the browser picks a size from,
+    plus the image's width and height so the page does not shift while it loads.
+    Without derivatives (not built yet, or the image could not be read) the original is shown.
+        {% picture answer.answer_image answer.answer_image_variants sizes="320px" alt="..." css_class="..." %}
+    The <picture> element takes no box of its own, so `css_class` styles the <img> as before.
+    """
+    if not image:
+        return ''
+    variants = variants or {}
+    if variants.get('source') != image.name or not variants.get('variants'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">', image.url, alt, css_class
+        )
+    largest = variants['variants'][-1]
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(image.storage, variants['variants'], 'webp'), sizes,
+        image.storage.url(largest['fallback']), _srcset(image.storage, variants['variants'], 'fallback'), sizes,
+        largest['width'], largest['height'], alt, css_class,
+    )
@@ -1,3 +1,473 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connections
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from apps.academics.models import Grade, Unit
+from apps.quizzes.badges import check_and_award_badges
+from apps.quizzes.grading import get_answer_key
+from apps.quizzes.import_keys import backfill_import_keys, question_import_key
+from apps.quizzes.models import Answer, Badge, MatchingPair, Question, QuizResult, StudentAnswer
+from apps.users.models import User
+
+from .jobs import claim_next_job, enqueue, register_job, release_abandoned_jobs, run_job, run_pending_jobs
+from .models import Job, ViewQueryStats
+from .queryplans import check_hot_queries
+from .staticfiles import PLAIN_STATIC_STORAGES
+from .querystats import JOB_QUERY_BUDGETS, NOT_MODIFIED_QUERY_BUDGETS, QUERY_BUDGETS, count_queries, recorder
+
+GRADES = 3
+STUDENTS = 3  # Per grade.
+UNITS = 3  # Per grade; every unit has two questions of each type.
+
+def prebuilt_variants(name):
+    """
+    Derivative metadata for an image the tests do not store, as if it had been built,
+    so saving the row does not try to read the image.
+    """
+    stem = name.rsplit('.', 1)[0]
+    return {
+        'source': name, 'width': 640, 'height': 480,
+        'variants': [{'width': 320, 'height': 240, 'webp': f'derivatives/{stem}_320w.webp', 'fallback': f'derivatives/{stem}_320w.jpg'}],
+    }
+
+
+def create_unit(grade, number):
+    unit = Unit.objects.create(grade=grade, title=f'Unit {number}', unit_number=number, is_published=True)
+    for order, question_type in enumerate(Question.QuestionType.values * 2, start=1):
+        question = Question.objects.create(unit=unit, question_text=f'Question {order}', question_type=question_type, order=order)
+        if question_type in ('MCQ', 'MCQI', 'TF'):
+            image = {}
+            if question_type == 'MCQI':
+                image = {'answer_image': 'answer_images/choice.png', 'answer_image_variants': prebuilt_variants('answer_images/choice.png')}
+            Answer.objects.create(question=question, answer_text='right', is_correct=True, **image)
+            Answer.objects.create(question=question, answer_text='wrong', **image)
+        elif question_type in ('SA', 'FITB'):
+            Answer.objects.create(question=question, answer_text='4', is_correct=True)
+        else:
+            for n in range(3):
+                MatchingPair.objects.create(question=question, prompt_text=f'p{n}', match_text=f'm{n}')
+    return unit
+
+
+def half_right_answers(unit):
+    """
+    Answers that get some questions right and some wrong, so mistake banks fill up.
+    """
+    answers = {}
+    for index, question in enumerate(unit.questions.order_by('order')):
+        right = index % 2 == 0
+        if question.question_type in ('MCQ', 'MCQI', 'TF'):
+            answers[str(question.id)] = str(question.answers.get(is_correct=right).id)
+        elif question.question_type in ('SA', 'FITB'):
+            answers[str(question.id)] = '4' if right else '5'
+        else:
+            ids = [str(pair.id) for pair in question.matching_pairs.all()]
+            answers[str(question.id)] = dict(zip(ids, ids if right else ids[::-1]))
+    return answers
+
+
+@override_settings(QUERY_STATS_ENABLED=False, STORAGES=PLAIN_STATIC_STORAGES)
+class QueryBudgetTests(TestCase):
+    """
+    Every view in QUERY_BUDGETS is requested against a dataset with several grades,
+    students, units, questions, attempts and mistakes, and must stay within its query budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        grades = [Grade.objects.create(name=f'Grade {n}') for n in range(1, GRADES + 1)]
+        units = {grade: [create_unit(grade, number) for number in range(1, UNITS + 1)] for grade in grades}
+        for n, (metric, value) in enumerate([('score', 0), ('completed_count', 1), ('perfect_count', 0)]):
+            Badge.objects.create(
+                name=f'Badge {n}', slug=f'badge-{n}', description='', icon='badge_icons/badge.png',
+                icon_variants=prebuilt_variants('badge_icons/badge.png'),
+                conditions=[{'metric': metric, 'op': '>=', 'value': value}],
+                award_mode=Badge.AwardMode.REPEAT if n else Badge.AwardMode.ONCE,
+            )
+        cls.admin = User.objects.create_user('admin', password='pw', user_type=User.UserType.ADMIN, is_staff=True)
+        # Every student completes all units of their grade but the last, and has the last one open.
+        for grade in grades:
+            for n in range(STUDENTS):
+                student = User.objects.create_user(f'{grade.name}-student{n}'.replace(' ', '').lower(), password='pw', grade=grade)
+                for unit in units[grade][:-1]:
+                    QuizResult.objects.create(student=student, unit=unit)
+                    cls.submit(student, unit)
+                QuizResult.objects.create(student=student, unit=units[grade][-1])
+        cls.grade = grades[0]
+        cls.units = units[cls.grade]
+        cls.student = User.objects.filter(grade=cls.grade).order_by('username').first()
+        cls.result = QuizResult.objects.filter(student=cls.student, completed_at__isnull=False).first()
+        QuizResult.objects.filter(pk=cls.result.pk).update(score=100)
+        cls.result.refresh_from_db()
+
+    @classmethod
+    def submit(cls, student, unit):
+        from django.test import Client
+        client = Client()
+        client.force_login(student)
+        response = client.post(
+            reverse('quizzes:submit_quiz', args=[unit.id]),
+            json.dumps({'answers': half_right_answers(unit), 'time_taken_seconds': 90}),
+            content_type='application/json',
+        )
+        assert response.status_code == 200, response.content
+
+    def setUp(self):
+        cache.clear()
+
+    def requests(self):
+        """
+        The request made for every budgeted view: (user, method, url, data).
+        """
+        open_unit, done_unit = self.units[-1], self.units[0]
+        return {
+            'core:home': (self.student, 'get', reverse('core:home'), None),
+            'academics:unit_list': (self.student, 'get', reverse('academics:unit_list'), None),
+            'academics:student_profile': (self.student, 'get', reverse('academics:student_profile'), None),
+            'academics:leaderboard_selection': (self.student, 'get', reverse('academics:leaderboard_selection'), None),
+            'academics:leaderboard_detail': (self.student, 'get', reverse('academics:leaderboard_detail', args=[self.grade.id]), None),
+            'academics:review_mistakes': (self.student, 'get', reverse('academics:review_mistakes'), None),
+            'quizzes:take_quiz': (self.student, 'get', reverse('quizzes:take_quiz', args=[open_unit.id]), None),
+            'quizzes:autosave_quiz': (self.student, 'post', reverse('quizzes:autosave_quiz', args=[open_unit.id]),
+                                      {'answers': half_right_answers(open_unit)}),
+            'quizzes:submit_quiz': (self.student, 'post', reverse('quizzes:submit_quiz', args=[open_unit.id]),
+                                    {'answers': half_right_answers(open_unit), 'time_taken_seconds': 60}),
+            'quizzes:quiz_result': (self.student, 'get', reverse('quizzes:quiz_result', args=[self.result.id]), None),
+            'quizzes:certificate': (self.student, 'get', reverse('quizzes:certificate', args=[self.result.id]), None),
+            'dashboard:home': (self.admin, 'get', reverse('dashboard:home'), None),
+            'dashboard:grade_list': (self.admin, 'get', reverse('dashboard:grade_list'), None),
+            'dashboard:unit_list': (self.admin, 'get', reverse('dashboard:unit_list'), None),
+            'dashboard:question_list': (self.admin, 'get', reverse('dashboard:question_list'), None),
+            'dashboard:user_list': (self.admin, 'get', reverse('dashboard:user_list'), None),
+            'dashboard:badge_list': (self.admin, 'get', reverse('dashboard:badge_list'), None),
+            'dashboard:student_progress_detail': (self.admin, 'get', reverse('dashboard:student_progress_detail', args=[self.student.id]), None),
+            'dashboard:quiz_attempt_detail': (self.admin, 'get', reverse('dashboard:quiz_attempt_detail', args=[self.result.id]), None),
+            'dashboard:unit_item_analysis': (self.admin, 'get', reverse('dashboard:unit_item_analysis', args=[done_unit.id]), None),
+            'dashboard:export': (self.admin, 'get', reverse('dashboard:export'), None),
+            'dashboard:query_stats': (self.admin, 'get', reverse('dashboard:query_stats'), None),
+        }
+
+    def test_every_budget_has_a_request(self):
+        self.assertEqual(set(QUERY_BUDGETS), set(self.requests()))
+
+    def test_views_stay_within_query_budget(self):
+        for view_name, (user, method, url, data) in self.requests().items():
+            with self.subTest(view=view_name):
+                cache.clear()
+                self.client.force_login(user)
+                with count_queries() as counter:
+                    if method == 'get':
+                        response = self.client.get(url)
+                    else:
+                        response = self.client.post(url, json.dumps(data), content_type='application/json')
+                self.assertLess(response.status_code, 400, f'{view_name} answered {response.status_code}')
+                self.assertLessEqual(
+                    counter.count, QUERY_BUDGETS[view_name],
+                    f'{view_name} ran {counter.count} queries; its budget is {QUERY_BUDGETS[view_name]}.',
+                )
+
+    def test_first_attempt_stays_within_query_budget(self):
+        # A newcomer has no attempt, stats or leaderboard rows yet: taking their first quiz
+        # creates the attempt, and submitting it creates the rest.
+        student = User.objects.create_user('newcomer', password='pw', grade=self.grade)
+        self.client.force_login(student)
+        unit = self.units[0]
+        submission = json.dumps({'answers': half_right_answers(unit), 'time_taken_seconds': 60})
+        steps = [
+            ('quizzes:take_quiz', lambda: self.client.get(reverse('quizzes:take_quiz', args=[unit.id]))),
+            ('quizzes:submit_quiz', lambda: self.client.post(
+                reverse('quizzes:submit_quiz', args=[unit.id]), submission, content_type='application/json',
+            )),
+        ]
+        for view_name, request in steps:
+            with self.subTest(view=view_name):
+                cache.clear()
+                with count_queries() as counter:
+                    response = request()
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    counter.count, QUERY_BUDGETS[view_name],
+                    f'{view_name} ran {counter.count} queries; its budget is {QUERY_BUDGETS[view_name]}.',
+                )
+
+    def test_unchanged_pages_answer_not_modified(self):
+        requests = self.requests()
+        self.client.force_login(self.student)
+        for view_name, budget in NOT_MODIFIED_QUERY_BUDGETS.items():
+            with self.subTest(view=view_name):
+                url = requests[view_name][2]
+                etag = self.client.get(url)['ETag']
+                with count_queries() as counter:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(counter.count, budget, f'{view_name} ran {counter.count} queries; its budget is {budget}.')
+
+        # Completing the open attempt changes the student's pages and the leaderboard.
+        etags = {view_name: self.client.get(requests[view_name][2])['ETag'] for view_name in NOT_MODIFIED_QUERY_BUDGETS}
+        self.submit(self.student, self.units[-1])
+        for view_name in ('academics:unit_list', 'academics:student_profile', 'academics:leaderboard_detail'):
+            with self.subTest(view=view_name, changed=True):
+                response = self.client.get(requests[view_name][2], HTTP_IF_NONE_MATCH=etags[view_name])
+                self.assertEqual(response.status_code, 200)
+
+    def test_badge_check_stays_within_query_budget(self):
+        cache.clear()
+        with count_queries() as counter:
+            check_and_award_badges(self.student, self.result)
+        self.assertLessEqual(counter.count, JOB_QUERY_BUDGETS['quizzes.award_badges'])
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class QueryStatsMiddlewareTests(TestCase):
+
+    @override_settings(QUERY_STATS_ENABLED=True, QUERY_STATS_FLUSH_SECONDS=0)
+    def test_records_queries_per_view(self):
+        recorder.flush()
+        ViewQueryStats.objects.all().delete()
+        admin = User.objects.create_user('admin', password='pw', user_type=User.UserType.ADMIN, is_staff=True)
+        self.client.force_login(admin)
+        self.client.get(reverse('dashboard:grade_list'))
+        self.client.get(reverse('dashboard:grade_list'))
+
+        stats = ViewQueryStats.objects.get(view_name='dashboard:grade_list')
+        self.assertEqual(stats.requests, 2)
+        self.assertGreater(stats.max_queries, 0)
+        response = self.client.get(reverse('dashboard:query_stats'))
+        self.assertContains(response, 'dashboard:grade_list')
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        for name, (plan, scanned) in check_hot_queries().items():
+            with self.subTest(query=name):
+                self.assertEqual(scanned, [], '\n'.join(plan))
+
+
+class ImageVariantsTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_upload_builds_derivatives(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (400, 200), (255, 0, 0, 128)).save(buffer, format='PNG')
+        badge = Badge(name='Star', description='-', slug='star')
+        badge.icon.save('star.png', ContentFile(buffer.getvalue()))
+        badge.refresh_from_db()
+
+        self.assertEqual((badge.icon_variants['width'], badge.icon_variants['height']), (400, 200))
+        self.assertEqual([(v['width'], v['height']) for v in badge.icon_variants['variants']], [(96, 48), (192, 96)])
+        self.assertTrue(all(v['fallback'].endswith('.png') for v in badge.icon_variants['variants']))
+        html = Template('{% load pictures %}{% picture badge.icon badge.icon_variants sizes="96px" %}').render(Context({'badge': badge}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('_192w.webp 192w', html)
+        self.assertIn('width="192" height="96"', html)
+        self.assertIn('loading="lazy"', html)
+
+        badge.icon = 'badge_icons/missing.png'
+        with self.assertLogs('apps.core.images', 'WARNING'):
+            badge.save()
+        badge.refresh_from_db()
+        self.assertEqual(badge.icon_variants, {})
+
+
+# Jobs registered for JobQueueTests.
+JOB_CALLS = []
+
+
+@register_job('core.tests.record')
+def record_job(value):
+    JOB_CALLS.append(value)
+
+
+@register_job('core.tests.fail')
+def failing_job():
+    raise ValueError('This job always fails.')
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        JOB_CALLS.clear()
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(KeyError):
+            enqueue('core.tests.missing')
+
+    def test_jobs_run_once_in_order(self):
+        enqueue('core.tests.record', value=1)
+        enqueue('core.tests.record', value=2)
+        self.assertEqual(run_pending_jobs(), 2)
+        self.assertEqual(run_pending_jobs(), 0)
+        self.assertEqual(JOB_CALLS, [1, 2])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.Status.DONE})
+
+    def test_failed_job_is_retried_until_it_runs_out_of_attempts(self):
+        job = enqueue('core.tests.fail', max_attempts=2)
+        with self.assertLogs('apps.core.jobs', 'ERROR'):
+            self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.PENDING, 1))
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        # Not due yet.
+        self.assertIsNone(claim_next_job())
+
+        job = claim_next_job(now=job.run_after)
+        self.assertIsNone(claim_next_job(now=job.run_after))
+        with self.assertLogs('apps.core.jobs', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+    def test_abandoned_jobs_are_released(self):
+        job = enqueue('core.tests.record', value=1)
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(release_abandoned_jobs(), 1)
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(JOB_CALLS, [1])
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_eager_jobs_run_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue('core.tests.record', value=3))
+            self.assertEqual(JOB_CALLS, [])
+        self.assertEqual(JOB_CALLS, [3])
+        self.assertFalse(Job.objects.exists())
+
+
+class ImportDataTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.import_file('structure.json', {
+            'grades': [{'name': 'Grade 1', 'description': ''}],
+            'units': [{'grade_name': 'Grade 1', 'unit_number': 1, 'title': 'Addition', 'duration_minutes': 10}],
+        }, questions=False)
+        self.questions = [
+            {'topic': 'Addition', 'question_type': 'MCQ', 'question_text': '1 + 1?',
+             'answers': [{'answer_text': '2', 'is_correct': True}, {'answer_text': '3', 'is_correct': False},
+                         {'answer_text': '4', 'is_correct': False}]},
+            {'topic': 'Addition', 'question_type': 'SA', 'question_text': '2 + 2?',
+             'answers': [{'answer_text': '4', 'is_correct': True}]},
+            {'key': 'match-1', 'topic': 'Addition', 'question_type': 'MATCH', 'question_text': 'Match the sums.',
+             'matching_pairs': [{'prompt_text': '1 + 2', 'match_text': '3'}, {'prompt_text': '2 + 3', 'match_text': '5'}]},
+        ]
+
+    def import_file(self, name, data, questions=True):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        out = io.StringIO()
+        call_command('import_data', **{'questions_file' if questions else 'structure_file': path}, stdout=out)
+        return out.getvalue()
+
+    def contents(self):
+        return (
+            list(Question.objects.order_by('id').values_list('id', 'import_key', 'question_text')),
+            list(Answer.objects.order_by('id').values_list('id', 'answer_text', 'is_correct', 'is_active')),
+            list(MatchingPair.objects.order_by('id').values_list('id', 'prompt_text', 'match_text')),
+        )
+
+    def test_reimport_changes_nothing(self):
+        output = self.import_file('questions.json', self.questions)
+        self.assertIn('3 created, 0 updated, 0 unchanged, 0 skipped', output)
+        imported = self.contents()
+        unit = Unit.objects.get()
+
+        output = self.import_file('questions.json', self.questions)
+        self.assertIn('0 created, 0 updated, 3 unchanged, 0 skipped', output)
+        self.assertEqual(self.contents(), imported)
+        self.assertEqual(Unit.objects.get().content_version, unit.content_version)
+
+    def test_repeated_entries_are_skipped(self):
+        output = self.import_file('questions.json', self.questions + [
+            {**self.questions[1], 'answers': [{'answer_text': '5', 'is_correct': True}]},
+            {**self.questions[2], 'question_text': 'Match these sums.'},
+        ])
+        self.assertIn('3 created, 0 updated, 0 unchanged, 2 skipped', output)
+        self.assertIn('has more than one SA question "2 + 2?"', output)
+        self.assertIn('The key "match-1" is used by more than one question.', output)
+        # The first entry wins.
+        self.assertEqual(Answer.objects.get(question__question_type='SA').answer_text, '4')
+        self.assertEqual(Question.objects.get(import_key='match-1').question_text, 'Match the sums.')
+
+    def test_removed_answers_students_chose_are_retired(self):
+        self.import_file('questions.json', self.questions)
+        question = Question.objects.get(question_type='MCQ')
+        chosen = question.answers.get(answer_text='3')
+        student = User.objects.create(username='student', grade=Grade.objects.get())
+        result = QuizResult.objects.create(student=student, unit=question.unit)
+        StudentAnswer.objects.create(quiz_result=result, question=question, selected_answer=chosen)
+
+        self.questions[0]['answers'] = self.questions[0]['answers'][:1]
+        output = self.import_file('questions.json', self.questions)
+        self.assertIn('0 created, 1 updated, 2 unchanged', output)
+        self.assertIn('1 removed answer(s) were chosen by students', output)
+        self.assertEqual(
+            list(question.answers.order_by('id').values_list('answer_text', 'is_active')), [('2', True), ('3', False)],
+        )
+        self.assertTrue(StudentAnswer.objects.filter(selected_answer=chosen).exists())
+        self.assertEqual(get_answer_key(Unit.objects.get())['choice_ids'][question.id], {question.answers.get(answer_text='2').id})
+
+        # Listing the answer again brings it back.
+        self.questions[0]['answers'].append({'answer_text': '3', 'is_correct': False})
+        self.import_file('questions.json', self.questions)
+        self.assertTrue(Answer.objects.get(pk=chosen.pk).is_active)
+
+    def test_questions_created_before_import_keys_are_matched(self):
+        unit = Unit.objects.get()
+        for _ in range(2):
+            Question.objects.create(unit=unit, question_text='2 + 2?', question_type='SA', order=1)
+        self.assertEqual(backfill_import_keys(Question), 1)
+        oldest, copy = Question.objects.order_by('id')
+        self.assertEqual(oldest.import_key, question_import_key('Addition', 'SA', '2 + 2?'))
+        self.assertIsNone(copy.import_key)
+
+        output = self.import_file('questions.json', self.questions)
+        self.assertIn('2 created, 1 updated', output)
+        self.assertEqual(Question.objects.filter(question_text='2 + 2?').count(), 2)
+
+
+class ProductionSQLiteTests(SimpleTestCase):
+
+    def test_connections_use_wal_and_wait_for_the_write_lock(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # What SQLITE_PRODUCTION_MODE=True does to the default database, on a file of its own.
+        settings_dict = {
+            **connections['default'].settings_dict, **settings.SQLITE_PRODUCTION_DATABASE,
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+        }
+        connection = connections['default'].__class__(settings_dict, alias='production')
+        self.addCleanup(connection.close)
+
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for pragma in ('journal_mode', 'busy_timeout', 'synchronous'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'busy_timeout': 20000, 'synchronous': 1})
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
@@ -2,8 +2,10 @@
 
 from django import forms
 from apps.users.models import User
-from apps.academics.models import Grade
+from apps.academics.models import Grade, Unit
 from apps.quizzes.models import Badge
+from apps.quizzes.badges import METRICS, OPERATORS, validate_conditions
+from apps.quizzes.exports import EXPORT_COLUMNS, EXPORT_FORMATS
 class AdminStudentCreationForm(forms.ModelForm):
     """
     A form for admins to create new student accounts.
@@ -46,15 +48,19 @@ class BadgeForm(forms.ModelForm):
     """
     class Meta:
         model = Badge
-        fields = ['name', 'slug', 'description', 'icon']
+        fields = ['name', 'slug', 'description', 'icon', 'award_mode', 'conditions']
         help_texts = {
-            'slug': "A unique key in English, e.g., 'perfect_score'. This cannot be changed later."
+            'slug': "A unique key in English, e.g., 'perfect_score'. This cannot be changed later.",
+            'conditions': 'A list of rules that must all hold, e.g. [{"metric": "score", "op": ">=", "value": 80}]. '
+                          'Metrics: ' + ', '.join(METRICS) + '. Operators: ' + ', '.join(OPERATORS) + '.',
         }
         widgets = {
             'name': forms.TextInput(attrs={'class': 'w-full p-2 border rounded-lg'}),
             # FIX: Removed 'readonly' from here to allow adding a slug on creation
             'slug': forms.TextInput(attrs={'class': 'w-full p-2 border rounded-lg bg-gray-100'}),
             'description': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3}),
+            'award_mode': forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}),
+            'conditions': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg font-mono', 'rows': 4}),
         }
 
     def __init__(self, *args, **kwargs):
@@ -63,3 +69,89 @@ class BadgeForm(forms.ModelForm):
         if self.instance and self.instance.pk:
             self.fields['slug'].widget.attrs['readonly'] = True
 
+    def clean_conditions(self):
+        conditions = self.cleaned_data.get('conditions') or []
+        validate_conditions(conditions)
+        return conditions
+
+
+class ExportForm(forms.Form):
+    """
+    Filters and output options for exporting quiz results or answers.
+    """
+    dataset = forms.ChoiceField(choices=[('results', 'Quiz results'), ('answers', 'Student answers')],
+                                widget=forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}))
+    grade = forms.ModelChoiceField(queryset=Grade.objects.all(), required=False,
+                                   widget=forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}))
+    unit = forms.ModelChoiceField(queryset=Unit.objects.select_related('grade'), required=False,
+                                  widget=forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}))
+    date_from = forms.DateField(required=False, help_text="Completed on or after this date.",
+                                widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full p-2 border rounded-lg'}))
+    date_to = forms.DateField(required=False, help_text="Completed on or before this date.",
+                              widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full p-2 border rounded-lg'}))
+    export_format = forms.ChoiceField(label="Format", choices=[(name, name.upper()) for name in EXPORT_FORMATS],
+                                      widget=forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}))
+    columns = forms.CharField(required=False,
+                              help_text="Comma-separated column names; leave empty for all. "
+                                        "Results: " + ', '.join(EXPORT_COLUMNS['results']) + ". "
+                                        "Answers: " + ', '.join(EXPORT_COLUMNS['answers']) + ".",
+                              widget=forms.TextInput(attrs={'class': 'w-full p-2 border rounded-lg font-mono'}))
+    compress = forms.BooleanField(label="Gzip", required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        dataset = cleaned_data.get('dataset')
+        columns = [column.strip() for column in (cleaned_data.get('columns') or '').split(',') if column.strip()]
+        if dataset:
+            unknown = [column for column in columns if column not in EXPORT_COLUMNS[dataset]]
+            if unknown:
+                self.add_error('columns', f"Unknown columns: {', '.join(unknown)}.")
+        cleaned_data['columns'] = columns
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            self.add_error('date_to', "The end date is before the start date.")
+        return cleaned_data
+
+
+class RosterUploadForm(forms.Form):
+    """
+    A roster CSV for creating many student accounts at once.
+    """
+    roster = forms.FileField(
+        help_text="CSV with the columns username, grade (the grade name), and optionally first_name, "
+                  "last_name, email and password. Blank passwords are generated.",
+        widget=forms.ClearableFileInput(attrs={'class': 'w-full p-2 border rounded-lg', 'accept': '.csv'}),
+    )
+
+
+class PromotionForm(forms.Form):
+    """
+    One "move to" choice per grade for promoting students at the end of the year.
+    """
+    KEEP = ''
+    CLEAR = 'none'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.grades = list(Grade.objects.all())
+        for grade in self.grades:
+            choices = [(self.KEEP, '-- Stay in this grade --')]
+            choices += [(str(other.id), other.name) for other in self.grades if other.id != grade.id]
+            choices.append((self.CLEAR, 'Remove grade (finished school)'))
+            self.fields[f'grade_{grade.id}'] = forms.ChoiceField(
+                label=f"Students in {grade.name} move to", choices=choices, required=False,
+                widget=forms.Select(attrs={'class': 'w-full p-2 border rounded-lg'}),
+            )
+
+    def promotions(self):
+        """
+        The chosen moves as {grade id: new grade id or None}.
+        """
+        promotions = {}
+        for grade in self.grades:
+            choice = self.cleaned_data.get(f'grade_{grade.id}')
+            if choice == self.CLEAR:
+                promotions[grade.id] = None
+            elif choice:
+                promotions[grade.id] = int(choice)
+        return promotions
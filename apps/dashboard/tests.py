@@ -1,3 +1,141 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.academics.models import Grade, Unit
+from apps.core.staticfiles import PLAIN_STATIC_STORAGES
+from apps.quizzes.models import Answer, Question, QuizResult, StudentAnswer
+from apps.users.models import User
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False)
+class UnitItemAnalysisViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = Unit.objects.create(grade=grade, title='Unit 1', unit_number=1, is_published=True)
+        question = Question.objects.create(unit=cls.unit, question_text='2 + 2?', question_type='MCQ', order=1)
+        right = Answer.objects.create(question=question, answer_text='4', is_correct=True)
+        wrong = Answer.objects.create(question=question, answer_text='5')
+        Answer.objects.create(question=question, answer_text='22')
+        # Two of three students choose the right answer; nobody chooses 22.
+        for n, answer in enumerate((right, right, wrong)):
+            student = User.objects.create(username=f'student{n}', grade=grade)
+            result = QuizResult.objects.create(student=student, unit=cls.unit)
+            StudentAnswer.objects.create(quiz_result=result, question=question, selected_answer=answer, is_correct=answer.is_correct)
+            QuizResult.objects.filter(pk=result.pk).update(score=100 if answer.is_correct else 0, completed_at=timezone.now())
+        cls.admin = User.objects.create(username='admin', user_type=User.UserType.ADMIN, is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_option_rates_are_shown_as_percentages(self):
+        response = self.client.get(reverse('dashboard:unit_item_analysis', args=[self.unit.id]))
+        self.assertContains(response, 'Difficulty 0.67')
+        self.assertContains(response, '66.7%')
+        for count, rate in ((2, 67), (1, 33), (0, 0)):
+            self.assertContains(response, f'{count} ({rate}%)')
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False)
+class ExportViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = Grade.objects.create(name='Grade 1')
+        cls.units = [Unit.objects.create(grade=cls.grade, title=f'Unit {n}', unit_number=n, is_published=True) for n in (1, 2)]
+        cls.student = User.objects.create(username='student', grade=cls.grade)
+        for score, unit in zip((80, 100), cls.units):
+            result = QuizResult.objects.create(student=cls.student, unit=unit)
+            QuizResult.objects.filter(pk=result.pk).update(score=score, completed_at=timezone.now())
+        cls.admin = User.objects.create(username='admin', user_type=User.UserType.ADMIN, is_staff=True)
+
+    def test_students_are_sent_to_the_login_page(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('dashboard:export'), {'dataset': 'results', 'export_format': 'csv'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_streams_the_filtered_export(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard:export'), {
+            'dataset': 'results', 'export_format': 'csv', 'unit': self.units[1].id, 'columns': 'unit_title, score',
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="results.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows, [['unit_title', 'score'], ['Unit 2', '100.0']])
+
+        response = self.client.get(reverse('dashboard:export'), {'dataset': 'results', 'export_format': 'jsonl', 'compress': 'on'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 2)
+
+    def test_unknown_columns_show_the_form(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard:export'), {'dataset': 'results', 'export_format': 'csv', 'columns': 'secret'})
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'Unknown columns: secret.')
+
+
+@override_settings(
+    STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ImportRosterViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Grade.objects.create(name='Grade 1')
+        cls.admin = User.objects.create(username='admin', user_type=User.UserType.ADMIN, is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def upload(self, content):
+        roster = SimpleUploadedFile('roster.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post(reverse('dashboard:import_roster'), {'roster': roster})
+
+    def test_invalid_roster_creates_nobody(self):
+        response = self.upload('username,grade\namal,Grade 1\nomar,Grade 9\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Grade &quot;Grade 9&quot; does not exist.')
+        self.assertFalse(User.objects.filter(username='amal').exists())
+
+    def test_credentials_are_downloaded_once(self):
+        response = self.upload('username,grade,password\namal,Grade 1,secret123\nomar,Grade 1,\n')
+        self.assertRedirects(response, reverse('dashboard:import_roster_success'))
+        self.assertEqual(User.objects.filter(username__in=['amal', 'omar'], user_type=User.UserType.STUDENT).count(), 2)
+
+        response = self.client.get(reverse('dashboard:roster_credentials'))
+        rows = list(csv.DictReader(io.StringIO(response.content.decode('utf-8-sig'))))
+        self.assertEqual([row['username'] for row in rows], ['amal', 'omar'])
+        self.assertTrue(User.objects.get(username='amal').check_password(rows[0]['password']))
+        self.assertTrue(User.objects.get(username='omar').check_password(rows[1]['password']))
+
+        response = self.client.get(reverse('dashboard:roster_credentials'))
+        self.assertRedirects(response, reverse('dashboard:user_list'))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES, QUERY_STATS_ENABLED=False)
+class StudentProgressViewTests(TestCase):
+
+    def test_attempts_in_progress_count_as_zero(self):
+        grade = Grade.objects.create(name='Grade 1')
+        student = User.objects.create(username='student', grade=grade)
+        for number, score in ((1, 80), (2, None)):
+            unit = Unit.objects.create(grade=grade, title=f'Unit {number}', unit_number=number, is_published=True)
+            result = QuizResult.objects.create(student=student, unit=unit)
+            if score is not None:
+                QuizResult.objects.filter(pk=result.pk).update(score=score, completed_at=timezone.now())
+        self.client.force_login(User.objects.create(username='admin', user_type=User.UserType.ADMIN, is_staff=True))
+
+        response = self.client.get(reverse('dashboard:student_progress_detail', args=[student.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['progress_by_grade'][grade]['average_score'], 40)
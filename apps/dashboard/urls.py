@@ -8,8 +8,10 @@ from .views import (
     UnitListView, UnitCreateView, UnitUpdateView, UnitDeleteView,
     QuestionListView, QuestionCreateView, QuestionUpdateView, QuestionDeleteView,
     UserListView, create_student_view, create_student_success_view,
+    import_roster_view, import_roster_success_view, roster_credentials_download_view, promote_students_view,
     StudentUpdateView, StudentDeleteView, student_progress_detail_view,
-    quiz_attempt_detail_view, BadgeListView, BadgeCreateView, BadgeUpdateView, BadgeDeleteView, toggle_unit_publish_status
+    quiz_attempt_detail_view, BadgeListView, BadgeCreateView, BadgeUpdateView, BadgeDeleteView, toggle_unit_publish_status,
+    unit_item_analysis_view, export_view, query_stats_view, query_stats_reset_view,
 )
 
 app_name = 'dashboard'
@@ -29,6 +31,7 @@ urlpatterns = [
     path('units/add/', UnitCreateView.as_view(), name='unit_add'),
     path('units/<int:pk>/edit/', UnitUpdateView.as_view(), name='unit_edit'),
     path('units/<int:pk>/delete/', UnitDeleteView.as_view(), name='unit_delete'),
+    path('units/<int:pk>/item-analysis/', unit_item_analysis_view, name='unit_item_analysis'),
 
     # Question URLs
     path('questions/', QuestionListView.as_view(), name='question_list'),
@@ -40,6 +43,10 @@ urlpatterns = [
     path('students/', UserListView.as_view(), name='user_list'),
     path('students/add/', create_student_view, name='student_add'),
     path('students/add/success/', create_student_success_view, name='create_student_success'),
+    path('students/import/', import_roster_view, name='import_roster'),
+    path('students/import/success/', import_roster_success_view, name='import_roster_success'),
+    path('students/import/credentials.csv', roster_credentials_download_view, name='roster_credentials'),
+    path('students/promote/', promote_students_view, name='promote_students'),
     path('students/<int:pk>/progress/', student_progress_detail_view, name='student_progress_detail'),
     path('students/<int:pk>/edit/', StudentUpdateView.as_view(), name='student_edit'),
     path('students/<int:pk>/delete/', StudentDeleteView.as_view(), name='student_delete'),
@@ -51,4 +58,11 @@ urlpatterns = [
     path('badges/<int:pk>/edit/', BadgeUpdateView.as_view(), name='badge_edit'),
     path('badges/<int:pk>/delete/', BadgeDeleteView.as_view(), name='badge_delete'),
 
+    # Data export
+    path('export/', export_view, name='export'),
+
+    # Query stats
+    path('query-stats/', query_stats_view, name='query_stats'),
+    path('query-stats/reset/', query_stats_reset_view, name='query_stats_reset'),
+
 ]
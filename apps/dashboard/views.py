@@ -12,18 +12,30 @@ from django.contrib.auth.mixins import UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.db.models import Avg, Count
+from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
 from collections import defaultdict
-from django.db.models import Avg, Count, Q, F, FloatField, ExpressionWrapper
+from django.db.models import Avg, Count, Q, F, FloatField, ExpressionWrapper, Sum, Window
+from django.db.models.functions import RowNumber
 from apps.academics.models import Grade, Unit
-from apps.quizzes.models import Question, Answer, QuizResult, MatchingPair
+from apps.quizzes.models import Question, Answer, QuizResult, MatchingPair, StudentStats, UnitStats, QuestionStats
 from apps.users.models import User
 from .forms import AdminStudentCreationForm, AdminStudentUpdateForm
 from apps.quizzes.models import Badge
+from apps.core.jobs import enqueue
+from apps.quizzes.breakdown import render_attempt_breakdown
+from apps.quizzes.item_analysis import get_item_analysis
 from .forms import BadgeForm # استيراد النموذج الجديد
+from .forms import ExportForm, PromotionForm, RosterUploadForm
+from apps.quizzes.exports import export_filename, export_queryset, stream_export
+from apps.users.roster import RosterError, create_students, credentials_csv, promote_students, read_roster
+from apps.core.models import ViewQueryStats
+from apps.core.querystats import QUERY_BUDGETS, recorder
 from collections import OrderedDict
 from django.shortcuts import get_object_or_404, redirect
+from django.http import HttpResponse, StreamingHttpResponse
+import io
 from django.views.decorators.http import require_POST
 # Make sure Unit is imported if it's not already
 from apps.academics.models import Unit
@@ -50,43 +62,43 @@ def dashboard_home_view(request):
     """
     # --- Platform-wide Summary Stats ---
     total_students = User.objects.filter(user_type='STUDENT').count()
-    total_quizzes_taken = QuizResult.objects.filter(completed_at__isnull=False).count()
-    overall_average_score = QuizResult.objects.filter(completed_at__isnull=False).aggregate(average=Avg('score'))['average'] or 0
+    totals = StudentStats.objects.aggregate(quizzes=Sum('completed_count'), score_sum=Sum('score_sum'))
+    total_quizzes_taken = totals['quizzes'] or 0
+    overall_average_score = totals['score_sum'] / total_quizzes_taken if total_quizzes_taken else 0
 
     # --- Content Analytics (grouped by Grade) ---
     content_analytics_by_grade = []
     all_grades = Grade.objects.prefetch_related('units').order_by('name')
 
+    # The three hardest units of every grade and their five hardest questions, read
+    # from the counters kept by apps/quizzes/difficulty.py. Each is one ranked query
+    # for all grades at once, so the page costs the same however many grades exist.
+    difficult_units = list(
+        UnitStats.objects.filter(unit__is_published=True, attempt_count__gt=0)
+        .annotate(rank=Window(RowNumber(), partition_by=F('grade_id'), order_by=F('average_score').asc()))
+        .filter(rank__lte=3).select_related('unit').order_by('grade_id', 'average_score')
+    )
+    difficult_questions = defaultdict(list)
+    for question_stats in (
+        QuestionStats.objects.filter(unit_id__in=[unit_stats.unit_id for unit_stats in difficult_units], attempt_count__gt=0)
+        .annotate(rank=Window(RowNumber(), partition_by=F('unit_id'), order_by=F('success_rate').asc()))
+        .filter(rank__lte=5).select_related('question').order_by('unit_id', 'success_rate')
+    ):
+        difficult_questions[question_stats.unit_id].append(question_stats)
+    units_by_grade = defaultdict(list)
+    for unit_stats in difficult_units:
+        if difficult_questions[unit_stats.unit_id]:
+            units_by_grade[unit_stats.grade_id].append({
+                'unit': unit_stats.unit,
+                'stats': unit_stats,
+                'questions': difficult_questions[unit_stats.unit_id],
+            })
+
     for grade in all_grades:
-        # FIX: Changed 'quiz_results' to 'quizresult' in the two lines below
-        difficult_units_qs = Unit.objects.filter(grade=grade, is_published=True).annotate(
-            average_score=Avg('quizresult__score'),
-            attempts=Count('quizresult')
-        ).filter(attempts__gt=0).order_by('average_score')[:3]
-
-        # For each of those difficult units, find its top 5 difficult questions
-        units_with_questions_data = []
-        for unit in difficult_units_qs:
-            difficult_questions_qs = Question.objects.filter(unit=unit).annotate(
-                total_attempts=Count('studentanswer'),
-                correct_attempts=Count('studentanswer', filter=Q(studentanswer__is_correct=True))
-            ).filter(total_attempts__gt=0).annotate(
-                success_rate=ExpressionWrapper(
-                    (F('correct_attempts') * 100.0 / F('total_attempts')),
-                    output_field=FloatField()
-                )
-            ).order_by('success_rate')[:5]
-
-            if difficult_questions_qs.exists():
-                units_with_questions_data.append({
-                    'unit': unit,
-                    'questions': difficult_questions_qs
-                })
-
-        if units_with_questions_data:
+        if units_by_grade[grade.id]:
             content_analytics_by_grade.append({
                 'grade': grade,
-                'units_data': units_with_questions_data
+                'units_data': units_by_grade[grade.id]
             })
 
     # --- Student Analytics ---
@@ -95,9 +107,9 @@ def dashboard_home_view(request):
     ).order_by('name')
 
     # FIX: Changed 'quiz_results' to 'quizresult' in the line below
-    most_active_students = User.objects.filter(user_type='STUDENT').annotate(
-        quiz_count=Count('quizresult')
-    ).filter(quiz_count__gt=0).order_by('-quiz_count')[:5]
+    most_active_students = User.objects.filter(user_type='STUDENT', stats__completed_count__gt=0).annotate(
+        quiz_count=F('stats__completed_count')
+    ).order_by('-quiz_count')[:5]
 
     context = {
         'total_students': total_students,
@@ -178,8 +190,15 @@ class UnitDeleteView(AdminRequiredMixin, DeleteView):
 
 # --- Question Management Views (Updated) ---
 
+class ActiveAnswerFormSet(BaseInlineFormSet):
+    # Answers retired by import_data stay linked to past student answers but are not edited here.
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('queryset', Answer.objects.filter(is_active=True))
+        super().__init__(*args, **kwargs)
+
 AnswerFormSet = inlineformset_factory(
     Question, Answer,
+    formset=ActiveAnswerFormSet,
     fields=('answer_text', 'answer_image', 'is_correct'),
     extra=5,
     can_delete=True
@@ -313,6 +332,54 @@ def create_student_view(request):
         form = AdminStudentCreationForm()
     return render(request, 'dashboard/student_add_form.html', {'form': form})
 
+@user_passes_test(is_admin)
+def import_roster_view(request):
+    """
+    Creates every student of an uploaded roster CSV, or none of them if any row is invalid.
+    """
+    errors = None
+    if request.method == 'POST':
+        form = RosterUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = read_roster(io.TextIOWrapper(form.cleaned_data['roster'].file, encoding='utf-8-sig', newline=''))
+            except (RosterError, UnicodeDecodeError) as exc:
+                errors = exc.errors if isinstance(exc, RosterError) else [(0, "The file is not a UTF-8 CSV file.")]
+            else:
+                request.session['roster_credentials'] = create_students(rows)
+                return redirect('dashboard:import_roster_success')
+    else:
+        form = RosterUploadForm()
+    return render(request, 'dashboard/student_roster_form.html', {'form': form, 'errors': errors})
+
+@user_passes_test(is_admin)
+def import_roster_success_view(request):
+    credentials = request.session.get('roster_credentials')
+    if not credentials:
+        return redirect('dashboard:user_list')
+    return render(request, 'dashboard/import_roster_success.html', {'credentials': credentials})
+
+@user_passes_test(is_admin)
+def roster_credentials_download_view(request):
+    # The sheet holds plain-text passwords, so it is handed out once and then dropped.
+    credentials = request.session.pop('roster_credentials', None)
+    if not credentials:
+        return redirect('dashboard:user_list')
+    response = HttpResponse(credentials_csv(credentials).encode('utf-8-sig'), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="student-credentials.csv"'
+    return response
+
+@user_passes_test(is_admin)
+def promote_students_view(request):
+    """
+    Year-end promotion: moves the students of each grade to the chosen grade in one update.
+    """
+    form = PromotionForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        promote_students(form.promotions())
+        return redirect('dashboard:user_list')
+    return render(request, 'dashboard/student_promote_form.html', {'form': form})
+
 @user_passes_test(is_admin)
 def create_student_success_view(request):
     credentials = request.session.pop('new_student_credentials', None)
@@ -345,7 +412,8 @@ def student_progress_detail_view(request, pk):
         grade = result.unit.grade
         progress_by_grade[grade]['results'].append(result)
         progress_by_grade[grade]['total_quizzes'] += 1
-        progress_by_grade[grade]['total_score'] += result.score
+        # An attempt still in progress has no score yet.
+        progress_by_grade[grade]['total_score'] += result.score or 0
 
     for grade, data in progress_by_grade.items():
         if data['total_quizzes'] > 0:
@@ -363,59 +431,17 @@ def student_progress_detail_view(request, pk):
 def quiz_attempt_detail_view(request, pk):
     """
     Displays a detailed breakdown of a student's answers for a specific quiz attempt,
-    handling all question types with corrected logic.
+    handling all question types. The breakdown is built by the shared loader in
+    apps/quizzes/breakdown.py and cached once the attempt is completed.
     """
     quiz_result = get_object_or_404(
         QuizResult.objects.select_related('student', 'unit'),
         pk=pk
     )
 
-    student_answers_qs = quiz_result.student_answers.select_related(
-        'question', 'selected_answer'
-    ).order_by('question__order')
-
-    detailed_answers = []
-    for sa in student_answers_qs:
-        question = sa.question
-        answer_detail = {
-            'question': question,
-            'is_correct': sa.is_correct,
-            'student_answer': None,
-            'correct_answer': None,
-            'paired_answers': None, # For matching questions
-        }
-
-        if question.question_type in ['MCQ', 'MCQI', 'TF']:
-            answer_detail['student_answer'] = sa.selected_answer
-            answer_detail['correct_answer'] = question.answers.filter(is_correct=True).first()
-
-        elif question.question_type in ['SA', 'FITB']:
-            answer_detail['student_answer'] = sa.text_answer
-            answer_detail['correct_answer'] = question.answers.filter(is_correct=True).first().answer_text
-
-        elif question.question_type in ['MATCH', 'MATI']:
-            prompts = list(question.matching_pairs.all())
-            student_matches_map = {int(k): int(v) for k, v in sa.matching_answer.items()} if sa.matching_answer else {}
-
-            student_ordered_matches = []
-            for prompt in prompts:
-                student_match_id = student_matches_map.get(prompt.id)
-                match_obj = None
-                if student_match_id:
-                    try:
-                        match_obj = MatchingPair.objects.get(id=student_match_id)
-                    except MatchingPair.DoesNotExist:
-                        pass # Keep it as None if not found
-                student_ordered_matches.append(match_obj)
-
-            # Zip the lists together for easy iteration in the template
-            answer_detail['paired_answers'] = zip(prompts, student_ordered_matches)
-
-        detailed_answers.append(answer_detail)
-
     context = {
         'quiz_result': quiz_result,
-        'detailed_answers': detailed_answers,
+        'breakdown_html': render_attempt_breakdown(quiz_result, audience='admin'),
     }
     return render(request, 'dashboard/quiz_attempt_detail.html', context)
 
@@ -442,13 +468,21 @@ class BadgeListView(AdminRequiredMixin, ListView):
     context_object_name = 'badges'
     ordering = ['name']
 
-class BadgeCreateView(AdminRequiredMixin, CreateView):
+class BadgeBackfillMixin:
+    """Re-evaluates a badge's rules over all students in the background after it is saved."""
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if self.object.conditions:
+            enqueue('quizzes.backfill_badges', badge_ids=[self.object.pk])
+        return response
+
+class BadgeCreateView(AdminRequiredMixin, BadgeBackfillMixin, CreateView):
     model = Badge
     form_class = BadgeForm
     template_name = 'dashboard/badge_form.html'
     success_url = reverse_lazy('dashboard:badge_list')
 
-class BadgeUpdateView(AdminRequiredMixin, UpdateView):
+class BadgeUpdateView(AdminRequiredMixin, BadgeBackfillMixin, UpdateView):
     model = Badge
     form_class = BadgeForm
     template_name = 'dashboard/badge_form.html'
@@ -472,3 +506,72 @@ def toggle_unit_publish_status(request, pk):
     # Redirect the admin back to the list of units
     return redirect('dashboard:unit_list')
 
+
+@user_passes_test(is_admin)
+def unit_item_analysis_view(request, pk):
+    """
+    Item-analysis report of a unit: difficulty and discrimination of every question,
+    distractor selection rates and the KR-20 reliability of the unit.
+    """
+    unit = get_object_or_404(Unit.objects.select_related('grade'), pk=pk)
+    report, error = None, None
+    try:
+        report = get_item_analysis(unit)
+    except ImproperlyConfigured as exc:
+        error = str(exc)
+    return render(request, 'dashboard/unit_item_analysis.html', {'unit': unit, 'report': report, 'error': error})
+
+
+@user_passes_test(is_admin)
+def export_view(request):
+    """
+    Streams quiz results or student answers as CSV or JSON Lines, optionally gzipped.
+    Rows are read and written in chunks, so large exports never sit in memory.
+    """
+    form = ExportForm(request.GET or None)
+    if not request.GET or not form.is_valid():
+        return render(request, 'dashboard/export.html', {'form': form})
+
+    data = form.cleaned_data
+    queryset = export_queryset(
+        data['dataset'],
+        grade_id=data['grade'].id if data['grade'] else None,
+        unit_id=data['unit'].id if data['unit'] else None,
+        date_from=data['date_from'],
+        date_to=data['date_to'],
+    )
+    response = StreamingHttpResponse(
+        stream_export(queryset, data['dataset'], data['columns'], data['export_format'], data['compress']),
+        content_type='application/gzip' if data['compress'] else (
+            'text/csv; charset=utf-8' if data['export_format'] == 'csv' else 'application/x-ndjson; charset=utf-8'
+        ),
+    )
+    filename = export_filename(data['dataset'], data['export_format'], data['compress'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@user_passes_test(is_admin)
+def query_stats_view(request):
+    """
+    The views that run the most SQL queries per request, with their budgets.
+    """
+    # Figures of this process that have not been written yet.
+    recorder.flush()
+    rows = []
+    for stats in ViewQueryStats.objects.filter(requests__gt=0):
+        rows.append({
+            'stats': stats,
+            'budget': QUERY_BUDGETS.get(stats.view_name),
+            'over_budget': stats.view_name in QUERY_BUDGETS and stats.max_queries > QUERY_BUDGETS[stats.view_name],
+        })
+    rows.sort(key=lambda row: (row['stats'].average_queries, row['stats'].average_sql_ms), reverse=True)
+    return render(request, 'dashboard/query_stats.html', {'rows': rows})
+
+
+@user_passes_test(is_admin)
+@require_POST
+def query_stats_reset_view(request):
+    recorder.flush()
+    ViewQueryStats.objects.all().delete()
+    return redirect('dashboard:query_stats')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class QuizzesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.quizzes'
+
+    def ready(self):
+        # Connects the cache invalidation receivers (answer keys, badge rules).
+        from . import signals  # noqa: F401
@@ -0,0 +1,214 @@
+# /apps/quizzes/badges.py
+
+import operator
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q
+
+from .models import Badge, QuizResult, StudentBadge
+
+# Values a badge condition can test. Attempt metrics describe the submitted attempt,
+# student metrics are aggregates over all of the student's completed attempts
+# (including the one just submitted).
+METRICS = {
+    'score': "Score of this attempt (0-100)",
+    'time_ratio': "Time taken / time limit of this attempt (0-1)",
+    'completed_count': "Number of completed quizzes",
+    'average_score': "Average score over completed quizzes",
+    'perfect_count': "Number of quizzes with a score of 100",
+}
+
+OPERATORS = {
+    '==': operator.eq,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+}
+
+BADGE_RULES_CACHE_KEY = 'quizzes:badge_rules'
+
+
+def validate_conditions(conditions):
+    """
+    Checks that a badge's conditions are a list of {"metric", "op", "value"} objects.
+    """
+    if not isinstance(conditions, list):
+        raise ValidationError("Conditions must be a list.")
+    for condition in conditions:
+        if not isinstance(condition, dict) or set(condition) != {'metric', 'op', 'value'}:
+            raise ValidationError('Each condition needs exactly "metric", "op" and "value".')
+        if condition['metric'] not in METRICS:
+            raise ValidationError(f'Unknown metric "{condition["metric"]}". Use one of: {", ".join(METRICS)}.')
+        if condition['op'] not in OPERATORS:
+            raise ValidationError(f'Unknown operator "{condition["op"]}". Use one of: {", ".join(OPERATORS)}.')
+        if isinstance(condition['value'], bool) or not isinstance(condition['value'], (int, float)):
+            raise ValidationError("Condition values must be numbers.")
+
+
+def get_badge_rules():
+    """
+    Returns [(badge_id, award_mode, conditions), ...] for every badge that has rules.
+    Cached until a badge is saved or deleted.
+    """
+    rules = cache.get(BADGE_RULES_CACHE_KEY)
+    if rules is None:
+        rules = [
+            (badge_id, award_mode, conditions)
+            for badge_id, award_mode, conditions in Badge.objects.values_list('id', 'award_mode', 'conditions')
+            if conditions
+        ]
+        cache.set(BADGE_RULES_CACHE_KEY, rules, None)
+    return rules
+
+
+def invalidate_badge_rules():
+    cache.delete(BADGE_RULES_CACHE_KEY)
+
+
+def time_ratio(time_taken_seconds, duration_minutes):
+    if not time_taken_seconds or not duration_minutes:
+        return None
+    return time_taken_seconds / (duration_minutes * 60)
+
+
+def conditions_hold(conditions, metrics):
+    """
+    True when every condition holds for the given metric values.
+    A metric without a value (e.g. no time recorded) never satisfies a condition.
+    """
+    for condition in conditions:
+        value = metrics.get(condition['metric'])
+        if value is None or not OPERATORS[condition['op']](value, condition['value']):
+            return False
+    return True
+
+
+def matching_badges(metrics, rules=None):
+    """
+    Evaluates every badge rule against one set of metrics in a single pass.
+    Returns (once_badge_ids, repeat_badge_ids).
+    """
+    once_ids, repeat_ids = [], []
+    for badge_id, award_mode, conditions in (get_badge_rules() if rules is None else rules):
+        if conditions_hold(conditions, metrics):
+            (repeat_ids if award_mode == Badge.AwardMode.REPEAT else once_ids).append(badge_id)
+    return once_ids, repeat_ids
+
+
+def student_aggregates(student, as_of):
+    """
+    The student-level metrics as they were when an attempt completed at `as_of`,
+    computed with one aggregate query. Badge jobs may run after later submissions,
+    so attempts completed afterwards must not count.
+    """
+    return QuizResult.objects.filter(student=student, completed_at__lte=as_of).aggregate(
+        completed_count=Count('id'),
+        average_score=Avg('score'),
+        perfect_count=Count('id', filter=Q(score=100)),
+    )
+
+
+def award_badges(student, once_ids, repeat_ids):
+    """
+    Records the awarded badges. Repeatable badges are incremented with an
+    UPDATE ... SET count = count + 1, so concurrent awards never lose a count.
+    """
+    if not once_ids and not repeat_ids:
+        return
+    with transaction.atomic():
+        existing = set(
+            StudentBadge.objects.filter(student=student, badge_id__in=repeat_ids).values_list('badge_id', flat=True)
+        )
+        if existing:
+            StudentBadge.objects.filter(student=student, badge_id__in=existing).update(count=F('count') + 1)
+        new_ids = [badge_id for badge_id in once_ids + repeat_ids if badge_id not in existing]
+        StudentBadge.objects.bulk_create(
+            [StudentBadge(student=student, badge_id=badge_id) for badge_id in new_ids],
+            ignore_conflicts=True,
+        )
+
+
+def check_and_award_badges(student, quiz_result, aggregates=None):
+    """
+    Evaluates all badge rules for a freshly completed attempt and awards the matches.
+    `aggregates` are the student's StudentStats counters as of this attempt; they are
+    recomputed from the results when not given.
+    """
+    rules = get_badge_rules()
+    if not rules:
+        return
+    if aggregates is None:
+        aggregates = student_aggregates(student, quiz_result.completed_at)
+    metrics = {
+        'score': quiz_result.score,
+        'time_ratio': time_ratio(quiz_result.time_taken_seconds, quiz_result.unit.duration_minutes),
+        'completed_count': aggregates['completed_count'],
+        'average_score': aggregates['average_score'],
+        'perfect_count': aggregates['perfect_count'],
+    }
+    once_ids, repeat_ids = matching_badges(metrics, rules)
+    award_badges(student, once_ids, repeat_ids)
+
+
+def backfill_badges(badge_ids=None, batch_size=1000):
+    """
+    Re-evaluates badge rules for every student by replaying their completed attempts
+    in order, exactly as they would have been evaluated live, and writes the resulting
+    StudentBadge counters with batched upserts. Safe to run repeatedly.
+    Returns the number of StudentBadge rows written.
+    """
+    rules = [rule for rule in get_badge_rules() if badge_ids is None or rule[0] in badge_ids]
+    if not rules:
+        return 0
+
+    awards = {}
+
+    def replay(student_id, attempts):
+        completed_count = perfect_count = 0
+        score_sum = 0.0
+        for score, time_taken_seconds, duration_minutes in attempts:
+            completed_count += 1
+            score_sum += score
+            perfect_count += score == 100
+            metrics = {
+                'score': score,
+                'time_ratio': time_ratio(time_taken_seconds, duration_minutes),
+                'completed_count': completed_count,
+                'average_score': score_sum / completed_count,
+                'perfect_count': perfect_count,
+            }
+            once_ids, repeat_ids = matching_badges(metrics, rules)
+            for badge_id in once_ids:
+                awards[(student_id, badge_id)] = 1
+            for badge_id in repeat_ids:
+                awards[(student_id, badge_id)] = awards.get((student_id, badge_id), 0) + 1
+
+    results = QuizResult.objects.filter(completed_at__isnull=False, score__isnull=False).order_by(
+        'student_id', 'completed_at', 'id'
+    ).values_list('student_id', 'score', 'time_taken_seconds', 'unit__duration_minutes')
+
+    current_student, attempts = None, []
+    for student_id, score, time_taken_seconds, duration_minutes in results.iterator(chunk_size=batch_size):
+        if student_id != current_student:
+            if current_student is not None:
+                replay(current_student, attempts)
+            current_student, attempts = student_id, []
+        attempts.append((score, time_taken_seconds, duration_minutes))
+    if current_student is not None:
+        replay(current_student, attempts)
+
+    rows = [
+        StudentBadge(student_id=student_id, badge_id=badge_id, count=count)
+        for (student_id, badge_id), count in awards.items()
+    ]
+    StudentBadge.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student', 'badge'],
+        update_fields=['count'],
+    )
+    return len(rows)
@@ -0,0 +1,95 @@
+# /apps/quizzes/breakdown.py
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .grading import CHOICE_TYPES, MATCHING_TYPES, TEXT_TYPES
+from .models import Answer, MatchingPair
+
+# Whose answers the breakdown shows, as worded for each audience.
+OWNER_LABELS = {
+    'student': "Your",
+    'admin': "Student's",
+}
+
+
+def attempt_breakdown_cache_key(result_id, content_version, audience):
+    return f'quizzes:attempt_breakdown:{result_id}:{content_version}:{audience}'
+
+
+def load_attempt_breakdown(quiz_result):
+    """
+    Builds the per-question breakdown of an attempt in three queries, whatever the
+    number or type of questions:
+        [{'question', 'is_correct', 'student_answer', 'correct_answer', 'paired_answers'}, ...]
+    `paired_answers` lists (prompt, student's match or None) for matching questions.
+    """
+    student_answers = list(
+        quiz_result.student_answers.select_related('question', 'selected_answer').order_by('question__order', 'question_id')
+    )
+    question_ids = [sa.question_id for sa in student_answers]
+
+    correct_answers = {}
+    for answer in Answer.objects.filter(question_id__in=question_ids, is_correct=True, is_active=True).order_by('id'):
+        correct_answers.setdefault(answer.question_id, answer)
+
+    matching_ids = [sa.question_id for sa in student_answers if sa.question.question_type in MATCHING_TYPES]
+    pairs_by_question = {}
+    for pair in MatchingPair.objects.filter(question_id__in=matching_ids).order_by('id'):
+        pairs_by_question.setdefault(pair.question_id, []).append(pair)
+
+    breakdown = []
+    for sa in student_answers:
+        question = sa.question
+        detail = {
+            'question': question,
+            'is_correct': sa.is_correct,
+            'student_answer': None,
+            'correct_answer': None,
+            'paired_answers': None,
+        }
+        correct_answer = correct_answers.get(question.id)
+
+        if question.question_type in CHOICE_TYPES:
+            # A timed-out question has no selected option, only the "Time Out" text.
+            detail['student_answer'] = sa.selected_answer or sa.text_answer
+            detail['correct_answer'] = correct_answer
+
+        elif question.question_type in TEXT_TYPES:
+            detail['student_answer'] = sa.text_answer
+            detail['correct_answer'] = correct_answer.answer_text if correct_answer else None
+
+        elif question.question_type in MATCHING_TYPES:
+            prompts = pairs_by_question.get(question.id, [])
+            pairs_by_id = {pair.id: pair for pair in prompts}
+            student_matches = {}
+            if isinstance(sa.matching_answer, dict):
+                for prompt_id, match_id in sa.matching_answer.items():
+                    try:
+                        student_matches[int(prompt_id)] = int(match_id)
+                    except (TypeError, ValueError):
+                        continue
+            detail['paired_answers'] = [
+                (prompt, pairs_by_id.get(student_matches.get(prompt.id))) for prompt in prompts
+            ]
+
+        breakdown.append(detail)
+    return breakdown
+
+
+def render_attempt_breakdown(quiz_result, audience='student'):
+    """
+    Returns the rendered breakdown of a completed attempt. Completed attempts never
+    change, so the markup is cached without expiry, keyed by the attempt and the
+    content version of its unit.
+    """
+    key = attempt_breakdown_cache_key(quiz_result.id, quiz_result.unit.content_version, audience)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('quizzes/_attempt_breakdown.html', {
+            'detailed_answers': load_attempt_breakdown(quiz_result),
+            'owner': OWNER_LABELS[audience],
+        })
+        if quiz_result.completed_at:
+            cache.set(key, html, None)
+    return html
@@ -0,0 +1,131 @@
+# /apps/quizzes/difficulty.py
+
+import math
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Question, QuestionStats, QuizResult, StudentAnswer, UnitStats
+
+UNIT_STATS_FIELDS = ['grade', 'attempt_count', 'score_sum', 'average_score']
+QUESTION_STATS_FIELDS = ['unit', 'attempt_count', 'correct_count', 'success_rate']
+
+
+def record_graded_submission(unit, graded_answers, score):
+    """
+    Adds one graded submission to the unit and question counters with a constant
+    number of set-based statements. Call it inside the transaction that stores the answers.
+    """
+    correct_ids = [answer['question_id'] for answer in graded_answers if answer['is_correct']]
+    wrong_ids = [answer['question_id'] for answer in graded_answers if not answer['is_correct']]
+
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=answer['question_id'], unit_id=unit.id) for answer in graded_answers],
+        ignore_conflicts=True,
+    )
+    if correct_ids:
+        QuestionStats.objects.filter(question_id__in=correct_ids).update(
+            attempt_count=F('attempt_count') + 1,
+            correct_count=F('correct_count') + 1,
+            success_rate=(F('correct_count') + 1) * 100.0 / (F('attempt_count') + 1),
+        )
+    if wrong_ids:
+        QuestionStats.objects.filter(question_id__in=wrong_ids).update(
+            attempt_count=F('attempt_count') + 1,
+            success_rate=F('correct_count') * 100.0 / (F('attempt_count') + 1),
+        )
+
+    UnitStats.objects.bulk_create([UnitStats(unit_id=unit.id, grade_id=unit.grade_id)], ignore_conflicts=True)
+    UnitStats.objects.filter(unit_id=unit.id).update(
+        grade_id=unit.grade_id,
+        attempt_count=F('attempt_count') + 1,
+        score_sum=F('score_sum') + score,
+        average_score=(F('score_sum') + score) / (F('attempt_count') + 1.0),
+    )
+
+
+def _differs(current, expected, fields):
+    for field in fields:
+        attname = current._meta.get_field(field).attname
+        a, b = getattr(current, attname), getattr(expected, attname)
+        if isinstance(a, float) or isinstance(b, float):
+            if not math.isclose(a, b, abs_tol=1e-9):
+                return True
+        elif a != b:
+            return True
+    return False
+
+
+def _sync(model, key, expected, existing, fields):
+    """
+    Upserts the expected rows that are missing or differ and deletes rows that should
+    not exist. Returns the number of rows written or deleted.
+    """
+    changed = [row for pk, row in expected.items() if pk not in existing or _differs(existing[pk], row, fields)]
+    stale = [pk for pk in existing if pk not in expected]
+    model.objects.bulk_create(changed, update_conflicts=True, unique_fields=[key], update_fields=fields)
+    model.objects.filter(**{f'{key}_id__in': stale}).delete()
+    return len(changed) + len(stale)
+
+
+def rebuild_difficulty_tables(quiz_result_model, student_answer_model, question_model,
+                              unit_stats_model, question_stats_model, unit_ids=None):
+    """
+    Recomputes the unit and question counters from the raw results and answers with
+    grouped aggregate queries, writing only the rows that drifted.
+    Returns the number of fixed rows.
+    """
+    results = quiz_result_model.objects.filter(completed_at__isnull=False, score__isnull=False)
+    answers = student_answer_model.objects.all()
+    questions = question_model.objects.all()
+    unit_stats = unit_stats_model.objects.all()
+    question_stats = question_stats_model.objects.all()
+    if unit_ids is not None:
+        results = results.filter(unit_id__in=unit_ids)
+        answers = answers.filter(question__unit_id__in=unit_ids)
+        questions = questions.filter(unit_id__in=unit_ids)
+        unit_stats = unit_stats.filter(unit_id__in=unit_ids)
+        question_stats = question_stats.filter(unit_id__in=unit_ids)
+
+    expected_units = {}
+    for row in results.values('unit_id', 'unit__grade_id').annotate(attempts=Count('id'), score_sum=Sum('score')).order_by():
+        expected_units[row['unit_id']] = unit_stats_model(
+            unit_id=row['unit_id'],
+            grade_id=row['unit__grade_id'],
+            attempt_count=row['attempts'],
+            score_sum=row['score_sum'],
+            average_score=row['score_sum'] / row['attempts'],
+        )
+
+    answer_counts = {
+        row['question_id']: (row['attempts'], row['correct'])
+        for row in answers.values('question_id').annotate(
+            attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True))
+        ).order_by()
+    }
+    expected_questions = {}
+    for question_id, unit_id in questions.values_list('id', 'unit_id'):
+        attempts, correct = answer_counts.get(question_id, (0, 0))
+        if attempts:
+            expected_questions[question_id] = question_stats_model(
+                question_id=question_id,
+                unit_id=unit_id,
+                attempt_count=attempts,
+                correct_count=correct,
+                success_rate=correct * 100.0 / attempts,
+            )
+
+    with transaction.atomic():
+        fixed = _sync(unit_stats_model, 'unit', expected_units, {row.unit_id: row for row in unit_stats}, UNIT_STATS_FIELDS)
+        fixed += _sync(
+            question_stats_model, 'question', expected_questions,
+            {row.question_id: row for row in question_stats}, QUESTION_STATS_FIELDS,
+        )
+    return fixed
+
+
+def reconcile_difficulty_stats(unit_ids=None):
+    """
+    Fixes any drift between the difficulty counters and the raw answers.
+    """
+    return rebuild_difficulty_tables(QuizResult, StudentAnswer, Question, UnitStats, QuestionStats, unit_ids=unit_ids)
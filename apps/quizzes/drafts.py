@@ -0,0 +1,30 @@
+# /apps/quizzes/drafts.py
+
+from django.db import transaction
+
+from .models import QuizDraft
+
+
+def load_draft_answers(quiz_result):
+    """
+    Returns the autosaved answers of an attempt, keyed by question id (as a string).
+    """
+    return QuizDraft.objects.filter(quiz_result=quiz_result).values_list('answers', flat=True).first() or {}
+
+
+def merge_draft_answers(quiz_result, partial_answers):
+    """
+    Merges a batch of partial answers into the attempt's draft.
+
+    A slow autosave can overlap the next one, so the draft is locked before it is read:
+    the transaction starts with a write (creating the draft if it is missing), which on
+    SQLite holds the database's write lock until commit even with deferred transactions,
+    and select_for_update locks the row on other databases. The second autosave then
+    reads the first one's answers instead of overwriting them.
+    """
+    with transaction.atomic():
+        QuizDraft.objects.bulk_create([QuizDraft(quiz_result=quiz_result)], ignore_conflicts=True)
+        draft = QuizDraft.objects.select_for_update().get(quiz_result=quiz_result)
+        draft.answers.update(partial_answers)
+        draft.save(update_fields=['answers', 'updated_at'])
+    return draft.answers
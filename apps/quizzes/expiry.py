@@ -0,0 +1,112 @@
+# /apps/quizzes/expiry.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.academics.models import Unit
+from .difficulty import record_graded_submission
+from .grading import get_answer_key, grade_submission
+from .leaderboards import refresh_leaderboard_entries
+from .mistakes import record_mistakes
+from .models import QuizDraft, QuizResult, StudentAnswer
+from .stats import record_completed_attempt
+
+TIME_OUT_ANSWER = "Time Out"
+
+# Keeps IN (...) lists well below SQLite's bound variable limit.
+EXPIRY_BATCH_SIZE = 500
+
+
+def overdue_attempts(now=None):
+    """
+    Returns the in-progress attempts whose time limit (start_time + unit.duration_minutes)
+    has passed. Durations are few, so one cutoff is computed per distinct duration and
+    the filter stays a plain indexed comparison on start_time.
+    """
+    now = now or timezone.now()
+    in_progress = QuizResult.objects.filter(completed_at__isnull=True)
+    durations = in_progress.values_list('unit__duration_minutes', flat=True).distinct()
+
+    overdue = QuizResult.objects.none()
+    for duration in durations:
+        overdue = overdue | in_progress.filter(
+            unit__duration_minutes=duration,
+            start_time__lte=now - timedelta(minutes=duration),
+        )
+    return overdue
+
+
+def grade_timed_out_attempt(answer_key, draft_answers):
+    """
+    Grades an attempt that ran out of time from its autosaved answers, as the submission
+    would have. The questions the draft does not answer get a "Time Out" answer.
+    Returns a (graded_answers, score) tuple.
+    """
+    graded_answers, correct_count = grade_submission(answer_key, draft_answers)
+    for graded in graded_answers:
+        if str(graded['question_id']) not in draft_answers:
+            graded.update(selected_answer_id=None, text_answer=TIME_OUT_ANSWER, matching_answer=None, is_correct=False)
+    score = correct_count / len(graded_answers) * 100 if graded_answers else 0
+    return graded_answers, score
+
+
+def expire_attempts(attempts, now=None):
+    """
+    Closes the given in-progress attempts, grading each from its autosaved draft with
+    "Time Out" for the questions it does not answer. The attempts and answers are
+    written set-based (one UPDATE per distinct score and one bulk INSERT per batch); each
+    closed attempt is added to its student's stats and its unit's difficulty counters
+    like a submission.
+    Returns the number of closed attempts.
+    """
+    now = now or timezone.now()
+    pending = list(attempts.filter(completed_at__isnull=True).values_list('id', 'unit_id', 'student_id', 'time_taken_seconds'))
+    closed = 0
+
+    for start in range(0, len(pending), EXPIRY_BATCH_SIZE):
+        batch = pending[start:start + EXPIRY_BATCH_SIZE]
+        result_ids = [result_id for result_id, *_ in batch]
+        units = Unit.objects.in_bulk({unit_id for _, unit_id, *_ in batch})
+
+        with transaction.atomic():
+            drafts = dict(QuizDraft.objects.filter(quiz_result_id__in=result_ids).values_list('quiz_result_id', 'answers'))
+            graded = {
+                result_id: grade_timed_out_attempt(get_answer_key(units[unit_id]), drafts.get(result_id) or {})
+                for result_id, unit_id, *_ in batch
+            }
+            by_score = {}
+            for result_id, (_, score) in graded.items():
+                by_score.setdefault(score, []).append(result_id)
+
+            # The UPDATEs only touch attempts that are still open, so a concurrent
+            # submission is never overwritten. The rows they closed carry this sweep's timestamp.
+            updated = sum(
+                QuizResult.objects.filter(id__in=ids, completed_at__isnull=True).update(score=score, completed_at=now)
+                for score, ids in by_score.items()
+            )
+            if not updated:
+                continue
+            closed += updated
+            still_open = set(
+                QuizResult.objects.filter(id__in=result_ids, completed_at=now).values_list('id', flat=True)
+            )
+
+            StudentAnswer.objects.bulk_create([
+                StudentAnswer(quiz_result_id=result_id, **answer)
+                for result_id in still_open for answer in graded[result_id][0]
+            ])
+            record_mistakes(still_open)
+            # Deleted only now: the draft was graded into the answers above.
+            QuizDraft.objects.filter(quiz_result_id__in=still_open).delete()
+            student_ids = set()
+            for result_id, unit_id, student_id, time_taken in batch:
+                if result_id in still_open:
+                    graded_answers, score = graded[result_id]
+                    record_completed_attempt(student_id, units[unit_id].grade_id, score, time_taken, now)
+                    record_graded_submission(units[unit_id], graded_answers, score)
+                    student_ids.add(student_id)
+            refresh_leaderboard_entries(student_ids)
+
+    return closed
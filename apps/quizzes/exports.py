@@ -0,0 +1,127 @@
+# /apps/quizzes/exports.py
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from .models import QuizResult, StudentAnswer
+
+EXPORT_CHUNK_SIZE = 2000
+
+# dataset -> {column: ORM lookup}. The column order is the default export order.
+EXPORT_COLUMNS = {
+    'results': {
+        'result_id': 'id',
+        'student_id': 'student_id',
+        'username': 'student__username',
+        'grade': 'unit__grade__name',
+        'unit_id': 'unit_id',
+        'unit_title': 'unit__title',
+        'score': 'score',
+        'time_taken_seconds': 'time_taken_seconds',
+        'start_time': 'start_time',
+        'completed_at': 'completed_at',
+    },
+    'answers': {
+        'answer_id': 'id',
+        'result_id': 'quiz_result_id',
+        'student_id': 'quiz_result__student_id',
+        'username': 'quiz_result__student__username',
+        'grade': 'question__unit__grade__name',
+        'unit_id': 'question__unit_id',
+        'unit_title': 'question__unit__title',
+        'question_id': 'question_id',
+        'question_type': 'question__question_type',
+        'selected_answer_id': 'selected_answer_id',
+        'text_answer': 'text_answer',
+        'matching_answer': 'matching_answer',
+        'is_correct': 'is_correct',
+        'completed_at': 'quiz_result__completed_at',
+    },
+}
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def export_queryset(dataset, grade_id=None, unit_id=None, date_from=None, date_to=None):
+    """
+    The completed results (or their answers) matching the filters, in primary-key order.
+    `date_from`/`date_to` are inclusive dates on the completion time.
+    """
+    if dataset == 'results':
+        queryset, prefix = QuizResult.objects.all(), ''
+    else:
+        queryset, prefix = StudentAnswer.objects.all(), 'quiz_result__'
+
+    queryset = queryset.filter(**{f'{prefix}completed_at__isnull': False})
+    if grade_id:
+        queryset = queryset.filter(**{f'{prefix}unit__grade_id': grade_id})
+    if unit_id:
+        queryset = queryset.filter(**{f'{prefix}unit_id': unit_id})
+    if date_from:
+        queryset = queryset.filter(**{f'{prefix}completed_at__date__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{prefix}completed_at__date__lte': date_to})
+    return queryset.order_by('pk')
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (dict, list)) else _plain(value)
+            for value in row
+        ])
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False))
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queryset, dataset, columns=None, export_format='csv', compress=False):
+    """
+    Yields the export as encoded byte chunks. Rows are fetched from the database in
+    chunks with .iterator(), and each output chunk is produced as soon as its rows are
+    read, so memory use does not grow with the size of the export.
+    """
+    available = EXPORT_COLUMNS[dataset]
+    columns = list(columns or available)
+    rows = queryset.values_list(*[available[column] for column in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    chunks = _csv_chunks(columns, rows) if export_format == 'csv' else _jsonl_chunks(columns, rows)
+    encoded = (chunk.encode('utf-8') for chunk in chunks)
+    return _gzipped(encoded) if compress else encoded
+
+
+def export_filename(dataset, export_format, compress):
+    return f'{dataset}.{export_format}' + ('.gz' if compress else '')
@@ -0,0 +1,153 @@
+# /apps/quizzes/grading.py
+
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+
+from apps.academics.models import Unit
+from .models import Answer
+from .rendering import question_cards_cache_key
+
+CHOICE_TYPES = ('MCQ', 'MCQI', 'TF')
+TEXT_TYPES = ('SA', 'FITB')
+MATCHING_TYPES = ('MATCH', 'MATI')
+
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+def normalize_text_answer(value):
+    """
+    Normalizes a short answer / fill in the blank answer for comparison.
+    """
+    return (value or '').strip().lower()
+
+
+def answer_key_cache_key(unit_id, content_version):
+    return f'quizzes:answer_key:{unit_id}:{content_version}'
+
+
+def build_answer_key(unit):
+    """
+    Compiles the answer key of a unit into plain Python structures.
+
+    The key only holds ids and normalized strings so it can be pickled into
+    any cache backend:
+        questions:       [(question_id, question_type), ...] in quiz order
+        choice_ids:      {question_id: {answer ids belonging to the question}}
+        correct_ids:     {question_id: {correct answer ids}}
+        text_answers:    {question_id: normalized correct text}
+        matching_pairs:  {question_id: {matching pair ids}}
+    """
+    questions = unit.questions.prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.filter(is_active=True)), 'matching_pairs',
+    ).order_by('order', 'id')
+
+    answer_key = {
+        'questions': [],
+        'choice_ids': {},
+        'correct_ids': {},
+        'text_answers': {},
+        'matching_pairs': {},
+    }
+    for question in questions:
+        answer_key['questions'].append((question.id, question.question_type))
+        answers = list(question.answers.all())
+
+        if question.question_type in CHOICE_TYPES:
+            answer_key['choice_ids'][question.id] = {a.id for a in answers}
+            answer_key['correct_ids'][question.id] = {a.id for a in answers if a.is_correct}
+
+        elif question.question_type in TEXT_TYPES:
+            correct_answer = next((a for a in answers if a.is_correct), None)
+            if correct_answer and correct_answer.answer_text:
+                answer_key['text_answers'][question.id] = normalize_text_answer(correct_answer.answer_text)
+
+        elif question.question_type in MATCHING_TYPES:
+            answer_key['matching_pairs'][question.id] = {p.id for p in question.matching_pairs.all()}
+
+    return answer_key
+
+
+def get_answer_key(unit):
+    """
+    Returns the compiled answer key of a unit, building and caching it on a miss.
+    The cache key includes the unit's content version, so edits to the unit's
+    questions are never graded against a stale key.
+    """
+    key = answer_key_cache_key(unit.id, unit.content_version)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = build_answer_key(unit)
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def invalidate_unit_content(unit_id):
+    """
+    Bumps the content version of a unit and drops the cached data built from it.
+    """
+    if unit_id is None:
+        return
+    current_version = Unit.objects.filter(pk=unit_id).values_list('content_version', flat=True).first()
+    if current_version is None:
+        return
+    Unit.objects.filter(pk=unit_id).update(content_version=F('content_version') + 1)
+    cache.delete_many([
+        answer_key_cache_key(unit_id, current_version),
+        question_cards_cache_key(unit_id, current_version),
+    ])
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade_submission(answer_key, submitted_answers):
+    """
+    Grades a submission against a compiled answer key without touching the database.
+
+    Returns a (graded_answers, correct_count) tuple. Each graded answer is a dict
+    with the StudentAnswer field values for one question, in quiz order.
+    """
+    graded_answers = []
+    correct_count = 0
+
+    for question_id, question_type in answer_key['questions']:
+        submitted = submitted_answers.get(str(question_id))
+        graded = {
+            'question_id': question_id,
+            'selected_answer_id': None,
+            'text_answer': None,
+            'matching_answer': None,
+            'is_correct': False,
+        }
+
+        if question_type in CHOICE_TYPES:
+            answer_id = _to_int(submitted)
+            if answer_id in answer_key['choice_ids'].get(question_id, ()):
+                graded['selected_answer_id'] = answer_id
+                graded['is_correct'] = answer_id in answer_key['correct_ids'][question_id]
+
+        elif question_type in TEXT_TYPES:
+            text_answer = str(submitted or '').strip()
+            graded['text_answer'] = text_answer
+            correct_text = answer_key['text_answers'].get(question_id)
+            graded['is_correct'] = correct_text is not None and text_answer.lower() == correct_text
+
+        elif question_type in MATCHING_TYPES:
+            matching_answers = submitted if isinstance(submitted, dict) else {}
+            graded['matching_answer'] = matching_answers
+            pair_ids = answer_key['matching_pairs'].get(question_id, set())
+            matched_ids = {
+                _to_int(prompt_id) for prompt_id, match_id in matching_answers.items()
+                if str(prompt_id) == str(match_id)
+            }
+            graded['is_correct'] = bool(pair_ids) and pair_ids <= matched_ids
+
+        if graded['is_correct']:
+            correct_count += 1
+        graded_answers.append(graded)
+
+    return graded_answers, correct_count
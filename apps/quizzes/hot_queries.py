@@ -0,0 +1,108 @@
+# /apps/quizzes/hot_queries.py
+
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from apps.core.queryplans import register_hot_query
+from .leaderboards import neighbour_candidates, rank_count
+from .models import LeaderboardEntry, QuizResult, StudentAnswer, StudentBadge
+
+
+@register_hot_query('quizzes.open_attempt')
+def open_attempt():
+    # take_quiz, autosave_quiz and submit_quiz look up the student's attempt at a unit.
+    return QuizResult.objects.filter(student_id=1, unit_id=1, completed_at__isnull=True)
+
+
+@register_hot_query('quizzes.completed_attempt')
+def completed_attempt():
+    return QuizResult.objects.filter(student_id=1, unit_id=1, completed_at__isnull=False)
+
+
+@register_hot_query('quizzes.student_attempted_units')
+def student_attempted_units():
+    # The unit map of academics:unit_list.
+    return QuizResult.objects.filter(student_id=1).values_list('unit_id', flat=True)
+
+
+@register_hot_query('quizzes.student_recent_results')
+def student_recent_results():
+    # The activity list of academics:student_profile.
+    return QuizResult.objects.filter(
+        student_id=1, unit__grade_id=1, completed_at__isnull=False, score__isnull=False,
+    ).select_related('unit').order_by('-completed_at')[:5]
+
+
+@register_hot_query('quizzes.student_aggregates')
+def student_aggregates():
+    # The badge check (see badges.student_aggregates).
+    return QuizResult.objects.filter(student_id=1, completed_at__lte=timezone.now()).values('student_id').annotate(
+        completed_count=Count('id'), average_score=Avg('score'), perfect_count=Count('id', filter=Q(score=100)),
+    )
+
+
+@register_hot_query('quizzes.overdue_attempts')
+def overdue_attempts():
+    # One of the per-duration filters of expiry.overdue_attempts, run by the sweeper every minute.
+    return QuizResult.objects.filter(
+        completed_at__isnull=True, unit__duration_minutes=10, start_time__lte=timezone.now() - timedelta(minutes=10),
+    )
+
+
+@register_hot_query('quizzes.unit_completed_attempts')
+def unit_completed_attempts():
+    # Item analysis reads the completed attempts of one unit.
+    return QuizResult.objects.filter(unit_id=1, completed_at__isnull=False).order_by('id').values_list('id', flat=True)
+
+
+@register_hot_query('quizzes.attempt_answers')
+def attempt_answers():
+    # The per-question breakdown of an attempt.
+    return StudentAnswer.objects.filter(quiz_result_id=1).select_related('question', 'selected_answer').order_by(
+        'question__order', 'question_id'
+    )
+
+
+@register_hot_query('quizzes.question_answer_counts')
+def question_answer_counts():
+    # The difficulty counters rebuilt for a few units (see difficulty.rebuild_difficulty_tables).
+    return StudentAnswer.objects.filter(question_id__in=[1, 2, 3]).values('question_id').annotate(
+        attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True)),
+    ).order_by()
+
+
+# The version stamps of the ETags of student pages (see stamps.py), run on every visit.
+@register_hot_query('quizzes.attempts_stamp')
+def attempts_stamp():
+    return QuizResult.objects.filter(student_id=1).values('student_id').annotate(
+        count=Count('id'), last_id=Max('id'), last_completed_at=Max('completed_at'),
+    ).order_by()
+
+
+@register_hot_query('quizzes.badges_stamp')
+def badges_stamp():
+    return StudentBadge.objects.filter(student_id=1).values('student_id').annotate(
+        badges=Count('id'), awarded=Sum('count'), last_id=Max('id'),
+    ).order_by()
+
+
+# "My rank and neighbours" on each board (see leaderboards.student_positions).
+def _leaderboard_entry():
+    return LeaderboardEntry(grade_id=1, student_id=1, average_score=50, completed_count=3, average_perfect_time=60)
+
+
+@register_hot_query('quizzes.leaderboard_rank')
+def leaderboard_rank():
+    return rank_count(_leaderboard_entry(), 'top_scorers')
+
+
+@register_hot_query('quizzes.leaderboard_neighbours')
+def leaderboard_neighbours():
+    return neighbour_candidates(_leaderboard_entry(), 'fastest_solvers', neighbours=2)
+
+
+@register_hot_query('quizzes.leaderboard_stamp')
+def leaderboard_stamp():
+    return LeaderboardEntry.objects.filter(grade_id=1).values('grade_id').annotate(count=Count('id'), last_id=Max('id')).order_by()
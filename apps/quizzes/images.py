@@ -0,0 +1,24 @@
+# /apps/quizzes/images.py
+
+from apps.core.images import refresh_variants
+from .models import Answer, Badge, MatchingPair
+
+# model -> {image field: bounding boxes of its derivatives}. Each field stores the
+# result in `<field>_variants`. The boxes cover the size the templates display the
+# image at and twice that for high density screens.
+IMAGE_VARIANTS = {
+    Answer: {'answer_image': (320, 640)},
+    MatchingPair: {'prompt_image': (160, 320), 'match_image': (160, 320)},
+    Badge: {'icon': (96, 192)},
+}
+
+
+def refresh_image_variants(instance, force=False):
+    """
+    Refreshes the derivatives of every image field of an instance.
+    Returns True when any of them changed.
+    """
+    changed = False
+    for field_name, boxes in IMAGE_VARIANTS[type(instance)].items():
+        changed |= refresh_variants(instance, field_name, boxes, force=force)
+    return changed
@@ -0,0 +1,144 @@
+# /apps/quizzes/item_analysis.py
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the item-analysis reports.
+    np = None
+
+from .grading import CHOICE_TYPES
+from .models import Answer, Question, QuizResult, StudentAnswer, UnitStats
+
+ITEM_ANALYSIS_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def item_analysis_cache_key(unit_id, content_version, attempt_count):
+    # The attempt count grows with every submission, so a new submission (or a
+    # content change) moves the report to a new key.
+    return f'quizzes:item_analysis:{unit_id}:{content_version}:{attempt_count}'
+
+
+def _correlations(items, totals):
+    """
+    Pearson correlation of every column of `items` (attempts x questions, 0/1)
+    with the matching column of `totals`, computed for all columns at once.
+    Columns without variance get NaN.
+    """
+    items_centered = items - items.mean(axis=0)
+    totals_centered = totals - totals.mean(axis=0)
+    covariance = (items_centered * totals_centered).mean(axis=0)
+    spread = items.std(axis=0) * totals.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(spread > 0, covariance / spread, np.nan)
+
+
+def _nullable(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def build_item_analysis(unit):
+    """
+    Classical item analysis of a unit's completed attempts:
+      - difficulty: share of attempts that answered the question correctly,
+      - discrimination: point-biserial correlation between the question and the rest
+        of the test (total score without that question),
+      - distractors: how often each option of a choice question was selected,
+      - reliability: KR-20 of the whole unit.
+    Answers are loaded once into NumPy arrays; all statistics are array operations.
+    """
+    if np is None:
+        raise ImproperlyConfigured("Item analysis requires NumPy. Install it with `pip install numpy`.")
+
+    questions = list(Question.objects.filter(unit=unit).order_by('order', 'id').values('id', 'question_text', 'question_type'))
+    result_ids = np.fromiter(
+        QuizResult.objects.filter(unit=unit, completed_at__isnull=False).order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    report = {
+        'attempt_count': int(result_ids.size),
+        'question_count': len(questions),
+        'kr20': None,
+        'mean_score': None,
+        'questions': [],
+    }
+    if not questions or not result_ids.size:
+        return report
+
+    question_ids = np.array([question['id'] for question in questions], dtype=np.int64)
+    rows = StudentAnswer.objects.filter(
+        quiz_result__unit=unit, quiz_result__completed_at__isnull=False, question__unit=unit
+    ).values_list('quiz_result_id', 'question_id', 'is_correct', 'selected_answer_id')
+    answers = np.array(
+        [(result_id, question_id, is_correct, selected or 0) for result_id, question_id, is_correct, selected in rows.iterator(chunk_size=5000)],
+        dtype=np.int64,
+    ).reshape(-1, 4)
+
+    # attempts x questions matrix of correct answers; missing answers count as wrong.
+    answer_rows = np.searchsorted(result_ids, answers[:, 0])
+    answer_cols = np.searchsorted(question_ids, answers[:, 1])
+    items = np.zeros((result_ids.size, question_ids.size), dtype=np.float64)
+    items[answer_rows, answer_cols] = answers[:, 2]
+
+    totals = items.sum(axis=1)
+    difficulty = items.mean(axis=0)
+    rest_scores = totals[:, None] - items
+    discrimination = _correlations(items, rest_scores)
+
+    question_count = question_ids.size
+    total_variance = totals.var()
+    if question_count > 1 and total_variance > 0:
+        report['kr20'] = float(
+            question_count / (question_count - 1) * (1 - (difficulty * (1 - difficulty)).sum() / total_variance)
+        )
+    report['mean_score'] = float(totals.mean() / question_count * 100)
+
+    # Option selection counts for every choice question in one pass.
+    options = list(
+        Answer.objects.filter(question__unit=unit, question__question_type__in=CHOICE_TYPES)
+        .order_by('question_id', 'id')
+        .values('id', 'question_id', 'answer_text', 'answer_image', 'is_correct')
+    )
+    option_counts = {}
+    selected = answers[answers[:, 3] > 0, 3]
+    if selected.size:
+        option_ids, counts = np.unique(selected, return_counts=True)
+        option_counts = dict(zip(option_ids.tolist(), counts.tolist()))
+    options_by_question = {}
+    for option in options:
+        count = option_counts.get(option['id'], 0)
+        options_by_question.setdefault(option['question_id'], []).append({
+            'id': option['id'],
+            'text': option['answer_text'] or option['answer_image'] or f"Option {option['id']}",
+            'is_correct': option['is_correct'],
+            'count': count,
+            'rate': count / result_ids.size,
+        })
+
+    for index, question in enumerate(questions):
+        report['questions'].append({
+            'id': question['id'],
+            'number': index + 1,
+            'text': question['question_text'],
+            'type': question['question_type'],
+            'difficulty': float(difficulty[index]),
+            'discrimination': _nullable(discrimination[index]),
+            'options': options_by_question.get(question['id'], []),
+        })
+    return report
+
+
+def get_item_analysis(unit):
+    """
+    Returns the cached item-analysis report of a unit, computing it when a new
+    submission (or a content change) has arrived since it was last built.
+    """
+    attempt_count = UnitStats.objects.filter(unit=unit).values_list('attempt_count', flat=True).first() or 0
+    key = item_analysis_cache_key(unit.id, unit.content_version, attempt_count)
+    report = cache.get(key)
+    if report is None:
+        report = build_item_analysis(unit)
+        cache.set(key, report, ITEM_ANALYSIS_TIMEOUT)
+    return report
@@ -0,0 +1,25 @@
+# /apps/quizzes/jobs.py
+
+from apps.core.jobs import register_job
+from .models import QuizResult
+from .badges import backfill_badges, check_and_award_badges
+
+
+@register_job('quizzes.award_badges')
+def award_badges_job(result_id, aggregates=None):
+    """
+    Awards the badges earned by a completed quiz attempt.
+    `aggregates` are the student's stats captured when the attempt completed.
+    """
+    result = QuizResult.objects.select_related('student', 'unit').filter(pk=result_id).first()
+    if result is None or result.completed_at is None:
+        return
+    check_and_award_badges(result.student, result, aggregates=aggregates)
+
+
+@register_job('quizzes.backfill_badges')
+def backfill_badges_job(badge_ids=None):
+    """
+    Re-evaluates badge rules over every student's history (e.g. after a badge is added).
+    """
+    backfill_badges(badge_ids=badge_ids)
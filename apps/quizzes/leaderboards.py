@@ -0,0 +1,168 @@
+# /apps/quizzes/leaderboards.py
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import LeaderboardEntry, StudentStats
+
+# board -> (ordering, filter). Every ordering ends with the student id so positions
+# are unique, and matches one of the LeaderboardEntry indexes.
+BOARDS = {
+    'top_scorers': (('-average_score', '-completed_count', 'student_id'), Q()),
+    'most_active': (('-completed_count', '-average_score', 'student_id'), Q()),
+    'fastest_solvers': (('average_perfect_time', 'student_id'), Q(average_perfect_time__isnull=False)),
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def _entry_rows(stats_model, student_ids=None):
+    """
+    The leaderboard values of every student who has completed a quiz and belongs to a grade.
+    """
+    stats = stats_model.objects.filter(
+        completed_count__gt=0,
+        student__user_type='STUDENT',
+        student__grade__isnull=False,
+    )
+    if student_ids is not None:
+        stats = stats.filter(student_id__in=student_ids)
+    return stats.values('student_id', 'student__grade_id', 'average_score', 'completed_count', 'average_perfect_time')
+
+
+def rebuild_leaderboard_table(stats_model, entry_model, student_ids=None):
+    """
+    Rewrites the leaderboard rows of the given students (or everyone) from their stats.
+    """
+    with transaction.atomic():
+        stale = entry_model.objects.all()
+        if student_ids is not None:
+            stale = stale.filter(student_id__in=student_ids)
+        stale.delete()
+        entry_model.objects.bulk_create(
+            (
+                entry_model(
+                    student_id=row['student_id'],
+                    grade_id=row['student__grade_id'],
+                    average_score=row['average_score'],
+                    completed_count=row['completed_count'],
+                    average_perfect_time=row['average_perfect_time'],
+                )
+                for row in _entry_rows(stats_model, student_ids).iterator()
+            ),
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+
+
+def refresh_leaderboard_entries(student_ids):
+    """
+    Brings the leaderboard rows of a few students in line with their stats and current grade.
+    """
+    rebuild_leaderboard_table(StudentStats, LeaderboardEntry, student_ids=list(student_ids))
+
+
+def rebuild_leaderboards():
+    """
+    Recomputes every leaderboard from StudentStats.
+    """
+    rebuild_leaderboard_table(StudentStats, LeaderboardEntry)
+
+
+def _beyond(ordering, entry, ahead):
+    """
+    Filters that together match the entries placed before (ahead=True) or after `entry`
+    on a board. Comparing the ordering fields lexicographically, each one fixes a prefix
+    of them and bounds the next, so each is a single range of the board's index.
+    """
+    equal = {}
+    filters = []
+    for field in ordering:
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        value = getattr(entry, name)
+        lookup = 'gt' if descending == ahead else 'lt'
+        filters.append(Q(**equal, **{f'{name}__{lookup}': value}))
+        equal[name] = value
+    return filters
+
+
+def _reversed(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _sort_key(ordering):
+    # Every ordering field is numeric, so descending fields sort on their negation.
+    def key(entry):
+        return tuple(
+            -getattr(entry, field[1:]) if field.startswith('-') else getattr(entry, field)
+            for field in ordering
+        )
+    return key
+
+
+def board_entries(grade, board):
+    ordering, board_filter = BOARDS[board]
+    return LeaderboardEntry.objects.filter(board_filter, grade=grade).order_by(*ordering)
+
+
+def top_entries(grade, board, limit=10):
+    return board_entries(grade, board).select_related('student')[:limit]
+
+
+def rank_count(entry, board):
+    """
+    The entries placed before `entry` on a board, counted over one index range per
+    ordering field (see _beyond), so the database only reads the index entries ahead.
+    """
+    ordering, _ = BOARDS[board]
+    entries = board_entries(entry.grade_id, board).order_by()
+    ranges = [entries.filter(condition).values('pk') for condition in _beyond(ordering, entry, ahead=True)]
+    return ranges[0].union(*ranges[1:], all=True)
+
+
+def neighbour_candidates(entry, board, neighbours):
+    """
+    The entries that can be among the `neighbours` nearest ones on each side of `entry`:
+    the first few of each index range of _beyond, read from where the range starts.
+    """
+    ordering, _ = BOARDS[board]
+    entries = board_entries(entry.grade_id, board)
+    nearest = Q(pk__in=[])
+    for condition in _beyond(ordering, entry, ahead=True):
+        nearest |= Q(pk__in=entries.filter(condition).order_by(*_reversed(ordering)).values('pk')[:neighbours])
+    for condition in _beyond(ordering, entry, ahead=False):
+        nearest |= Q(pk__in=entries.filter(condition).values('pk')[:neighbours])
+    return LeaderboardEntry.objects.filter(nearest).select_related('student')
+
+
+def _position(entry, board, neighbours):
+    ordering, _ = BOARDS[board]
+    rank = rank_count(entry, board).count() + 1
+    key = _sort_key(ordering)
+    candidates = sorted(neighbour_candidates(entry, board, neighbours), key=key)
+    above = [candidate for candidate in candidates if key(candidate) < key(entry)][-neighbours:][::-1]
+    below = [candidate for candidate in candidates if key(candidate) > key(entry)][:neighbours]
+
+    positioned = [(rank - offset, neighbour) for offset, neighbour in enumerate(above, start=1)][::-1]
+    positioned.append((rank, entry))
+    positioned += [(rank + offset, neighbour) for offset, neighbour in enumerate(below, start=1)]
+    return {'rank': rank, 'entries': positioned}
+
+
+def student_positions(student, neighbours=2):
+    """
+    Returns {board: {'rank': n, 'entries': [(rank, entry), ...]}} with the student and up
+    to `neighbours` entries on each side, or {board: None} for boards the student is not on.
+    Ranks are counts over ranges of the board's index, and neighbours come from the
+    start of those ranges, so neither reads the rest of the board.
+    """
+    entry = LeaderboardEntry.objects.filter(student=student).first()
+    positions = dict.fromkeys(BOARDS)
+    if entry is None:
+        return positions
+    entry.student = student
+    for board in BOARDS:
+        if board == 'fastest_solvers' and entry.average_perfect_time is None:
+            continue
+        positions[board] = _position(entry, board, neighbours)
+    return positions
@@ -0,0 +1,25 @@
+# /apps/quizzes/management/commands/backfill_badges.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quizzes.badges import backfill_badges
+from apps.quizzes.models import Badge
+
+
+class Command(BaseCommand):
+    help = "Re-evaluates badge rules against every student's completed quizzes and updates their badges."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--badge', action='append', dest='slugs', help='Only backfill the badge with this slug (can be repeated).')
+
+    def handle(self, *args, **options):
+        badge_ids = None
+        if options['slugs']:
+            badges = dict(Badge.objects.filter(slug__in=options['slugs']).values_list('slug', 'id'))
+            missing = set(options['slugs']) - set(badges)
+            if missing:
+                raise CommandError(f'Unknown badge slug(s): {", ".join(sorted(missing))}')
+            badge_ids = list(badges.values())
+
+        written = backfill_badges(badge_ids=badge_ids)
+        self.stdout.write(self.style.SUCCESS(f'Backfill finished: {written} student badge record(s) written.'))
@@ -0,0 +1,251 @@
+# /apps/quizzes/management/commands/benchmark_concurrent_submits.py
+
+import json
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.academics.models import Grade, Unit
+from apps.core.scratch import copy_database, scratch_database
+from apps.core.staticfiles import in_process_settings
+from apps.quizzes.grading import CHOICE_TYPES, MATCHING_TYPES, get_answer_key, grade_submission
+from apps.quizzes.models import Answer, MatchingPair, Question, QuizResult
+from apps.quizzes.submissions import submission_writer
+from apps.users.models import User
+
+# The database settings of each mode. "default" forces the rollback journal, since WAL
+# is stored in the database file and would otherwise carry over from a WAL database.
+MODES = {
+    'default': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'}},
+    'production': settings.SQLITE_PRODUCTION_DATABASE,
+}
+
+
+class Command(BaseCommand):
+    help = ('Measures the throughput of concurrent quiz submissions with the default SQLite settings and with '
+            'the production SQLite mode (SQLITE_PRODUCTION_MODE). Runs against a scratch copy of the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Students submitting at the same time.')
+        parser.add_argument('--rounds', type=int, default=10, help='Quizzes each student takes and submits.')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+        parser.add_argument('--modes', type=str, default='default,production', help='Comma separated modes to compare.')
+        parser.add_argument('--queue-batch-sizes', type=str, default='',
+                            help='Also run every mode with the submission queue (SUBMISSION_QUEUE_ENABLED), '
+                                 'once per comma separated batch size.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite settings; the default database is not SQLite.')
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(unknown)}. Known: {", ".join(MODES)}.')
+        self.workers = max(1, options['workers'])
+        self.rounds = max(1, options['rounds'])
+        self.questions = max(1, options['questions'])
+        runs = [(mode, None) for mode in modes]
+        for batch_size in options['queue_batch_sizes'].split(','):
+            if batch_size.strip():
+                runs += [(mode, max(1, int(batch_size))) for mode in modes]
+
+        scratch_dir = tempfile.mkdtemp(prefix='benchmark_submits_')
+        try:
+            with in_process_settings():
+                reports = {
+                    mode if batch_size is None else f'{mode} queue/{batch_size}': self.run_mode(mode, scratch_dir, batch_size)
+                    for mode, batch_size in runs
+                }
+            writer_reports = {
+                f'{mode} queue/{batch_size}': self.measure_writer(mode, scratch_dir, batch_size)
+                for mode, batch_size in runs if batch_size is not None
+            }
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        self.stdout.write(f'\n{self.workers} students x {self.rounds} quizzes of {self.questions} questions')
+        self.stdout.write(
+            f'{"mode":<24} {"submits/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9} {"errors":>7} {"locked":>7} {"busy":>5}'
+        )
+        for mode, report in reports.items():
+            self.stdout.write(
+                f'{mode:<24} {report["throughput"]:>10.1f} {report["p50_ms"]:>9.1f} {report["p95_ms"]:>9.1f} '
+                f'{report["max_ms"]:>9.1f} {report["errors"]:>7} {report["locked"]:>7} {report["busy"]:>5}'
+            )
+        if 'default' in reports and 'production' in reports and reports['default']['throughput']:
+            speedup = reports['production']['throughput'] / reports['default']['throughput']
+            self.stdout.write(self.style.SUCCESS(f'Production mode: {speedup:.2f}x the submit throughput of the default mode.'))
+        if writer_reports:
+            self.stdout.write(f'\nWriter thread alone, {self.workers * self.rounds} queued submissions')
+            self.stdout.write(f'{"mode":<24} {"submits/s":>10}')
+            for mode, throughput in writer_reports.items():
+                self.stdout.write(f'{mode:<24} {throughput:>10.1f}')
+
+    def run_mode(self, mode, scratch_dir, batch_size=None):
+        """
+        Runs the workload on a fresh copy of the database with the settings of `mode`,
+        through the submission queue when `batch_size` is given.
+        """
+        self.stdout.write(f'Running the "{mode}" mode' + (f' with the queue (batch size {batch_size})...' if batch_size else '...'))
+        path = copy_database(scratch_dir, f'{mode}_{batch_size or 0}')
+        queue_settings = {'SUBMISSION_QUEUE_ENABLED': batch_size is not None, 'SUBMISSION_BATCH_SIZE': batch_size or 1}
+        with scratch_database(path, **MODES[mode]), override_settings(**queue_settings):
+            # All copies have the same ids, so cached entries of the previous run would match.
+            cache.clear()
+            units, students = self.create_fixtures()
+            barrier = threading.Barrier(self.workers + 1)
+            timings, failures, busy = [], [], []
+            lock = threading.Lock()
+            threads = [
+                threading.Thread(target=self.worker, args=(student, units, barrier, timings, failures, busy, lock))
+                for student in students
+            ]
+            for thread in threads:
+                thread.start()
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            # The writer thread holds a connection to this copy.
+            submission_writer.stop()
+
+        timings.sort()
+        return {
+            'throughput': len(timings) / elapsed if elapsed else 0,
+            'p50_ms': statistics.median(timings) if timings else 0,
+            'p95_ms': timings[max(0, int(len(timings) * 0.95) - 1)] if timings else 0,
+            'max_ms': timings[-1] if timings else 0,
+            'errors': len(failures),
+            'locked': sum('locked' in failure for failure in failures),
+            'busy': len(busy),
+        }
+
+    def measure_writer(self, mode, scratch_dir, batch_size):
+        """
+        The throughput of the writer thread alone: every attempt of the workload is
+        graded up front and queued at once, and the time until all are committed is measured.
+        """
+        self.stdout.write(f'Measuring the writer thread in the "{mode}" mode (batch size {batch_size})...')
+        path = copy_database(scratch_dir, f'{mode}_writer_{batch_size}')
+        total = self.workers * self.rounds
+        queue_settings = {'SUBMISSION_QUEUE_ENABLED': True, 'SUBMISSION_BATCH_SIZE': batch_size, 'SUBMISSION_QUEUE_SIZE': total}
+        with scratch_database(path, **MODES[mode]), override_settings(**queue_settings):
+            cache.clear()
+            units, students = self.create_fixtures()
+            submissions = []
+            for unit, answers in units:
+                graded_answers, correct_count = grade_submission(get_answer_key(unit), answers)
+                for student in students:
+                    result = QuizResult.objects.create(student=student, unit=unit)
+                    submissions.append({
+                        'result': result, 'unit': unit, 'student_id': student.id, 'graded_answers': graded_answers,
+                        'score': correct_count / len(graded_answers) * 100, 'time_taken': 60, 'completed_at': timezone.now(),
+                    })
+            started = time.perf_counter()
+            futures = [submission_writer.submit(**submission) for submission in submissions]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - started
+            submission_writer.stop()
+        return total / elapsed if elapsed else 0
+
+    def create_fixtures(self):
+        grade = Grade.objects.create(name=f'__benchmark__ {time.time_ns()}')
+        units = []
+        for number in range(1, self.rounds + 1):
+            unit = Unit.objects.create(grade=grade, title=f'Benchmark unit {number}', unit_number=number, is_published=True)
+            questions = Question.objects.bulk_create([
+                Question(unit=unit, question_text=f'Question {n + 1}', question_type=('MCQ', 'SA', 'MATCH')[n % 3], order=n + 1)
+                for n in range(self.questions)
+            ])
+            Answer.objects.bulk_create(
+                [Answer(question=question, answer_text=text, is_correct=text == 'right')
+                 for question in questions if question.question_type == 'MCQ' for text in ('right', 'wrong')]
+                + [Answer(question=question, answer_text='4', is_correct=True)
+                   for question in questions if question.question_type == 'SA']
+            )
+            MatchingPair.objects.bulk_create([
+                MatchingPair(question=question, prompt_text=f'p{n}', match_text=f'm{n}')
+                for question in questions if question.question_type == 'MATCH' for n in range(3)
+            ])
+            units.append((unit, self.correct_answers(unit)))
+        password = make_password(None)
+        students = User.objects.bulk_create([
+            User(username=f'__benchmark__{grade.id}_{n}', grade=grade, user_type=User.UserType.STUDENT, password=password)
+            for n in range(self.workers)
+        ])
+        return units, students
+
+    def correct_answers(self, unit):
+        answer_key = get_answer_key(unit)
+        submitted = {}
+        for question in unit.questions.prefetch_related('matching_pairs'):
+            if question.question_type in CHOICE_TYPES:
+                submitted[str(question.id)] = str(min(answer_key['correct_ids'][question.id]))
+            elif question.question_type in MATCHING_TYPES:
+                submitted[str(question.id)] = {str(pair.id): str(pair.id) for pair in question.matching_pairs.all()}
+            else:
+                submitted[str(question.id)] = answer_key['text_answers'][question.id]
+        return submitted
+
+    def worker(self, student, units, barrier, timings, failures, busy, lock):
+        """
+        One student taking every unit's quiz and submitting it as fast as possible,
+        sending a submission again after the Retry-After delay of a 503 like the quiz page.
+        The connection handling of a real request (reuse or close, health check) is
+        repeated around every request, since the test client skips it.
+        """
+        try:
+            client = Client(raise_request_exception=False)
+            client.force_login(student)
+            close_old_connections()
+            barrier.wait()
+            for unit, answers in units:
+                close_old_connections()
+                response = client.get(reverse('quizzes:take_quiz', args=[unit.id]))
+                close_old_connections()
+                if response.status_code != 200:
+                    with lock:
+                        failures.append(response.content.decode(errors='replace'))
+                    continue
+                started = time.perf_counter()
+                while True:
+                    response = client.post(
+                        reverse('quizzes:submit_quiz', args=[unit.id]),
+                        json.dumps({'answers': answers, 'time_taken_seconds': 60}),
+                        content_type='application/json',
+                    )
+                    close_old_connections()
+                    if response.status_code != 503:
+                        break
+                    with lock:
+                        busy.append(unit.id)
+                    time.sleep(int(response['Retry-After']))
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    if response.status_code == 200:
+                        timings.append(elapsed)
+                    else:
+                        failures.append(response.content.decode(errors='replace'))
+        except Exception as exc:
+            barrier.abort()
+            with lock:
+                failures.append(str(exc))
+        finally:
+            connection.close()
@@ -0,0 +1,106 @@
+# /apps/quizzes/management/commands/benchmark_submit.py
+
+import json
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.academics.models import Grade, Unit
+from apps.core.scratch import copy_database, scratch_database
+from apps.quizzes.models import Question, Answer, QuizResult, MatchingPair
+from apps.quizzes.views import submit_quiz_view
+from apps.users.models import User
+
+QUESTION_TYPES = ['MCQ', 'TF', 'SA', 'FITB', 'MATCH']
+
+
+class Command(BaseCommand):
+    help = ('Measures submit_quiz_view latency as the number of questions per unit grows. '
+            'Runs against a scratch copy of the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='10,20,40,80,160', help='Comma separated question counts to benchmark.')
+        parser.add_argument('--repeats', type=int, default=5, help='Number of submissions per size.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark runs against a copy of the SQLite database; the default database is not SQLite.')
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        repeats = max(options['repeats'], 1)
+
+        # Benchmark data is written to a copy of the database, which is deleted afterwards.
+        # It is not wrapped in an outer transaction so that commit costs are part of the timings.
+        scratch_dir = tempfile.mkdtemp(prefix='benchmark_submit_')
+        try:
+            with scratch_database(copy_database(scratch_dir, 'submit')):
+                self.run_sizes(sizes, repeats)
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def run_sizes(self, sizes, repeats):
+        grade = Grade.objects.create(name=f'__benchmark__ {time.time_ns()}')
+        self.stdout.write(f'{"questions":>10} {"median ms":>10} {"min ms":>10} {"max ms":>10} {"queries":>8}')
+        for size in sizes:
+            unit = self._create_unit(grade, size)
+            timings, queries = [], 0
+            for repeat in range(repeats):
+                student = User(username=f'__benchmark__{grade.id}_{size}_{repeat}', grade=grade)
+                student.set_unusable_password()
+                student.save()
+                QuizResult.objects.create(student=student, unit=unit)
+                request = RequestFactory().post(
+                    f'/quizzes/unit/{unit.id}/submit/',
+                    data=json.dumps({'answers': self._build_answers(unit), 'time_taken_seconds': 60}),
+                    content_type='application/json',
+                )
+                request.user = student
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = submit_quiz_view(request, unit.id)
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    self.stdout.write(self.style.ERROR(f'Submission failed: {response.content.decode()}'))
+                queries = len(ctx)
+
+            self.stdout.write(
+                f'{size:>10} {statistics.median(timings):>10.2f} {min(timings):>10.2f} '
+                f'{max(timings):>10.2f} {queries:>8}'
+            )
+
+    def _create_unit(self, grade, size):
+        unit = Unit.objects.create(grade=grade, title=f'Benchmark unit ({size} questions)', unit_number=size, is_published=True)
+        questions = Question.objects.bulk_create([
+            Question(unit=unit, question_text=f'Question {i + 1}', question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)], order=i + 1)
+            for i in range(size)
+        ])
+        answers, pairs = [], []
+        for question in questions:
+            if question.question_type in ('MCQ', 'TF'):
+                answers += [
+                    Answer(question=question, answer_text='correct', is_correct=True),
+                    Answer(question=question, answer_text='wrong'),
+                ]
+            elif question.question_type in ('SA', 'FITB'):
+                answers.append(Answer(question=question, answer_text='42', is_correct=True))
+            else:
+                pairs += [MatchingPair(question=question, prompt_text=f'p{n}', match_text=f'm{n}') for n in range(4)]
+        Answer.objects.bulk_create(answers)
+        MatchingPair.objects.bulk_create(pairs)
+        return unit
+
+    def _build_answers(self, unit):
+        submitted = {}
+        for question in unit.questions.prefetch_related('answers', 'matching_pairs'):
+            if question.question_type in ('MCQ', 'TF'):
+                submitted[str(question.id)] = str(question.answers.all()[0].id)
+            elif question.question_type in ('SA', 'FITB'):
+                submitted[str(question.id)] = '42'
+            else:
+                submitted[str(question.id)] = {str(p.id): str(p.id) for p in question.matching_pairs.all()}
+        return submitted
@@ -0,0 +1,39 @@
+# /apps/quizzes/management/commands/build_image_variants.py
+
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.quizzes.grading import invalidate_unit_content
+from apps.quizzes.images import IMAGE_VARIANTS, refresh_image_variants
+from apps.quizzes.models import Answer, MatchingPair
+
+
+class Command(BaseCommand):
+    help = ('Builds the resized WebP and fallback copies of answer, matching and badge images that were '
+            'uploaded before derivatives existed (new uploads get them when they are saved).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild the derivatives of every image, not only the missing ones.')
+
+    def handle(self, *args, **options):
+        changed_units = set()
+        for model, fields in IMAGE_VARIANTS.items():
+            # Rows with at least one image (the fields are NULL or empty without one).
+            images = model.objects.filter(reduce(or_, (Q(**{f'{field}__gt': ''}) for field in fields))).order_by('pk')
+            if model in (Answer, MatchingPair):
+                images = images.select_related('question')
+            changed = 0
+            for instance in images.iterator(chunk_size=100):
+                if refresh_image_variants(instance, force=options['force']):
+                    changed += 1
+                    if model in (Answer, MatchingPair):
+                        changed_units.add(instance.question.unit_id)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {changed} updated')
+
+        # The question cards are cached with the image markup in them.
+        for unit_id in changed_units:
+            invalidate_unit_content(unit_id)
+        self.stdout.write(self.style.SUCCESS(f'Image derivatives are up to date; {len(changed_units)} units refreshed.'))
@@ -0,0 +1,26 @@
+# /apps/quizzes/management/commands/expire_quiz_attempts.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.quizzes.expiry import expire_attempts, overdue_attempts
+
+
+class Command(BaseCommand):
+    help = 'Closes every in-progress quiz attempt whose time limit has passed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and sweep again every INTERVAL seconds (e.g. as an always-on task). By default the command sweeps once and exits.'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            closed = expire_attempts(overdue_attempts())
+            self.stdout.write(self.style.SUCCESS(f'Closed {closed} expired quiz attempt(s).'))
+            if interval <= 0:
+                break
+            time.sleep(interval)
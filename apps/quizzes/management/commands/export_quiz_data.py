@@ -0,0 +1,59 @@
+# /apps/quizzes/management/commands/export_quiz_data.py
+
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.quizzes.exports import EXPORT_COLUMNS, EXPORT_FORMATS, export_queryset, stream_export
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}"; use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Streams completed quiz results or student answers as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=sorted(EXPORT_COLUMNS), default='results')
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip.')
+        parser.add_argument('--columns', type=str, help='Comma-separated columns to export (default: all).')
+        parser.add_argument('--grade', type=int, help='Only attempts of units in this grade (id).')
+        parser.add_argument('--unit', type=int, help='Only attempts of this unit (id).')
+        parser.add_argument('--date-from', type=parse_date, help='Only attempts completed on or after this date.')
+        parser.add_argument('--date-to', type=parse_date, help='Only attempts completed on or before this date.')
+        parser.add_argument('--output', '-o', type=str, help='File to write to (default: standard output).')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        columns = [column.strip() for column in (options['columns'] or '').split(',') if column.strip()]
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS[dataset]]
+        if unknown:
+            raise CommandError(
+                f'Unknown columns: {", ".join(unknown)}. Available: {", ".join(EXPORT_COLUMNS[dataset])}.'
+            )
+
+        queryset = export_queryset(
+            dataset,
+            grade_id=options['grade'],
+            unit_id=options['unit'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+        )
+        chunks = stream_export(queryset, dataset, columns, options['export_format'], options['gzip'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f'Export written to {options["output"]}.'))
+        else:
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
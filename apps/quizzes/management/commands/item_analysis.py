@@ -0,0 +1,46 @@
+# /apps/quizzes/management/commands/item_analysis.py
+
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academics.models import Unit
+from apps.quizzes.item_analysis import build_item_analysis, get_item_analysis
+
+
+class Command(BaseCommand):
+    help = 'Prints the item-analysis report (difficulty, discrimination, distractors, KR-20) of a unit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('unit_id', type=int)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--fresh', action='store_true', help='Recompute the report instead of using the cached one.')
+
+    def handle(self, *args, **options):
+        try:
+            unit = Unit.objects.get(pk=options['unit_id'])
+        except Unit.DoesNotExist:
+            raise CommandError(f'Unit {options["unit_id"]} does not exist.')
+        try:
+            report = build_item_analysis(unit) if options['fresh'] else get_item_analysis(unit)
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+            return
+
+        def fmt(value, digits=2):
+            return '-' if value is None else f'{value:.{digits}f}'
+
+        self.stdout.write(f'{unit.title}: {report["attempt_count"]} attempt(s), {report["question_count"]} question(s)')
+        self.stdout.write(f'Mean score: {fmt(report["mean_score"], 1)}%   KR-20: {fmt(report["kr20"])}')
+        for question in report['questions']:
+            self.stdout.write(
+                f'{question["number"]:>3}. difficulty {fmt(question["difficulty"])}  '
+                f'discrimination {fmt(question["discrimination"])}  {question["text"][:60]}'
+            )
+            for option in question['options']:
+                marker = '*' if option['is_correct'] else ' '
+                self.stdout.write(f'       {marker} {option["rate"] * 100:5.1f}%  {option["text"][:50]}')
@@ -0,0 +1,342 @@
+# /apps/quizzes/management/commands/loadtest_classroom.py
+
+import http.cookiejar
+import json
+import math
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from contextlib import nullcontext
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from apps.academics.models import Unit
+from apps.core.models import Job
+from apps.core.scratch import copy_database, scratch_database
+from apps.core.staticfiles import in_process_settings
+from apps.quizzes.difficulty import reconcile_difficulty_stats
+from apps.quizzes.grading import CHOICE_TYPES, MATCHING_TYPES
+from apps.quizzes.models import QuizResult
+from apps.quizzes.submissions import submission_writer
+from apps.users.models import User
+
+ENDPOINTS = ('login', 'unit_list', 'take_quiz', 'submit_quiz')
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+PASSWORD = 'load-test-password'
+USERNAME_PREFIX = '__loadtest__'
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Outcome:
+    """
+    The result of one request: latency, whether it succeeded and whether it hit a SQLite lock.
+    """
+    __slots__ = ('endpoint', 'ms', 'ok', 'locked', 'detail')
+
+    def __init__(self, endpoint, ms, ok, locked=False, detail=''):
+        self.endpoint, self.ms, self.ok, self.locked, self.detail = endpoint, ms, ok, locked, detail
+
+
+def _is_lock_error(text):
+    text = text.lower()
+    return any(message in text for message in LOCK_MESSAGES)
+
+
+class InProcessSession:
+    """
+    Sends requests through the WSGI handler in this process with the test client.
+    A server error comes back as a 500 response, like from a real server; its body is
+    the exception, so lock errors are recognized.
+    """
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, data=None, json_body=None):
+        if method == 'GET':
+            response = self.client.get(path)
+        elif json_body is not None:
+            response = self.client.post(path, json.dumps(json_body), content_type='application/json')
+        else:
+            response = self.client.post(path, data)
+        if response.exc_info:
+            _, exc, _ = response.exc_info
+            return response.status_code, '', f'{type(exc).__name__}: {exc}'
+        return response.status_code, response.get('Location', ''), response.content.decode('utf-8', 'replace')
+
+    def close(self):
+        # Each simulated student runs in its own thread with its own database connection.
+        connections.close_all()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """
+    Sends requests to a running server, keeping cookies and the CSRF token like a browser.
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None, json_body=None):
+        url = self.base_url + path
+        headers = {'Referer': url}
+        body = None
+        if method == 'POST':
+            headers['X-CSRFToken'] = self._csrf_token()
+            if json_body is not None:
+                body = json.dumps(json_body).encode()
+                headers['Content-Type'] = 'application/json'
+            else:
+                body = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': self._csrf_token()}).encode()
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = urllib.request.Request(url, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=120) as response:
+                return response.status, response.headers.get('Location', ''), response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get('Location', ''), exc.read().decode('utf-8', 'replace')
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = ('Simulates a class of students logging in, opening a quiz and submitting it at the same moment, '
+            'and reports latency percentiles, error rates and SQLite lock errors per endpoint. '
+            'Without --url it runs against a scratch copy of the database. With --url it writes to the '
+            "server's database: students named __loadtest__..., their attempts, stats, leaderboard rows and "
+            'queued badge jobs, which are deleted at the end unless --keep-users is given. A run that is killed '
+            'leaves them behind; --remove-leftovers deletes them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=30, help='Number of concurrent students.')
+        parser.add_argument('--unit', type=int, help='The unit to take (default: the first published unit with questions).')
+        parser.add_argument('--url', type=str, help='Base URL of a running server, e.g. http://127.0.0.1:8000. '
+                                                    'Without it requests go through the WSGI app in this process.')
+        parser.add_argument('--think-time', type=float, default=0, help='Seconds between opening the quiz and submitting it.')
+        parser.add_argument('--keep-users', action='store_true',
+                            help='With --url, keep the generated students and their attempts.')
+        parser.add_argument('--remove-leftovers', action='store_true',
+                            help='Only delete the students and jobs left behind by earlier --url runs, then exit.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        if options['remove_leftovers']:
+            usernames = list(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('username', flat=True))
+            self._remove_students(usernames)
+            self.stdout.write(f'Removed {len(usernames)} load test student(s).')
+            return
+        if options['url']:
+            # The server writes to its own database; the generated students are removed afterwards.
+            report = self.run(options)
+        else:
+            if connection.vendor != 'sqlite':
+                raise CommandError('Without --url the load test runs against a copy of the SQLite database; '
+                                   'the default database is not SQLite.')
+            scratch_dir = tempfile.mkdtemp(prefix='loadtest_classroom_')
+            try:
+                with scratch_database(copy_database(scratch_dir, 'loadtest')):
+                    try:
+                        report = self.run(options)
+                    finally:
+                        # The submission queue's writer thread holds a connection to the copy.
+                        submission_writer.stop()
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+    def run(self, options):
+        students = max(1, options['students'])
+        unit = self._pick_unit(options['unit'])
+        answers = self._answer_pool(unit)
+
+        # The generated students share one password hash so setup stays quick.
+        tag = uuid.uuid4().hex[:8]
+        usernames = [f'{USERNAME_PREFIX}{tag}_{n}' for n in range(students)]
+        password_hash = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=username, grade_id=unit.grade_id, user_type=User.UserType.STUDENT, password=password_hash)
+            for username in usernames
+        ])
+
+        paths = {
+            'login': reverse('users:login'),
+            'unit_list': reverse('academics:unit_list'),
+            'take_quiz': reverse('quizzes:take_quiz', args=[unit.id]),
+            'submit_quiz': reverse('quizzes:submit_quiz', args=[unit.id]),
+        }
+        outcomes, lock = [], threading.Lock()
+        # Every phase starts for the whole class at once, like a bell ringing.
+        barrier = threading.Barrier(students)
+
+        def student(username):
+            session = HttpSession(options['url']) if options['url'] else InProcessSession()
+            alive = True
+            try:
+                for endpoint in ENDPOINTS:
+                    barrier.wait()
+                    if endpoint == 'submit_quiz' and options['think_time']:
+                        time.sleep(options['think_time'])
+                    if not alive:
+                        continue
+                    outcome = self._step(session, endpoint, paths, username, answers, options['think_time'])
+                    with lock:
+                        outcomes.append(outcome)
+                    alive = outcome.ok
+            except threading.BrokenBarrierError:
+                pass  # Another student's thread failed; the run is reported as aborted.
+            except Exception:
+                # Releases the students waiting for this one, who would otherwise wait forever.
+                barrier.abort()
+                raise
+            finally:
+                session.close()
+
+        self.stderr.write(f'Running {students} student(s) against {options["url"] or "the in-process WSGI app"} on "{unit.title}"...')
+        in_process = nullcontext() if options['url'] else in_process_settings()
+        try:
+            with in_process:
+                started = time.perf_counter()
+                threads = [threading.Thread(target=student, args=(username,)) for username in usernames]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall_time = time.perf_counter() - started
+                if barrier.broken:
+                    self.stderr.write(self.style.ERROR('A student thread failed; the run stopped early and the report is incomplete.'))
+        finally:
+            # A scratch copy is deleted as a whole.
+            if options['url'] and not options['keep_users']:
+                self._remove_students(usernames)
+
+        return self._report(outcomes, students, wall_time)
+
+    def _remove_students(self, usernames):
+        """
+        Deletes generated students with their attempts, stats and leaderboard rows, drops the
+        badge jobs queued for their attempts and rebuilds the counters of the units they took.
+        """
+        results = QuizResult.objects.filter(student__username__in=usernames)
+        result_ids = list(results.values_list('id', flat=True))
+        unit_ids = list(results.values_list('unit_id', flat=True).distinct())
+        Job.objects.filter(name='quizzes.award_badges', payload__result_id__in=result_ids).delete()
+        User.objects.filter(username__in=usernames).delete()
+        if unit_ids:
+            reconcile_difficulty_stats(unit_ids)
+
+    def _pick_unit(self, unit_id):
+        units = Unit.objects.filter(is_published=True, questions__isnull=False).distinct().order_by('grade__name', 'unit_number', 'id')
+        if unit_id:
+            units = units.filter(pk=unit_id)
+        unit = units.first()
+        if unit is None:
+            raise CommandError('No published unit with questions was found.' if not unit_id else
+                               f'Unit {unit_id} does not exist, is not published or has no questions.')
+        return unit
+
+    def _answer_pool(self, unit):
+        """
+        For each question, the values a student might submit, so attempts get varied scores.
+        """
+        pool = {}
+        for question in unit.questions.prefetch_related('answers', 'matching_pairs'):
+            if question.question_type in CHOICE_TYPES:
+                pool[str(question.id)] = [str(answer.id) for answer in question.answers.all()]
+            elif question.question_type in MATCHING_TYPES:
+                ids = [str(pair.id) for pair in question.matching_pairs.all()]
+                pool[str(question.id)] = [dict(zip(ids, ids)), dict(zip(ids, reversed(ids)))]
+            else:
+                pool[str(question.id)] = [answer.answer_text for answer in question.answers.all()] + ['?']
+        return pool
+
+    def _step(self, session, endpoint, paths, username, answers, think_time):
+        started = time.perf_counter()
+        try:
+            if endpoint == 'login':
+                session.request('GET', paths['login'])  # Fetches the CSRF cookie; not timed.
+                started = time.perf_counter()
+                status, location, body = session.request('POST', paths['login'], data={'username': username, 'password': PASSWORD})
+                ok = status == 302 and paths['login'] not in location
+            elif endpoint == 'submit_quiz':
+                submitted = {question_id: random.choice(values) for question_id, values in answers.items() if values}
+                status, location, body = session.request(
+                    'POST', paths['submit_quiz'], json_body={'answers': submitted, 'time_taken_seconds': int(think_time)}
+                )
+                ok = status == 200 and '"success": true' in body
+            else:
+                status, location, body = session.request('GET', paths[endpoint])
+                ok = status == 200
+        except Exception as exc:
+            ms = (time.perf_counter() - started) * 1000
+            return Outcome(endpoint, ms, False, _is_lock_error(str(exc)), f'{type(exc).__name__}: {exc}')
+        ms = (time.perf_counter() - started) * 1000
+        return Outcome(endpoint, ms, ok, not ok and _is_lock_error(body), '' if ok else f'HTTP {status}')
+
+    def _report(self, outcomes, students, wall_time):
+        report = {'students': students, 'wall_time_seconds': round(wall_time, 3), 'endpoints': {}}
+        for endpoint in ENDPOINTS:
+            results = [outcome for outcome in outcomes if outcome.endpoint == endpoint]
+            timings = sorted(outcome.ms for outcome in results)
+            errors = [outcome for outcome in results if not outcome.ok]
+            report['endpoints'][endpoint] = {
+                'requests': len(results),
+                'errors': len(errors),
+                'error_rate': len(errors) / len(results) if results else 0,
+                'lock_errors': sum(outcome.locked for outcome in errors),
+                'p50_ms': percentile(timings, 50),
+                'p95_ms': percentile(timings, 95),
+                'p99_ms': percentile(timings, 99),
+                'max_ms': timings[-1] if timings else None,
+                'sample_errors': sorted({outcome.detail for outcome in errors})[:3],
+            }
+        return report
+
+    def _print_report(self, report):
+        def ms(value):
+            return '-' if value is None else f'{value:.1f}'
+
+        self.stdout.write(f'{report["students"]} student(s), {report["wall_time_seconds"]:.2f}s wall time')
+        self.stdout.write(
+            f'{"endpoint":<12} {"requests":>8} {"errors":>7} {"err %":>6} {"locked":>7} '
+            f'{"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}'
+        )
+        for endpoint, row in report['endpoints'].items():
+            line = (
+                f'{endpoint:<12} {row["requests"]:>8} {row["errors"]:>7} {row["error_rate"] * 100:>6.1f} {row["lock_errors"]:>7} '
+                f'{ms(row["p50_ms"]):>9} {ms(row["p95_ms"]):>9} {ms(row["p99_ms"]):>9} {ms(row["max_ms"]):>9}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+            for detail in row['sample_errors']:
+                self.stdout.write(f'    {detail}')
@@ -0,0 +1,26 @@
+# /apps/quizzes/management/commands/rebuild_leaderboards.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.quizzes.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every grade leaderboard from the per-student statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and rebuild again every INTERVAL seconds. By default the command rebuilds once and exits.'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            rebuild_leaderboards()
+            self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt.'))
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,16 @@
+# /apps/quizzes/management/commands/rebuild_student_stats.py
+
+from django.core.management.base import BaseCommand
+
+from apps.quizzes.stats import rebuild_student_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-student statistics tables from the raw quiz results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', dest='student_ids', help='Only rebuild the stats of this student id (can be repeated).')
+
+    def handle(self, *args, **options):
+        rebuild_student_stats(student_ids=options['student_ids'])
+        self.stdout.write(self.style.SUCCESS('Student statistics rebuilt.'))
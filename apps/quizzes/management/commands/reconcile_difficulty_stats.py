@@ -0,0 +1,16 @@
+# /apps/quizzes/management/commands/reconcile_difficulty_stats.py
+
+from django.core.management.base import BaseCommand
+
+from apps.quizzes.difficulty import reconcile_difficulty_stats
+
+
+class Command(BaseCommand):
+    help = 'Recounts the per-unit and per-question difficulty counters from the raw answers and fixes any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unit', type=int, action='append', dest='unit_ids', help='Only reconcile this unit id (can be repeated).')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_difficulty_stats(unit_ids=options['unit_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Fixed {fixed} difficulty counter row(s).'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:43
+
+import apps.quizzes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quizresult_start_time_alter_quizresult_completed_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='shuffle_seed',
+            field=models.PositiveIntegerField(default=apps.quizzes.models.generate_shuffle_seed, editable=False),
+        ),
+    ]
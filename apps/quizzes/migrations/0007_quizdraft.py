@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quizresult_shuffle_seed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz_result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='draft', to='quizzes.quizresult')),
+            ],
+        ),
+    ]
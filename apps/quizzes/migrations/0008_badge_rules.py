@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+# The rules that used to be hardcoded in check_and_award_badges.
+LEGACY_BADGE_RULES = {
+    'perfect_score': ('REPEAT', [{'metric': 'score', 'op': '==', 'value': 100}]),
+    'persistent_learner': ('REPEAT', [{'metric': 'completed_count', 'op': '==', 'value': 5}]),
+    'pro_student': ('ONCE', [{'metric': 'average_score', 'op': '>=', 'value': 90}]),
+    'rocket_solver': ('REPEAT', [
+        {'metric': 'time_ratio', 'op': '<', 'value': 0.5},
+        {'metric': 'score', 'op': '>=', 'value': 80},
+    ]),
+}
+
+
+def set_legacy_rules(apps, schema_editor):
+    Badge = apps.get_model('quizzes', 'Badge')
+    for slug, (award_mode, conditions) in LEGACY_BADGE_RULES.items():
+        Badge.objects.filter(slug=slug).update(award_mode=award_mode, conditions=conditions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_quizdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='badge',
+            name='award_mode',
+            field=models.CharField(choices=[('ONCE', 'Award once'), ('REPEAT', 'Award every time (counter)')], default='ONCE', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='badge',
+            name='conditions',
+            field=models.JSONField(blank=True, default=list, help_text='All conditions must hold, e.g. [{"metric": "score", "op": ">=", "value": 80}, {"metric": "time_ratio", "op": "<", "value": 0.5}].'),
+        ),
+        migrations.RunPython(set_legacy_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def populate_stats(apps, schema_editor):
+    """
+    Fills the new stats tables from the completed results. A frozen copy of
+    apps.quizzes.stats.rebuild_stats_tables as it was when this migration was written,
+    so later changes to the app do not change what the migration does.
+    """
+    QuizResult = apps.get_model('quizzes', 'QuizResult')
+    StudentStats = apps.get_model('quizzes', 'StudentStats')
+    StudentGradeStats = apps.get_model('quizzes', 'StudentGradeStats')
+
+    completed = QuizResult.objects.filter(completed_at__isnull=False, score__isnull=False)
+    perfect = Q(score=100)
+    perfect_timed = Q(score=100, time_taken_seconds__gt=0)
+    aggregates = {
+        'completed_count': Count('id'),
+        'score_sum': Sum('score'),
+        'perfect_count': Count('id', filter=perfect),
+        'perfect_time_sum': Sum('time_taken_seconds', filter=perfect_timed),
+        'perfect_time_count': Count('id', filter=perfect_timed),
+        'fastest_perfect_time': Min('time_taken_seconds', filter=perfect_timed),
+        'last_completed_at': Max('completed_at'),
+    }
+
+    def build(row):
+        values = {key: row[key] for key in aggregates}
+        values['perfect_time_sum'] = values['perfect_time_sum'] or 0
+        values['average_score'] = values['score_sum'] / values['completed_count']
+        if values['perfect_time_count']:
+            values['average_perfect_time'] = values['perfect_time_sum'] / values['perfect_time_count']
+        return values
+
+    overall = completed.values('student_id').annotate(**aggregates).order_by()
+    per_grade = completed.values('student_id', 'unit__grade_id').annotate(**aggregates).order_by()
+    StudentStats.objects.bulk_create(
+        (StudentStats(student_id=row['student_id'], **build(row)) for row in overall.iterator()),
+        batch_size=1000,
+    )
+    StudentGradeStats.objects.bulk_create(
+        (StudentGradeStats(student_id=row['student_id'], grade_id=row['unit__grade_id'], **build(row)) for row in per_grade.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+        ('quizzes', '0008_badge_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('perfect_count', models.PositiveIntegerField(default=0)),
+                ('perfect_time_sum', models.PositiveBigIntegerField(default=0)),
+                ('perfect_time_count', models.PositiveIntegerField(default=0)),
+                ('average_perfect_time', models.FloatField(blank=True, null=True)),
+                ('fastest_perfect_time', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentGradeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('perfect_count', models.PositiveIntegerField(default=0)),
+                ('perfect_time_sum', models.PositiveBigIntegerField(default=0)),
+                ('perfect_time_count', models.PositiveIntegerField(default=0)),
+                ('average_perfect_time', models.FloatField(blank=True, null=True)),
+                ('fastest_perfect_time', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_stats', to='academics.grade')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'grade')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_leaderboards(apps, schema_editor):
+    """
+    Fills the leaderboard from the stats of every student who has completed a quiz and
+    belongs to a grade. A frozen copy of apps.quizzes.leaderboards.rebuild_leaderboard_table
+    as it was when this migration was written.
+    """
+    StudentStats = apps.get_model('quizzes', 'StudentStats')
+    LeaderboardEntry = apps.get_model('quizzes', 'LeaderboardEntry')
+
+    rows = StudentStats.objects.filter(
+        completed_count__gt=0,
+        student__user_type='STUDENT',
+        student__grade__isnull=False,
+    ).values('student_id', 'student__grade_id', 'average_score', 'completed_count', 'average_perfect_time')
+    LeaderboardEntry.objects.bulk_create(
+        (
+            LeaderboardEntry(
+                student_id=row['student_id'],
+                grade_id=row['student__grade_id'],
+                average_score=row['average_score'],
+                completed_count=row['completed_count'],
+                average_perfect_time=row['average_perfect_time'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+        ('quizzes', '0009_studentstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_score', models.FloatField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('average_perfect_time', models.FloatField(blank=True, null=True)),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='academics.grade')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['grade', '-average_score', '-completed_count', 'student'], name='quizzes_lb_top_scorers'), models.Index(fields=['grade', '-completed_count', '-average_score', 'student'], name='quizzes_lb_most_active'), models.Index(fields=['grade', 'average_perfect_time', 'student'], name='quizzes_lb_fastest')],
+            },
+        ),
+        migrations.RunPython(populate_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_difficulty_stats(apps, schema_editor):
+    """
+    Fills the unit and question counters from the completed results and the answers.
+    A frozen copy of apps.quizzes.difficulty.rebuild_difficulty_tables as it was when
+    this migration was written.
+    """
+    QuizResult = apps.get_model('quizzes', 'QuizResult')
+    StudentAnswer = apps.get_model('quizzes', 'StudentAnswer')
+    Question = apps.get_model('quizzes', 'Question')
+    UnitStats = apps.get_model('quizzes', 'UnitStats')
+    QuestionStats = apps.get_model('quizzes', 'QuestionStats')
+
+    results = QuizResult.objects.filter(completed_at__isnull=False, score__isnull=False)
+    UnitStats.objects.bulk_create(
+        (
+            UnitStats(
+                unit_id=row['unit_id'],
+                grade_id=row['unit__grade_id'],
+                attempt_count=row['attempts'],
+                score_sum=row['score_sum'],
+                average_score=row['score_sum'] / row['attempts'],
+            )
+            for row in results.values('unit_id', 'unit__grade_id').annotate(
+                attempts=Count('id'), score_sum=Sum('score')
+            ).order_by()
+        ),
+        batch_size=1000,
+    )
+
+    answer_counts = {
+        row['question_id']: (row['attempts'], row['correct'])
+        for row in StudentAnswer.objects.values('question_id').annotate(
+            attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True))
+        ).order_by()
+    }
+    question_stats = []
+    for question_id, unit_id in Question.objects.values_list('id', 'unit_id'):
+        attempts, correct = answer_counts.get(question_id, (0, 0))
+        if attempts:
+            question_stats.append(QuestionStats(
+                question_id=question_id,
+                unit_id=unit_id,
+                attempt_count=attempts,
+                correct_count=correct,
+                success_rate=correct * 100.0 / attempts,
+            ))
+    QuestionStats.objects.bulk_create(question_stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+        ('quizzes', '0010_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('success_rate', models.FloatField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='quizzes.question')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='academics.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['unit', 'success_rate'], name='quizzes_questionstats_rate')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UnitStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unit_stats', to='academics.grade')),
+                ('unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='academics.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['grade', 'average_score'], name='quizzes_unitstats_difficulty')],
+            },
+        ),
+        migrations.RunPython(populate_difficulty_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_mistakes(apps, schema_editor):
+    """
+    Fills the mistake banks with every wrong answer so far. A frozen copy of
+    apps.quizzes.mistakes.record_mistakes_table as it was when this migration was written.
+    """
+    StudentAnswer = apps.get_model('quizzes', 'StudentAnswer')
+    StudentMistake = apps.get_model('quizzes', 'StudentMistake')
+
+    rows = StudentAnswer.objects.filter(is_correct=False).values_list(
+        'id', 'quiz_result__student_id', 'question_id', 'question__unit_id', 'question__unit__unit_number', 'question__order'
+    )
+    StudentMistake.objects.bulk_create(
+        (
+            StudentMistake(
+                student_answer_id=answer_id,
+                student_id=student_id,
+                question_id=question_id,
+                unit_id=unit_id,
+                unit_number=unit_number,
+                question_order=question_order,
+            )
+            for answer_id, student_id, question_id, unit_id, unit_number, question_order in rows.iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+        ('quizzes', '0011_difficulty_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentMistake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_number', models.PositiveIntegerField()),
+                ('question_order', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quizzes.question')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mistakes', to=settings.AUTH_USER_MODEL)),
+                ('student_answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='mistake', to='quizzes.studentanswer')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academics.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'unit_number', 'unit', 'question_order', 'question', 'id'], name='quizzes_mistake_bank_order')],
+            },
+        ),
+        migrations.RunPython(populate_mistakes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0012_studentmistake'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='import_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
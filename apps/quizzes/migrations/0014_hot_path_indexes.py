@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:26
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keeps the first of any duplicate rows the new unique constraints would reject:
+    extra open attempts of a student at a unit (open attempts have no answers yet)
+    and extra answers to the same question within an attempt.
+    """
+    QuizResult = apps.get_model('quizzes', 'QuizResult')
+    StudentAnswer = apps.get_model('quizzes', 'StudentAnswer')
+    open_attempts = QuizResult.objects.filter(completed_at__isnull=True)
+    for row in open_attempts.values('student_id', 'unit_id').annotate(count=Count('id'), first=Min('id')).filter(count__gt=1):
+        open_attempts.filter(student_id=row['student_id'], unit_id=row['unit_id']).exclude(id=row['first']).delete()
+    answers = StudentAnswer.objects.all()
+    for row in answers.values('quiz_result_id', 'question_id').annotate(count=Count('id'), first=Min('id')).filter(count__gt=1):
+        answers.filter(quiz_result_id=row['quiz_result_id'], question_id=row['question_id']).exclude(id=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0005_unit_grade_listing_index'),
+        ('quizzes', '0013_question_import_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['student', 'unit', 'completed_at'], name='quizzes_result_student_unit'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['start_time'], name='quizzes_result_open'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['unit', 'id'], name='quizzes_result_unit_done'),
+        ),
+        migrations.AddIndex(
+            model_name='studentanswer',
+            index=models.Index(fields=['question', 'is_correct'], name='quizzes_answer_question'),
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed_at__isnull', True)), fields=('student', 'unit'), name='quizzes_result_one_open'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentanswer',
+            constraint=models.UniqueConstraint(fields=('quiz_result', 'question'), name='quizzes_answer_one_per_question'),
+        ),
+    ]
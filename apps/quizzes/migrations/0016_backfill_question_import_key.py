@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:13
+
+import hashlib
+
+from django.db import migrations
+
+
+def populate_import_keys(apps, schema_editor):
+    """
+    Gives every question without an import key the hash of its unit's title, its type and
+    its text; of several identical questions only the oldest gets it. A frozen copy of
+    apps.quizzes.import_keys.backfill_import_keys as it was when this migration was written.
+    """
+    Question = apps.get_model('quizzes', 'Question')
+
+    taken = set(Question.objects.filter(import_key__isnull=False).values_list('import_key', flat=True))
+    keyed = []
+    rows = Question.objects.filter(import_key__isnull=True).order_by('id').values_list(
+        'id', 'unit__title', 'question_type', 'question_text',
+    )
+    for question_id, unit_title, question_type, question_text in rows.iterator():
+        source = '\x1f'.join([unit_title, question_type, question_text])
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        if key not in taken:
+            taken.add(key)
+            keyed.append(Question(id=question_id, import_key=key))
+    Question.objects.bulk_update(keyed, ['import_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unit_content_version'),
+        ('quizzes', '0015_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_import_keys, migrations.RunPython.noop),
+    ]
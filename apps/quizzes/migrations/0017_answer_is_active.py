@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0016_backfill_question_import_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Is Active'),
+        ),
+    ]
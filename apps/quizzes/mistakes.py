@@ -0,0 +1,107 @@
+# /apps/quizzes/mistakes.py
+
+from collections import OrderedDict
+
+from django.db.models import Q
+
+from .models import Answer, StudentAnswer, StudentMistake
+
+MISTAKES_PER_PAGE = 20
+MISTAKES_BATCH_SIZE = 1000
+
+# The mistake bank is ordered by these fields (matching the StudentMistake index).
+# A page cursor is the values of the last mistake on the previous page.
+KEYSET_FIELDS = ('unit_number', 'unit_id', 'question_order', 'question_id', 'id')
+
+
+def record_mistakes_table(student_answer_model, mistake_model, result_ids=None):
+    """
+    Adds the wrong answers of the given attempts (or of every attempt) to the mistake
+    banks. Answers already in a bank are skipped, so it is safe to run repeatedly.
+    """
+    wrong_answers = student_answer_model.objects.filter(is_correct=False)
+    if result_ids is not None:
+        wrong_answers = wrong_answers.filter(quiz_result_id__in=result_ids)
+    rows = wrong_answers.values_list(
+        'id', 'quiz_result__student_id', 'question_id', 'question__unit_id', 'question__unit__unit_number', 'question__order'
+    )
+    mistake_model.objects.bulk_create(
+        (
+            mistake_model(
+                student_answer_id=answer_id,
+                student_id=student_id,
+                question_id=question_id,
+                unit_id=unit_id,
+                unit_number=unit_number,
+                question_order=question_order,
+            )
+            for answer_id, student_id, question_id, unit_id, unit_number, question_order in rows.iterator()
+        ),
+        batch_size=MISTAKES_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def record_mistakes(result_ids):
+    """
+    Adds the wrong answers of freshly completed attempts to the students' mistake banks.
+    """
+    record_mistakes_table(StudentAnswer, StudentMistake, result_ids=list(result_ids))
+
+
+def encode_cursor(mistake):
+    return '-'.join(str(getattr(mistake, field)) for field in KEYSET_FIELDS)
+
+
+def decode_cursor(cursor):
+    """
+    Returns the keyset values of a page cursor, or None when it is missing or malformed.
+    """
+    try:
+        values = [int(value) for value in (cursor or '').split('-')]
+    except ValueError:
+        return None
+    return values if len(values) == len(KEYSET_FIELDS) else None
+
+
+def _after(values):
+    """
+    A filter matching the mistakes ordered after the given keyset values.
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for field, value in zip(KEYSET_FIELDS, values):
+        condition |= equal & Q(**{f'{field}__gt': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def mistakes_page(student, cursor=None, per_page=MISTAKES_PER_PAGE):
+    """
+    One page of a student's mistake bank, grouped by unit, in a fixed number of queries:
+        {'mistakes_by_unit': {unit: [{'question', 'student_answer', 'correct_answer'}, ...]},
+         'next_cursor': str or None}
+    """
+    mistakes = StudentMistake.objects.filter(student=student).order_by(*KEYSET_FIELDS)
+    after = decode_cursor(cursor)
+    if after:
+        mistakes = mistakes.filter(_after(after))
+    page = list(mistakes.select_related('unit', 'question', 'student_answer__selected_answer')[:per_page + 1])
+    next_cursor = encode_cursor(page[per_page - 1]) if len(page) > per_page else None
+    page = page[:per_page]
+
+    # The correct answer of every question on the page, resolved with one query.
+    correct_answers = {}
+    on_page = {mistake.question_id for mistake in page}
+    for answer in Answer.objects.filter(question_id__in=on_page, is_correct=True, is_active=True).order_by('id'):
+        correct_answers.setdefault(answer.question_id, answer)
+
+    mistakes_by_unit = OrderedDict()
+    for mistake in page:
+        student_answer = mistake.student_answer
+        mistakes_by_unit.setdefault(mistake.unit, []).append({
+            'question': mistake.question,
+            'student_answer': student_answer.text_answer or student_answer.selected_answer,
+            'correct_answer': correct_answers.get(mistake.question_id),
+        })
+    return {'mistakes_by_unit': mistakes_by_unit, 'next_cursor': next_cursor}
@@ -1,10 +1,13 @@
 # /apps/quizzes/models.py
 
+import random
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from apps.academics.models import Unit
+from apps.academics.models import Grade, Unit
 
 class Question(models.Model):
     class QuestionType(models.TextChoices):
@@ -20,6 +23,8 @@ class Question(models.Model):
     question_text = models.CharField(_('Question Text'), max_length=500, help_text="For Fill in the Blank, use '___'. For Matching, describe the task, e.g., 'Match the number to the image.'")
     question_type = models.CharField(_('Question Type'), max_length=5, choices=QuestionType.choices)
     order = models.PositiveIntegerField(_('Order'), default=1)
+    # Stable identity of an imported question, so re-running import_data updates it in place.
+    import_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.question_text
@@ -28,7 +33,12 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
     answer_text = models.CharField(_('Answer Text'), max_length=500, blank=True, null=True, help_text="Use for text-based answers (MCQ, TF, SA, FITB).")
     answer_image = models.ImageField(_('Answer Image'), upload_to='answer_images/', blank=True, null=True, help_text="Use for image-based choice questions (MCQI).")
+    # Resized WebP/fallback copies of answer_image and their sizes, see apps/quizzes/images.py.
+    answer_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_correct = models.BooleanField(_('Is Correct'), default=False)
+    # An answer dropped from an imported bank after students chose it is retired rather than
+    # deleted, so their answers keep it. Retired answers are no longer offered or graded.
+    is_active = models.BooleanField(_('Is Active'), default=True)
 
     def __str__(self):
         if self.answer_text:
@@ -39,6 +49,9 @@ class Answer(models.Model):
 
 # In apps/quizzes/models.py
 
+def generate_shuffle_seed():
+    return random.randint(1, 2**31 - 1)
+
 class QuizResult(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE)
@@ -54,6 +67,23 @@ class QuizResult(models.Model):
     
     time_taken_seconds = models.PositiveIntegerField(null=True, blank=True)
 
+    # Seeds the per-attempt order of matching items, so a refresh shows the same layout.
+    shuffle_seed = models.PositiveIntegerField(default=generate_shuffle_seed, editable=False)
+
+    class Meta:
+        indexes = [
+            # A student's attempt at a unit, and the student's history.
+            models.Index(fields=['student', 'unit', 'completed_at'], name='quizzes_result_student_unit'),
+            # Open attempts by start time, for the expiry sweeper.
+            models.Index(fields=['start_time'], condition=Q(completed_at__isnull=True), name='quizzes_result_open'),
+            # Completed attempts of a unit, for item analysis and the difficulty counters.
+            models.Index(fields=['unit', 'id'], condition=Q(completed_at__isnull=False), name='quizzes_result_unit_done'),
+        ]
+        constraints = [
+            # take_quiz resumes "the" open attempt; a second one would break it.
+            models.UniqueConstraint(fields=['student', 'unit'], condition=Q(completed_at__isnull=True), name='quizzes_result_one_open'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.unit.title}"
 
@@ -66,15 +96,33 @@ class StudentAnswer(models.Model):
     matching_answer = models.JSONField(blank=True, null=True)
     is_correct = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=['question', 'is_correct'], name='quizzes_answer_question')]
+        constraints = [models.UniqueConstraint(fields=['quiz_result', 'question'], name='quizzes_answer_one_per_question')]
+
     def __str__(self):
         return f"{self.quiz_result.student.username}'s answer for {self.question.question_text[:20]}"
 
+class QuizDraft(models.Model):
+    """
+    Autosaved, not yet submitted answers of an in-progress attempt.
+    One row per attempt; the answers blob is overwritten in place on every autosave.
+    """
+    quiz_result = models.OneToOneField(QuizResult, on_delete=models.CASCADE, related_name='draft')
+    answers = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Draft for {self.quiz_result}"
+
 class MatchingPair(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='matching_pairs')
     prompt_text = models.CharField(_('Prompt Text'), max_length=255, blank=True, null=True, help_text="Use for text prompts.")
     match_text = models.CharField(_('Correct Match Text'), max_length=255, blank=True, null=True, help_text="Use for text matches.")
     prompt_image = models.ImageField(_('Prompt Image'), upload_to='matching_images/', blank=True, null=True, help_text="Use for image prompts.")
     match_image = models.ImageField(_('Correct Match Image'), upload_to='matching_images/', blank=True, null=True, help_text="Use for image matches.")
+    prompt_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    match_image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         prompt = self.prompt_text or (self.prompt_image.url if self.prompt_image else 'Image')
@@ -86,12 +134,25 @@ class Badge(models.Model):
     يمثل شارة إنجاز يمكن للطالب الحصول عليها.
     يقوم المسؤول بإنشاء هذه الشارات من لوحة التحكم.
     """
+    class AwardMode(models.TextChoices):
+        ONCE = 'ONCE', _('Award once')
+        REPEAT = 'REPEAT', _('Award every time (counter)')
+
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField()
     icon = models.ImageField(upload_to='badge_icons/', help_text="Upload an icon for the badge.")
+    icon_variants = models.JSONField(default=dict, blank=True, editable=False)
     # مفتاح فريد لنتحقق من الشارة في الكود
     slug = models.SlugField(unique=True, help_text="A unique key for the badge, e.g., 'perfect_score'.")
 
+    # قواعد منح الشارة: كل الشروط يجب أن تتحقق
+    conditions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='All conditions must hold, e.g. [{"metric": "score", "op": ">=", "value": 80}, {"metric": "time_ratio", "op": "<", "value": 0.5}].'
+    )
+    award_mode = models.CharField(max_length=10, choices=AwardMode.choices, default=AwardMode.ONCE)
+
     def __str__(self):
         return self.name
 
@@ -110,3 +171,122 @@ class StudentBadge(models.Model):
 
     def __str__(self):
         return f"{self.student.username} - {self.badge.name} (x{self.count})"
+
+class StatsCounters(models.Model):
+    """
+    Running totals over a student's completed quizzes. Maintained incrementally when an
+    attempt completes (see apps/quizzes/stats.py) so pages never aggregate raw results.
+    """
+    completed_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    average_score = models.FloatField(default=0)
+    perfect_count = models.PositiveIntegerField(default=0)
+    # Only perfect attempts with a recorded time count towards the perfect-time figures.
+    perfect_time_sum = models.PositiveBigIntegerField(default=0)
+    perfect_time_count = models.PositiveIntegerField(default=0)
+    average_perfect_time = models.FloatField(null=True, blank=True)
+    fastest_perfect_time = models.PositiveIntegerField(null=True, blank=True)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+class StudentStats(StatsCounters):
+    student = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stats')
+
+    def __str__(self):
+        return f"Stats for {self.student.username}"
+
+class StudentGradeStats(StatsCounters):
+    """
+    The same counters split by the grade of the completed units.
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='grade_stats')
+    grade = models.ForeignKey(Grade, on_delete=models.CASCADE, related_name='student_stats')
+
+    class Meta:
+        unique_together = ('student', 'grade')
+
+    def __str__(self):
+        return f"Stats for {self.student.username} in {self.grade.name}"
+
+class LeaderboardEntry(models.Model):
+    """
+    A student's standing on the leaderboards of their current grade, copied from
+    StudentStats when an attempt completes. Each index matches the ordering of one
+    board, so top-N lists and rank lookups are index range scans.
+    """
+    grade = models.ForeignKey(Grade, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    student = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    average_score = models.FloatField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    average_perfect_time = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['grade', '-average_score', '-completed_count', 'student'], name='quizzes_lb_top_scorers'),
+            models.Index(fields=['grade', '-completed_count', '-average_score', 'student'], name='quizzes_lb_most_active'),
+            models.Index(fields=['grade', 'average_perfect_time', 'student'], name='quizzes_lb_fastest'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} on the {self.grade.name} leaderboard"
+
+class UnitStats(models.Model):
+    """
+    Running attempt counters for a unit, maintained when a submission is graded
+    (see apps/quizzes/difficulty.py). The grade is copied from the unit so the
+    hardest units of a grade are an index-ordered read.
+    """
+    unit = models.OneToOneField(Unit, on_delete=models.CASCADE, related_name='stats')
+    grade = models.ForeignKey(Grade, on_delete=models.CASCADE, related_name='unit_stats')
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    average_score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['grade', 'average_score'], name='quizzes_unitstats_difficulty')]
+
+    def __str__(self):
+        return f"Stats for {self.unit.title}"
+
+class QuestionStats(models.Model):
+    """
+    Running answer counters for a question. `success_rate` is stored so the hardest
+    questions of a unit are an index-ordered read.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='question_stats')
+    attempt_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    success_rate = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['unit', 'success_rate'], name='quizzes_questionstats_rate')]
+
+    def __str__(self):
+        return f"Stats for {self.question}"
+
+class StudentMistake(models.Model):
+    """
+    An entry of a student's mistake bank: one wrong answer, with the unit number and
+    question order copied from the content so the bank pages in index order.
+    Written when an attempt completes (see apps/quizzes/mistakes.py).
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mistakes')
+    student_answer = models.OneToOneField(StudentAnswer, on_delete=models.CASCADE, related_name='mistake')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='+')
+    unit_number = models.PositiveIntegerField()
+    question_order = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['student', 'unit_number', 'unit', 'question_order', 'question', 'id'],
+                name='quizzes_mistake_bank_order',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Mistake by {self.student.username} on {self.question}"
@@ -0,0 +1,73 @@
+# /apps/quizzes/rendering.py
+
+import random
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from .models import Answer
+
+QUESTION_CARDS_TIMEOUT = 60 * 60 * 24
+
+# Placeholder rendered where the shuffled matching items of a card are inserted.
+MATCH_SLOT = '<!--match-slot-->'
+
+
+def question_cards_cache_key(unit_id, content_version):
+    return f'quizzes:question_cards:{unit_id}:{content_version}'
+
+
+def build_question_cards(unit):
+    """
+    Renders the question markup of a unit once.
+
+    Every card is split around its matching items so the per-attempt order can be
+    applied later without rendering templates again:
+        [{'id': question_id, 'head': html, 'matches': [html, ...], 'tail': html}, ...]
+    """
+    questions = unit.questions.prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.filter(is_active=True)), 'matching_pairs',
+    ).order_by('order')
+
+    cards = []
+    for number, question in enumerate(questions, start=1):
+        html = render_to_string('quizzes/_question_card.html', {
+            'question': question,
+            'number': number,
+            'match_slot': MATCH_SLOT,
+        })
+        head, _, tail = html.partition(MATCH_SLOT)
+        matches = []
+        if question.question_type in ['MATCH', 'MATI']:
+            matches = [
+                render_to_string('quizzes/_matching_match.html', {'match': pair})
+                for pair in question.matching_pairs.all()
+            ]
+        cards.append({'id': question.id, 'head': head, 'matches': matches, 'tail': tail})
+    return cards
+
+
+def get_question_cards(unit):
+    """
+    Returns the cached question cards of a unit, rendering them on a miss.
+    """
+    key = question_cards_cache_key(unit.id, unit.content_version)
+    cards = cache.get(key)
+    if cards is None:
+        cards = build_question_cards(unit)
+        cache.set(key, cards, QUESTION_CARDS_TIMEOUT)
+    return cards
+
+
+def render_question_cards(unit, shuffle_seed):
+    """
+    Assembles the question cards of a unit for one attempt, shuffling the
+    matching items with the attempt's seed so refreshes keep the same order.
+    """
+    rendered = []
+    for card in get_question_cards(unit):
+        matches = list(card['matches'])
+        random.Random(shuffle_seed + card['id']).shuffle(matches)
+        rendered.append(card['head'] + ''.join(matches) + card['tail'])
+    return rendered
@@ -0,0 +1,111 @@
+# /apps/quizzes/signals.py
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.academics.models import Unit
+
+from .badges import invalidate_badge_rules
+from .grading import invalidate_unit_content
+from .images import refresh_image_variants
+from .leaderboards import refresh_leaderboard_entries
+from .models import Question, Answer, MatchingPair, Badge, StudentMistake
+
+
+@receiver(pre_save, sender=Question)
+def remember_previous_unit(sender, instance, **kwargs):
+    """
+    Keeps the unit a question belonged to before saving, so moving a question
+    to another unit invalidates both units.
+    """
+    instance._previous_unit_id = None
+    if instance.pk:
+        instance._previous_unit_id = Question.objects.filter(pk=instance.pk).values_list('unit_id', flat=True).first()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_unit_content(instance.unit_id)
+    previous_unit_id = getattr(instance, '_previous_unit_id', None)
+    if previous_unit_id and previous_unit_id != instance.unit_id:
+        invalidate_unit_content(previous_unit_id)
+
+
+@receiver(post_save, sender=Question)
+def reorder_question_mistakes(sender, instance, **kwargs):
+    """
+    Keeps the copied sort keys of the mistake banks in line with the question.
+    """
+    StudentMistake.objects.filter(question=instance).update(
+        unit_id=instance.unit_id,
+        unit_number=instance.unit.unit_number,
+        question_order=instance.order,
+    )
+
+
+@receiver(post_save, sender=Unit)
+def reorder_unit_mistakes(sender, instance, **kwargs):
+    StudentMistake.objects.filter(unit=instance).exclude(unit_number=instance.unit_number).update(
+        unit_number=instance.unit_number
+    )
+
+
+@receiver(post_save, sender=Unit)
+def unit_changed(sender, instance, created=False, raw=False, **kwargs):
+    """
+    The unit's title, number and publishing are part of its content too: the student
+    pages validated by content version show them.
+    """
+    if not created and not raw:
+        invalidate_unit_content(instance.pk)
+
+
+# Registered before the receivers that invalidate cached content, so the derivatives
+# exist by the time the question cards are rendered again.
+@receiver(post_save, sender=Answer)
+@receiver(post_save, sender=MatchingPair)
+@receiver(post_save, sender=Badge)
+def image_changed(sender, instance, raw=False, **kwargs):
+    """
+    Builds the resized copies of a newly uploaded image (see apps/quizzes/images.py).
+    """
+    if not raw:
+        refresh_image_variants(instance)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+@receiver(post_save, sender=MatchingPair)
+@receiver(post_delete, sender=MatchingPair)
+def answer_content_changed(sender, instance, **kwargs):
+    unit_id = Question.objects.filter(pk=instance.question_id).values_list('unit_id', flat=True).first()
+    invalidate_unit_content(unit_id)
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def badge_changed(sender, instance, **kwargs):
+    invalidate_badge_rules()
+
+
+def _affects_leaderboard(update_fields):
+    return update_fields is None or bool({'grade', 'user_type'} & set(update_fields))
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_previous_placement(sender, instance, update_fields=None, **kwargs):
+    instance._previous_placement = None
+    if instance.pk and _affects_leaderboard(update_fields):
+        instance._previous_placement = sender.objects.filter(pk=instance.pk).values_list('grade_id', 'user_type').first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def placement_changed(sender, instance, **kwargs):
+    """
+    Moves a student's leaderboard entry when their grade (or account type) changes.
+    """
+    previous = getattr(instance, '_previous_placement', None)
+    if previous and previous != (instance.grade_id, instance.user_type):
+        refresh_leaderboard_entries([instance.pk])
@@ -0,0 +1,59 @@
+# /apps/quizzes/stamps.py
+
+from django.db.models import Count, Max, Sum
+
+from apps.academics.models import Unit
+from .models import LeaderboardEntry, QuizResult, StudentBadge
+
+# Version stamps of the data student pages show, for their ETags (see apps/core/etags.py).
+# Each is one indexed aggregate that changes whenever the data it stands for changes;
+# ids only grow, so a row that is deleted and written again changes the largest one.
+
+
+def attempts_stamp(student_id):
+    """
+    The student's attempts: a new one, a completed one, or an expired one being removed.
+    """
+    stamp = QuizResult.objects.filter(student_id=student_id).aggregate(
+        count=Count('id'), last_id=Max('id'), last_completed_at=Max('completed_at'),
+    )
+    return tuple(stamp.values())
+
+
+def badges_stamp(student_id):
+    """
+    The student's badges, which are awarded in the background after an attempt completes.
+    """
+    stamp = StudentBadge.objects.filter(student_id=student_id).aggregate(
+        badges=Count('id'), awarded=Sum('count'), last_id=Max('id'),
+    )
+    return tuple(stamp.values())
+
+
+def units_stamp(grade_id):
+    """
+    The units of a grade. Editing a unit or its questions bumps its content version.
+    """
+    stamp = Unit.objects.filter(grade_id=grade_id).aggregate(
+        count=Count('id'), last_id=Max('id'), versions=Sum('content_version'),
+    )
+    return tuple(stamp.values())
+
+
+def leaderboard_stamp(grade_id):
+    """
+    The leaderboard version of a grade: its entries are written again whenever one of its
+    students completes an attempt or moves to another grade.
+    """
+    stamp = LeaderboardEntry.objects.filter(grade_id=grade_id).aggregate(count=Count('id'), last_id=Max('id'))
+    return tuple(stamp.values())
+
+
+def result_stamp(result_id, student_id):
+    """
+    One of the student's attempts and the content version of its unit (its title is shown),
+    or None when the attempt is not theirs.
+    """
+    return QuizResult.objects.filter(pk=result_id, student_id=student_id).values_list(
+        'score', 'completed_at', 'unit__content_version',
+    ).first()
@@ -0,0 +1,131 @@
+# /apps/quizzes/stats.py
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Min, PositiveIntegerField, Q, Sum, Value, When
+
+from .models import QuizResult, StudentGradeStats, StudentStats
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def _increment_values(score, time_taken):
+    """
+    UPDATE expressions that add one completed attempt to a stats row.
+    Right-hand sides are evaluated against the old row values, so the averages
+    are computed from the new totals within the same statement.
+    """
+    values = {
+        'completed_count': F('completed_count') + 1,
+        'score_sum': F('score_sum') + score,
+        'average_score': (F('score_sum') + score) / (F('completed_count') + 1.0),
+    }
+    if score == 100:
+        values['perfect_count'] = F('perfect_count') + 1
+        if time_taken:
+            values.update(
+                perfect_time_sum=F('perfect_time_sum') + time_taken,
+                perfect_time_count=F('perfect_time_count') + 1,
+                average_perfect_time=(F('perfect_time_sum') + time_taken) / (F('perfect_time_count') + 1.0),
+                fastest_perfect_time=Case(
+                    When(Q(fastest_perfect_time__isnull=True) | Q(fastest_perfect_time__gt=time_taken), then=Value(time_taken)),
+                    default=F('fastest_perfect_time'),
+                    output_field=PositiveIntegerField(),
+                ),
+            )
+    return values
+
+
+def _initial_values(score, time_taken):
+    perfect = score == 100
+    timed = perfect and bool(time_taken)
+    return {
+        'completed_count': 1,
+        'score_sum': score,
+        'average_score': score,
+        'perfect_count': 1 if perfect else 0,
+        'perfect_time_sum': time_taken if timed else 0,
+        'perfect_time_count': 1 if timed else 0,
+        'average_perfect_time': time_taken if timed else None,
+        'fastest_perfect_time': time_taken if timed else None,
+    }
+
+
+def _add_attempt(model, lookup, score, time_taken, completed_at):
+    updated = model.objects.filter(**lookup).update(last_completed_at=completed_at, **_increment_values(score, time_taken))
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(last_completed_at=completed_at, **lookup, **_initial_values(score, time_taken))
+    except IntegrityError:
+        # Another request created the row first; fall back to incrementing it.
+        model.objects.filter(**lookup).update(last_completed_at=completed_at, **_increment_values(score, time_taken))
+
+
+def record_completed_attempt(student_id, grade_id, score, time_taken, completed_at):
+    """
+    Adds one completed attempt to the student's overall and per-grade stats.
+    Call it inside the transaction that completes the attempt.
+    """
+    score = float(score or 0)
+    time_taken = int(time_taken or 0)
+    _add_attempt(StudentStats, {'student_id': student_id}, score, time_taken, completed_at)
+    _add_attempt(StudentGradeStats, {'student_id': student_id, 'grade_id': grade_id}, score, time_taken, completed_at)
+
+
+def rebuild_stats_tables(quiz_result_model, stats_model, grade_stats_model, student_ids=None):
+    """
+    Recomputes the stats rows from the raw results with two grouped aggregate queries
+    and batched inserts.
+    """
+    completed = quiz_result_model.objects.filter(completed_at__isnull=False, score__isnull=False)
+    if student_ids is not None:
+        completed = completed.filter(student_id__in=student_ids)
+
+    perfect = Q(score=100)
+    perfect_timed = Q(score=100, time_taken_seconds__gt=0)
+    aggregates = {
+        'completed_count': Count('id'),
+        'score_sum': Sum('score'),
+        'perfect_count': Count('id', filter=perfect),
+        'perfect_time_sum': Sum('time_taken_seconds', filter=perfect_timed),
+        'perfect_time_count': Count('id', filter=perfect_timed),
+        'fastest_perfect_time': Min('time_taken_seconds', filter=perfect_timed),
+        'last_completed_at': Max('completed_at'),
+    }
+
+    def build(row):
+        values = {key: row[key] for key in aggregates}
+        values['perfect_time_sum'] = values['perfect_time_sum'] or 0
+        values['average_score'] = values['score_sum'] / values['completed_count']
+        if values['perfect_time_count']:
+            values['average_perfect_time'] = values['perfect_time_sum'] / values['perfect_time_count']
+        return values
+
+    overall = completed.values('student_id').annotate(**aggregates).order_by()
+    per_grade = completed.values('student_id', 'unit__grade_id').annotate(**aggregates).order_by()
+
+    with transaction.atomic():
+        stale_overall = stats_model.objects.all()
+        stale_per_grade = grade_stats_model.objects.all()
+        if student_ids is not None:
+            stale_overall = stale_overall.filter(student_id__in=student_ids)
+            stale_per_grade = stale_per_grade.filter(student_id__in=student_ids)
+        stale_overall.delete()
+        stale_per_grade.delete()
+
+        stats_model.objects.bulk_create(
+            (stats_model(student_id=row['student_id'], **build(row)) for row in overall.iterator()),
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+        grade_stats_model.objects.bulk_create(
+            (grade_stats_model(student_id=row['student_id'], grade_id=row['unit__grade_id'], **build(row)) for row in per_grade.iterator()),
+            batch_size=REBUILD_BATCH_SIZE,
+        )
+
+
+def rebuild_student_stats(student_ids=None):
+    """
+    Recomputes StudentStats and StudentGradeStats for the given students (or everyone).
+    """
+    rebuild_stats_tables(QuizResult, StudentStats, StudentGradeStats, student_ids=student_ids)
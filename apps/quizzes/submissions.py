@@ -0,0 +1,148 @@
+# /apps/quizzes/submissions.py
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from apps.core.jobs import enqueue
+from .difficulty import record_graded_submission
+from .leaderboards import refresh_leaderboard_entries
+from .mistakes import record_mistakes
+from .models import QuizDraft, QuizResult, StudentAnswer, StudentStats
+from .stats import record_completed_attempt
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionQueueFull(Exception):
+    """
+    Raised when a submission cannot be queued because the queue is full.
+    """
+
+
+def save_submission(result, unit, student_id, graded_answers, score, time_taken, completed_at):
+    """
+    Writes a graded submission: a single UPDATE that completes the attempt (and guards
+    against double submits), one bulk INSERT of the answers, and the derived counters.
+    Must run inside a transaction. Returns False when the attempt was already completed.
+    """
+    updated = QuizResult.objects.filter(pk=result.pk, completed_at__isnull=True).update(
+        score=score,
+        completed_at=completed_at,
+        time_taken_seconds=time_taken,
+    )
+    if not updated:
+        return False
+    StudentAnswer.objects.bulk_create(
+        [StudentAnswer(quiz_result=result, **graded) for graded in graded_answers]
+    )
+    record_mistakes([result.id])
+    QuizDraft.objects.filter(quiz_result=result).delete()
+    record_completed_attempt(student_id, unit.grade_id, score, time_taken, completed_at)
+    refresh_leaderboard_entries([student_id])
+    record_graded_submission(unit, graded_answers, score)
+
+    # Badge awarding runs in the background worker, off the student's request.
+    # The stats as of this attempt travel with the job, so the rules see them
+    # even if the student completes more quizzes before the job runs.
+    aggregates = StudentStats.objects.filter(student_id=student_id).values(
+        'completed_count', 'average_score', 'perfect_count'
+    ).first()
+    enqueue('quizzes.award_badges', result_id=result.id, aggregates=aggregates)
+    return True
+
+
+class SubmissionWriter:
+    """
+    With settings.SUBMISSION_QUEUE_ENABLED, graded submissions are written by one thread
+    per process instead of by the request threads, so they never compete for SQLite's
+    write lock. The thread commits up to SUBMISSION_BATCH_SIZE queued submissions per
+    transaction; each gets its own savepoint, so one failure does not undo the others.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.queue = queue.Queue(maxsize=settings.SUBMISSION_QUEUE_SIZE)
+                self.thread = threading.Thread(target=self.run, args=(self.queue,), name='submission-writer', daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        """
+        Writes what is queued and stops the thread (it starts again on the next submission).
+        """
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                self.queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def submit(self, **submission):
+        """
+        Queues a submission (the arguments of save_submission) and returns a Future that
+        resolves to save_submission's result once the submission is committed.
+        Raises SubmissionQueueFull when the queue is full.
+        """
+        self.start()
+        future = Future()
+        try:
+            self.queue.put_nowait((submission, future))
+        except queue.Full:
+            raise SubmissionQueueFull()
+        return future
+
+    def run(self, submissions):
+        try:
+            while True:
+                batch = [submissions.get()]
+                while batch[-1] is not None and len(batch) < settings.SUBMISSION_BATCH_SIZE:
+                    try:
+                        batch.append(submissions.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = batch[-1] is None
+                if stopping:
+                    batch.pop()
+                if batch:
+                    self.write_batch(batch)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def write_batch(self, batch):
+        # Like a request: reconnect if the connection broke or reached CONN_MAX_AGE.
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for submission, future in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, save_submission(**submission), None))
+                    except Exception as exc:
+                        logger.exception('Could not save the submission of attempt %s.', submission['result'].pk)
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The commit failed, so nothing of the batch was written.
+            logger.exception('Could not commit a batch of %d submissions.', len(batch))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for future, saved, exc in outcomes:
+            if exc is None:
+                future.set_result(saved)
+            else:
+                future.set_exception(exc)
+
+
+submission_writer = SubmissionWriter()
@@ -1,3 +1,607 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import re
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.academics.models import Grade, Unit
+from apps.users.models import User
+
+from .badges import backfill_badges, check_and_award_badges, validate_conditions
+from .difficulty import reconcile_difficulty_stats
+from .expiry import TIME_OUT_ANSWER, expire_attempts, overdue_attempts
+from .exports import export_queryset, stream_export
+from .grading import get_answer_key, grade_submission
+from .leaderboards import BOARDS, board_entries, student_positions
+from .mistakes import mistakes_page, record_mistakes
+from .models import (
+    Answer, Badge, LeaderboardEntry, MatchingPair, Question, QuestionStats, QuizDraft, QuizResult, StudentAnswer,
+    StudentBadge, StudentMistake, StudentStats, UnitStats,
+)
+from .rendering import render_question_cards
+from .stats import rebuild_student_stats
+from .submissions import save_submission, submission_writer
+
+
+def create_unit(grade, number=1, duration_minutes=10):
+    """
+    A unit with a multiple choice, a short answer and a matching question, in that order.
+    """
+    unit = Unit.objects.create(
+        grade=grade, title=f'Unit {number}', unit_number=number, duration_minutes=duration_minutes, is_published=True,
+    )
+    choice = Question.objects.create(unit=unit, question_text='2 + 2?', question_type='MCQ', order=1)
+    Answer.objects.create(question=choice, answer_text='4', is_correct=True)
+    Answer.objects.create(question=choice, answer_text='5')
+    text = Question.objects.create(unit=unit, question_text='Write four in words.', question_type='SA', order=2)
+    Answer.objects.create(question=text, answer_text='Four', is_correct=True)
+    matching = Question.objects.create(unit=unit, question_text='Match the numbers.', question_type='MATCH', order=3)
+    for n in range(2):
+        MatchingPair.objects.create(question=matching, prompt_text=f'{n}', match_text=f'{n}')
+    return unit
+
+
+def correct_answers(unit):
+    choice, text, matching = unit.questions.order_by('order')
+    pair_ids = [str(pair.id) for pair in matching.matching_pairs.all()]
+    return {
+        str(choice.id): str(choice.answers.get(is_correct=True).id),
+        str(text.id): 'four',
+        str(matching.id): dict(zip(pair_ids, pair_ids)),
+    }
+
+
+class GradingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = create_unit(Grade.objects.create(name='Grade 1'))
+        cls.choice, cls.text, cls.matching = cls.unit.questions.order_by('order')
+
+    def setUp(self):
+        cache.clear()
+
+    def grade(self, answers):
+        graded_answers, correct_count = grade_submission(get_answer_key(self.unit), answers)
+        return {graded['question_id']: graded for graded in graded_answers}, correct_count
+
+    def test_correct_answers(self):
+        graded, correct_count = self.grade(correct_answers(self.unit))
+        self.assertEqual(correct_count, 3)
+        self.assertEqual(graded[self.text.id]['text_answer'], 'four')
+
+        # Short answers are compared without surrounding space or case.
+        graded, _ = self.grade({str(self.text.id): '  FOUR '})
+        self.assertTrue(graded[self.text.id]['is_correct'])
+
+    def test_wrong_and_foreign_answers(self):
+        wrong = self.choice.answers.get(is_correct=False)
+        other_unit = create_unit(self.unit.grade, number=2)
+        foreign = Answer.objects.filter(question__unit=other_unit, is_correct=True).first()
+        pair_ids = [str(pair.id) for pair in self.matching.matching_pairs.all()]
+
+        graded, correct_count = self.grade({
+            str(self.choice.id): str(wrong.id),
+            str(self.text.id): '5',
+            str(self.matching.id): dict(zip(pair_ids, pair_ids[::-1])),
+        })
+        self.assertEqual(correct_count, 0)
+        self.assertEqual(graded[self.choice.id]['selected_answer_id'], wrong.id)
+
+        # An answer of another question is not recorded as the student's choice.
+        graded, _ = self.grade({str(self.choice.id): str(foreign.id), str(self.matching.id): {pair_ids[0]: pair_ids[0]}})
+        self.assertIsNone(graded[self.choice.id]['selected_answer_id'])
+        self.assertFalse(graded[self.choice.id]['is_correct'])
+        # Matching only counts when every pair is matched.
+        self.assertFalse(graded[self.matching.id]['is_correct'])
+
+        graded, correct_count = self.grade({str(self.choice.id): 'not a number'})
+        self.assertEqual(correct_count, 0)
+        self.assertEqual([graded[question.id]['is_correct'] for question in (self.choice, self.text, self.matching)], [False] * 3)
+
+    def test_grading_runs_in_memory(self):
+        get_answer_key(self.unit)
+        answers = correct_answers(self.unit)
+        with self.assertNumQueries(0):
+            _, correct_count = grade_submission(get_answer_key(self.unit), answers)
+        self.assertEqual(correct_count, 3)
+
+    def test_editing_the_content_invalidates_the_answer_key(self):
+        right, wrong = self.choice.answers.order_by('-is_correct')
+        self.assertEqual(get_answer_key(self.unit)['correct_ids'][self.choice.id], {right.id})
+
+        wrong.is_correct = True
+        wrong.save()
+        right.is_correct = False
+        right.save()
+        self.unit.refresh_from_db()
+        self.assertEqual(get_answer_key(self.unit)['correct_ids'][self.choice.id], {wrong.id})
+
+        wrong.is_active = False
+        wrong.save()
+        self.unit.refresh_from_db()
+        self.assertEqual(get_answer_key(self.unit)['choice_ids'][self.choice.id], {right.id})
+
+
+class SubmitQuizTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = create_unit(grade)
+        cls.choice, cls.text, cls.matching = cls.unit.questions.order_by('order')
+        cls.student = User.objects.create(username='student', grade=grade)
+
+    def setUp(self):
+        cache.clear()
+        self.result = QuizResult.objects.create(student=self.student, unit=self.unit)
+        self.client.force_login(self.student)
+
+    def post(self, view_name, data):
+        return self.client.post(reverse(view_name, args=[self.unit.id]), json.dumps(data), content_type='application/json')
+
+    def test_submission_is_merged_with_the_draft(self):
+        answers = correct_answers(self.unit)
+        wrong = self.choice.answers.get(is_correct=False)
+        response = self.post('quizzes:autosave_quiz', {'answers': {
+            str(self.choice.id): str(wrong.id), str(self.text.id): answers[str(self.text.id)], '999999': 'x',
+        }})
+        self.assertEqual(response.json(), {'success': True, 'saved': 2})
+
+        # The answers sent with the submission win over the draft.
+        response = self.post('quizzes:submit_quiz', {'answers': {
+            str(self.choice.id): answers[str(self.choice.id)], str(self.matching.id): answers[str(self.matching.id)],
+        }, 'time_taken_seconds': 120})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.score, 100)
+        self.assertEqual(self.result.time_taken_seconds, 120)
+        self.assertEqual(StudentAnswer.objects.filter(quiz_result=self.result, is_correct=True).count(), 3)
+        self.assertFalse(QuizDraft.objects.filter(quiz_result=self.result).exists())
+        stats = StudentStats.objects.get(student=self.student)
+        self.assertEqual((stats.completed_count, stats.perfect_count, stats.fastest_perfect_time), (1, 1, 120))
+        self.assertEqual(UnitStats.objects.get(unit=self.unit).attempt_count, 1)
+        self.assertTrue(LeaderboardEntry.objects.filter(student=self.student, average_score=100).exists())
+
+    def test_second_submit_returns_the_saved_result(self):
+        for _ in range(2):
+            response = self.post('quizzes:submit_quiz', {'answers': correct_answers(self.unit), 'time_taken_seconds': 60})
+            self.assertEqual(response.json()['redirect_url'], reverse('quizzes:quiz_result', args=[self.result.id]))
+        self.assertEqual(StudentAnswer.objects.filter(quiz_result=self.result).count(), 3)
+        self.assertEqual(StudentStats.objects.get(student=self.student).completed_count, 1)
+
+    def test_autosave_after_the_time_limit_is_refused(self):
+        QuizResult.objects.filter(pk=self.result.pk).update(start_time=timezone.now() - timedelta(minutes=11))
+        response = self.post('quizzes:autosave_quiz', {'answers': correct_answers(self.unit)})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(QuizDraft.objects.exists())
+
+    def test_autosaves_are_merged(self):
+        answers = correct_answers(self.unit)
+        wrong = self.choice.answers.get(is_correct=False)
+        self.post('quizzes:autosave_quiz', {'answers': {str(self.choice.id): str(wrong.id)}})
+        with CaptureQueriesContext(connection) as ctx:
+            self.post('quizzes:autosave_quiz', {'answers': {
+                str(self.choice.id): answers[str(self.choice.id)], str(self.text.id): answers[str(self.text.id)],
+            }})
+        self.assertEqual(QuizDraft.objects.get(quiz_result=self.result).answers, {
+            str(self.choice.id): answers[str(self.choice.id)], str(self.text.id): answers[str(self.text.id)],
+        })
+        # The draft is written, which locks it, before it is read.
+        draft_queries = [query['sql'] for query in ctx.captured_queries if 'quizzes_quizdraft' in query['sql']]
+        self.assertTrue(draft_queries[0].startswith('INSERT'), draft_queries)
+
+
+@override_settings(SUBMISSION_QUEUE_ENABLED=True, SUBMISSION_WAIT_SECONDS=0.2, SUBMISSION_RETRY_AFTER_SECONDS=3)
+class SubmissionQueueTests(TransactionTestCase):
+    """
+    The writer thread commits on its own connection, so the data has to be committed too.
+    """
+
+    def setUp(self):
+        cache.clear()
+        grade = Grade.objects.create(name='Grade 1')
+        self.unit = create_unit(grade)
+        self.student = User.objects.create(username='student', grade=grade)
+        self.result = QuizResult.objects.create(student=self.student, unit=self.unit)
+        self.client.force_login(self.student)
+
+        # The writer waits for the test before writing anything.
+        self.writer_may_write = threading.Event()
+
+        def slow_save_submission(**submission):
+            self.writer_may_write.wait(5)
+            return save_submission(**submission)
+
+        patcher = mock.patch('apps.quizzes.submissions.save_submission', slow_save_submission)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(submission_writer.stop)
+        self.addCleanup(self.writer_may_write.set)
+
+    def submit(self):
+        return self.client.post(
+            reverse('quizzes:submit_quiz', args=[self.unit.id]),
+            json.dumps({'answers': correct_answers(self.unit), 'time_taken_seconds': 60}), content_type='application/json',
+        )
+
+    def assert_saved_once(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['redirect_url'], reverse('quizzes:quiz_result', args=[self.result.id]))
+        self.assertEqual(StudentAnswer.objects.filter(quiz_result=self.result).count(), 3)
+        self.assertEqual(StudentStats.objects.get(student=self.student).completed_count, 1)
+
+    def test_retry_after_the_busy_answer_was_written(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+        self.writer_may_write.set()
+        submission_writer.stop()
+        self.assert_saved_once(self.submit())
+
+    def test_retry_queued_behind_the_busy_answer(self):
+        self.assertEqual(self.submit().status_code, 503)
+
+        # The retry finds the attempt still open and is queued behind the first try,
+        # which is only written once the retry waits for its turn.
+        queue_submission = submission_writer.submit
+
+        def queue_and_write(**submission):
+            future = queue_submission(**submission)
+            self.writer_may_write.set()
+            return future
+
+        with mock.patch.object(submission_writer, 'submit', queue_and_write), self.settings(SUBMISSION_WAIT_SECONDS=5):
+            response = self.submit()
+        self.assert_saved_once(response)
+
+
+class RenderingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = create_unit(grade)
+        cls.matching = cls.unit.questions.get(question_type='MATCH')
+        for n in range(2, 8):
+            MatchingPair.objects.create(question=cls.matching, prompt_text=f'{n}', match_text=f'{n}')
+        cls.student = User.objects.create(username='student', grade=grade)
+
+    def setUp(self):
+        cache.clear()
+        # Adding the pairs moved the unit to a new content version.
+        self.unit.refresh_from_db()
+
+    def match_order(self, shuffle_seed):
+        card = render_question_cards(self.unit, shuffle_seed)[2]
+        return [int(pair_id) for pair_id in re.findall(r'data-point-id="(\d+)" data-side="match"', card)]
+
+    def test_matching_order_is_seeded_per_attempt(self):
+        attempt = QuizResult.objects.create(student=self.student, unit=self.unit)
+        self.assertEqual(QuizResult.objects.get(pk=attempt.pk).shuffle_seed, attempt.shuffle_seed)
+        order = self.match_order(attempt.shuffle_seed)
+        self.assertCountEqual(order, self.matching.matching_pairs.values_list('id', flat=True))
+
+        # A refresh is served from the cache, in the same order.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.match_order(attempt.shuffle_seed), order)
+
+        # Other attempts get other orders.
+        orders = {tuple(self.match_order(shuffle_seed)) for shuffle_seed in range(1, 6)}
+        self.assertGreater(len(orders), 1)
+
+    def test_editing_the_content_invalidates_the_cards(self):
+        self.assertNotIn('Twenty', render_question_cards(self.unit, 1)[0])
+
+        answer = Answer.objects.get(question__unit=self.unit, answer_text='5')
+        answer.answer_text = 'Twenty'
+        answer.save()
+        self.unit.refresh_from_db()
+        self.assertIn('Twenty', render_question_cards(self.unit, 1)[0])
+
+
+class ExpiryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = create_unit(grade)
+        cls.choice, cls.text, cls.matching = cls.unit.questions.order_by('order')
+        cls.students = [User.objects.create(username=f'student{n}', grade=grade) for n in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        started = timezone.now() - timedelta(minutes=30)
+        self.results = [QuizResult.objects.create(student=student, unit=self.unit) for student in self.students]
+        QuizResult.objects.filter(pk__in=[result.pk for result in self.results[:2]]).update(start_time=started)
+        # The first student answered one question correctly before running out of time.
+        answers = correct_answers(self.unit)
+        QuizDraft.objects.create(quiz_result=self.results[0], answers={str(self.choice.id): answers[str(self.choice.id)]})
+
+    def test_overdue_attempts_are_graded_from_their_draft(self):
+        self.assertEqual(expire_attempts(overdue_attempts()), 2)
+
+        drafted, empty, in_time = self.results
+        for result in self.results:
+            result.refresh_from_db()
+        self.assertAlmostEqual(drafted.score, 100 / 3)
+        self.assertEqual(empty.score, 0)
+        self.assertIsNone(in_time.completed_at)
+
+        answers = {answer.question_id: answer for answer in StudentAnswer.objects.filter(quiz_result=drafted)}
+        self.assertTrue(answers[self.choice.id].is_correct)
+        self.assertEqual([answers[question.id].text_answer for question in (self.text, self.matching)], [TIME_OUT_ANSWER] * 2)
+        self.assertFalse(QuizDraft.objects.exists())
+
+        # Nothing is closed, or counted, twice.
+        self.assertEqual(expire_attempts(overdue_attempts()), 0)
+        self.assertEqual(UnitStats.objects.get(unit=self.unit).attempt_count, 2)
+
+    def test_stats_match_a_rebuild(self):
+        expire_attempts(overdue_attempts())
+        fields = ('student_id', 'completed_count', 'score_sum', 'perfect_count', 'last_completed_at')
+        incremental = list(StudentStats.objects.order_by('student_id').values_list(*fields))
+        rebuild_student_stats()
+        self.assertEqual(list(StudentStats.objects.order_by('student_id').values_list(*fields)), incremental)
+        self.assertEqual(LeaderboardEntry.objects.count(), 2)
+
+
+class BadgeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = create_unit(grade)
+        cls.student = User.objects.create(username='student', grade=grade)
+        cls.first = Badge.objects.create(
+            name='First quiz', slug='first-quiz', description='',
+            conditions=[{'metric': 'completed_count', 'op': '>=', 'value': 1}],
+        )
+        cls.perfect = Badge.objects.create(
+            name='Perfect', slug='perfect', description='', award_mode=Badge.AwardMode.REPEAT,
+            conditions=[{'metric': 'score', 'op': '==', 'value': 100}],
+        )
+        cls.quick = Badge.objects.create(
+            name='Quick', slug='quick', description='', award_mode=Badge.AwardMode.REPEAT,
+            conditions=[{'metric': 'score', 'op': '>=', 'value': 50}, {'metric': 'time_ratio', 'op': '<', 'value': 0.5}],
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def complete(self, score, time_taken):
+        result = QuizResult.objects.create(student=self.student, unit=self.unit)
+        QuizResult.objects.filter(pk=result.pk).update(score=score, time_taken_seconds=time_taken, completed_at=timezone.now())
+        result.refresh_from_db()
+        check_and_award_badges(self.student, result)
+
+    def counts(self):
+        return dict(StudentBadge.objects.filter(student=self.student).values_list('badge__slug', 'count'))
+
+    def test_validate_conditions(self):
+        validate_conditions([{'metric': 'score', 'op': '>=', 'value': 80.5}])
+        for conditions in (
+            {'metric': 'score'},
+            [{'metric': 'score', 'op': '>='}],
+            [{'metric': 'speed', 'op': '>=', 'value': 1}],
+            [{'metric': 'score', 'op': '!=', 'value': 1}],
+            [{'metric': 'score', 'op': '>=', 'value': True}],
+        ):
+            with self.subTest(conditions=conditions), self.assertRaises(ValidationError):
+                validate_conditions(conditions)
+
+    def test_once_and_repeat_awards_match_the_backfill(self):
+        self.complete(100, 60)    # Time ratio 0.1.
+        self.complete(100, None)  # No time recorded: the time condition does not hold.
+        self.complete(40, 60)
+        expected = {'first-quiz': 1, 'perfect': 2, 'quick': 1}
+        self.assertEqual(self.counts(), expected)
+
+        StudentBadge.objects.all().delete()
+        backfill_badges()
+        self.assertEqual(self.counts(), expected)
+        # Running it again changes nothing.
+        backfill_badges()
+        self.assertEqual(self.counts(), expected)
+
+
+class LeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = Grade.objects.create(name='Grade 1')
+        # Scores, counts and times with ties, so every tiebreak of every board is used.
+        for n in range(15):
+            student = User.objects.create(username=f'student{n:02}', grade=cls.grade)
+            LeaderboardEntry.objects.create(
+                student=student, grade=cls.grade, average_score=(50, 75, 100)[n % 3], completed_count=1 + n % 4,
+                average_perfect_time=(None, 30.0, 45.0)[n % 3] if n % 5 else 30.0,
+            )
+
+    def test_positions_match_the_board_order(self):
+        for board in BOARDS:
+            ordered = list(board_entries(self.grade, board))
+            for index, entry in enumerate(ordered):
+                with self.subTest(board=board, student=entry.student_id):
+                    position = student_positions(entry.student)[board]
+                    self.assertEqual(position['rank'], index + 1)
+                    self.assertEqual(
+                        [(rank, neighbour.pk) for rank, neighbour in position['entries']],
+                        [(n + 1, other.pk) for n, other in enumerate(ordered) if abs(n - index) <= 2],
+                    )
+
+    def test_students_without_a_perfect_time_are_not_on_the_fastest_board(self):
+        entry = LeaderboardEntry.objects.filter(average_perfect_time__isnull=True).first()
+        positions = student_positions(entry.student)
+        self.assertIsNone(positions['fastest_solvers'])
+        self.assertIsNotNone(positions['top_scorers'])
+
+
+class DifficultyStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.unit = create_unit(grade)
+        cls.questions = list(cls.unit.questions.order_by('order'))
+        cls.students = [User.objects.create(username=f'student{n}', grade=grade) for n in range(2)]
+
+    def setUp(self):
+        cache.clear()
+
+    def submit(self, student, answers):
+        QuizResult.objects.create(student=student, unit=self.unit)
+        self.client.force_login(student)
+        response = self.client.post(
+            reverse('quizzes:submit_quiz', args=[self.unit.id]),
+            json.dumps({'answers': answers, 'time_taken_seconds': 60}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def counters(self):
+        return (
+            list(UnitStats.objects.values_list('unit_id', 'attempt_count', 'score_sum')),
+            list(QuestionStats.objects.order_by('question__order').values_list('question_id', 'attempt_count', 'correct_count')),
+        )
+
+    def test_counters_match_a_recount(self):
+        self.submit(self.students[0], correct_answers(self.unit))
+        self.submit(self.students[1], {})
+        self.assertEqual(self.counters(), (
+            [(self.unit.id, 2, 100)], [(question.id, 2, 1) for question in self.questions],
+        ))
+        self.assertEqual(reconcile_difficulty_stats(), 0)
+
+        # Deleting an attempt leaves the counters behind until they are reconciled.
+        QuizResult.objects.filter(student=self.students[1]).delete()
+        self.assertEqual(reconcile_difficulty_stats(), 4)
+        self.assertEqual(self.counters(), (
+            [(self.unit.id, 1, 100)], [(question.id, 1, 1) for question in self.questions],
+        ))
+        self.assertEqual(reconcile_difficulty_stats(), 0)
+
+    def test_expired_attempts_are_counted(self):
+        self.submit(self.students[0], correct_answers(self.unit))
+        result = QuizResult.objects.create(student=self.students[1], unit=self.unit)
+        QuizResult.objects.filter(pk=result.pk).update(start_time=timezone.now() - timedelta(minutes=30))
+        self.assertEqual(expire_attempts(overdue_attempts()), 1)
+
+        self.assertEqual(self.counters(), (
+            [(self.unit.id, 2, 100)], [(question.id, 2, 1) for question in self.questions],
+        ))
+        self.assertEqual(reconcile_difficulty_stats(), 0)
+
+
+class MistakesPageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.student = User.objects.create(username='student', grade=grade)
+        # Every question of both units is answered wrong in two attempts, so the bank
+        # holds each question twice and only the id orders the two entries.
+        for unit in (create_unit(grade, 2), create_unit(grade, 1)):
+            choice, text, _ = unit.questions.order_by('order')
+            wrong = {str(choice.id): str(choice.answers.get(is_correct=False).id), str(text.id): 'five'}
+            for _ in range(2):
+                result = QuizResult.objects.create(student=cls.student, unit=unit)
+                graded_answers, _ = grade_submission(get_answer_key(unit), wrong)
+                StudentAnswer.objects.bulk_create([StudentAnswer(quiz_result=result, **graded) for graded in graded_answers])
+                QuizResult.objects.filter(pk=result.pk).update(score=0, completed_at=timezone.now())
+                record_mistakes([result.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def bank(self):
+        mistakes = StudentMistake.objects.filter(student=self.student).select_related('unit', 'question')
+        return sorted(mistakes, key=lambda mistake: (mistake.unit.unit_number, mistake.question.order, mistake.pk))
+
+    def page_questions(self, page):
+        return [mistake['question'].id for mistakes in page['mistakes_by_unit'].values() for mistake in mistakes]
+
+    def pages(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = mistakes_page(self.student, cursor=cursor, per_page=per_page)
+            pages.append(self.page_questions(page))
+            cursor = page['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_pages_follow_the_bank_order(self):
+        bank = [mistake.question_id for mistake in self.bank()]
+        self.assertEqual(len(bank), 12)
+        # Page boundaries inside a pair of tied entries, between units, and at the very end.
+        for per_page, sizes in ((5, [5, 5, 2]), (6, [6, 6]), (12, [12])):
+            with self.subTest(per_page=per_page):
+                pages = self.pages(per_page)
+                self.assertEqual([len(page) for page in pages], sizes)
+                self.assertEqual(sum(pages, []), bank)
+
+    def test_bad_cursors_start_from_the_beginning(self):
+        first = self.page_questions(mistakes_page(self.student, per_page=5))
+        for cursor in ('', 'next', '1-2-3', '1-2-3-4-x'):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.page_questions(mistakes_page(self.student, cursor=cursor, per_page=5)), first)
+
+    def test_a_deleted_cursor_still_pages_on(self):
+        page = mistakes_page(self.student, per_page=5)
+        bank = self.bank()
+        # The last mistake of the page leaves the bank before the next page is requested.
+        bank.pop(4).delete()
+        page = mistakes_page(self.student, cursor=page['next_cursor'], per_page=5)
+        self.assertEqual(self.page_questions(page), [mistake.question_id for mistake in bank[4:9]])
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(name='Grade 1')
+        cls.units = [create_unit(grade, number) for number in (1, 2)]
+        student = User.objects.create(username='student', grade=grade)
+        for unit in cls.units:
+            result = QuizResult.objects.create(student=student, unit=unit)
+            graded_answers, _ = grade_submission(get_answer_key(unit), correct_answers(unit))
+            StudentAnswer.objects.bulk_create([StudentAnswer(quiz_result=result, **graded) for graded in graded_answers])
+            QuizResult.objects.filter(pk=result.pk).update(score=100, completed_at=timezone.now())
+        # An attempt in progress is never exported.
+        QuizResult.objects.create(student=User.objects.create(username='other', grade=grade), unit=cls.units[0])
+
+    def export(self, dataset, export_format='csv', compress=False, columns=None, **filters):
+        data = b''.join(stream_export(export_queryset(dataset, **filters), dataset, columns, export_format, compress))
+        return (gzip.decompress(data) if compress else data).decode('utf-8')
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('results'))))
+        self.assertEqual([row['unit_title'] for row in rows], ['Unit 1', 'Unit 2'])
+        self.assertEqual(rows[0]['username'], 'student')
+
+        rows = list(csv.reader(io.StringIO(self.export('answers', columns=['question_type', 'matching_answer'], unit_id=self.units[1].id))))
+        self.assertEqual(rows[0], ['question_type', 'matching_answer'])
+        self.assertEqual([row[0] for row in rows[1:]], ['MCQ', 'SA', 'MATCH'])
+        self.assertEqual(len(json.loads(rows[3][1])), 2)
+
+    def test_gzipped_json_lines(self):
+        lines = self.export('answers', export_format='jsonl', compress=True, columns=['unit_title', 'is_correct']).splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[0]), {'unit_title': 'Unit 1', 'is_correct': True})
+
+    def test_date_filters(self):
+        today = timezone.localdate()
+        self.assertEqual(self.export('results', date_from=today + timedelta(days=1)).splitlines()[1:], [])
+        self.assertEqual(len(self.export('results', date_to=today).splitlines()), 3)
@@ -1,7 +1,7 @@
 # /apps/quizzes/urls.py
 
 from django.urls import path
-from .views import take_quiz_view, submit_quiz_view, quiz_result_view,certificate_view # Import the new view
+from .views import take_quiz_view, submit_quiz_view, autosave_quiz_view, quiz_result_view,certificate_view # Import the new view
 
 
 app_name = 'quizzes'
@@ -13,6 +13,9 @@ urlpatterns = [
     # URL to submit the quiz answers (API endpoint)
     path('unit/<int:unit_id>/submit/', submit_quiz_view, name='submit_quiz'),
 
+    # URL to autosave in-progress answers (API endpoint)
+    path('unit/<int:unit_id>/autosave/', autosave_quiz_view, name='autosave_quiz'),
+
     # URL to view the quiz result
     path('result/<int:result_id>/', quiz_result_view, name='quiz_result'),
     path('result/<int:result_id>/certificate/', certificate_view, name='certificate'),
@@ -1,19 +1,27 @@
 # /apps/quizzes/views.py
 
 import json
-import random
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import timedelta
-from django.utils import timezone
-from django.db.models import Avg
+from django.db import transaction
 from django.http import JsonResponse, HttpResponseForbidden
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.utils import timezone
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 
 from apps.academics.models import Unit
-from .models import Question, Answer, QuizResult, StudentAnswer, MatchingPair, Badge, StudentBadge
+from apps.core.etags import conditional_page, page_etag
+from .models import QuizResult
+from .grading import get_answer_key, grade_submission
+from .rendering import render_question_cards
+from .expiry import expire_attempts
+from .breakdown import render_attempt_breakdown
+from .drafts import load_draft_answers, merge_draft_answers
+from .stamps import result_stamp
+from .submissions import SubmissionQueueFull, save_submission, submission_writer
 
 @login_required
 def take_quiz_view(request, unit_id):
@@ -31,15 +39,10 @@ def take_quiz_view(request, unit_id):
 
     if completed_attempt:
         # --- REVIEW MODE ---
-        detailed_answers = []
-        student_answers_qs = completed_attempt.student_answers.select_related('question', 'selected_answer').order_by('question__order')
-        for sa in student_answers_qs:
-            # (This logic can be expanded to match your quiz_review.html template's needs)
-            detailed_answers.append({'question': sa.question, 'student_answer': sa.text_answer or sa.selected_answer, 'is_correct': sa.is_correct})
-        
+        completed_attempt.unit = unit
         context = {
             'quiz_result': completed_attempt,
-            'detailed_answers': detailed_answers,
+            'breakdown_html': render_attempt_breakdown(completed_attempt, audience='student'),
         }
         return render(request, 'quizzes/quiz_review.html', context)
 
@@ -55,13 +58,8 @@ def take_quiz_view(request, unit_id):
     end_time = start_time + duration
 
     if timezone.now() >= end_time:
-        if attempt.score is None:
-             attempt.score = 0
-             attempt.completed_at = timezone.now()
-             attempt.save()
-             for question in unit.questions.all():
-                 # CORRECTED: Use 'text_answer' instead of 'student_answer'
-                 StudentAnswer.objects.get_or_create(quiz_result=attempt, question=question, defaults={'text_answer': "Time Out"})
+        # Usually already closed by the expire_quiz_attempts sweeper; this is the fallback.
+        expire_attempts(QuizResult.objects.filter(pk=attempt.pk))
         return redirect('quizzes:quiz_result', result_id=attempt.id)
 
     time_remaining = end_time - timezone.now()
@@ -69,16 +67,14 @@ def take_quiz_view(request, unit_id):
     minutes_remaining = time_remaining_seconds // 60
     seconds_remaining = time_remaining_seconds % 60
 
-    questions = unit.questions.prefetch_related('answers', 'matching_pairs').order_by('order')
-    for question in questions:
-        if question.question_type in ['MATCH', 'MATI']:
-            matches = list(question.matching_pairs.all())
-            random.shuffle(matches)
-            question.shuffled_matches = matches
-            
+    # The question markup is cached per unit content version; only the matching
+    # order (seeded per attempt) and the timer are applied per request.
+    question_cards = render_question_cards(unit, attempt.shuffle_seed)
+
     context = {
         'unit': unit,
-        'questions': questions,
+        'question_cards': question_cards,
+        'draft_answers': load_draft_answers(attempt),
         'time_remaining_seconds': time_remaining_seconds,
         'minutes_remaining': minutes_remaining,
         'seconds_remaining': seconds_remaining,
@@ -101,59 +97,63 @@ def submit_quiz_view(request, unit_id):
         time_taken = data.get('time_taken_seconds', 0)
         unit = get_object_or_404(Unit, id=unit_id)
 
-        # Find the in-progress quiz attempt. If it doesn't exist, something is wrong.
-        result = get_object_or_404(QuizResult, student=request.user, unit=unit, completed_at__isnull=True)
-
-        correct_answers_count = 0
-        questions = unit.questions.prefetch_related('answers', 'matching_pairs').all()
-
-        for question in questions:
-            question_id_str = str(question.id)
-            is_correct = False
-            student_answer_obj = StudentAnswer(quiz_result=result, question=question)
-
-            if question.question_type in ['MCQ', 'MCQI', 'TF']:
-                answer_id = submitted_answers.get(question_id_str)
-                if answer_id:
-                    try:
-                        selected_answer = Answer.objects.get(id=answer_id, question=question)
-                        student_answer_obj.selected_answer = selected_answer
-                        if selected_answer.is_correct:
-                            is_correct = True
-                    except Answer.DoesNotExist:
-                        pass
-
-            elif question.question_type in ['SA', 'FITB']:
-                text_answer = submitted_answers.get(question_id_str, "").strip()
-                student_answer_obj.text_answer = text_answer
-                correct_answer = question.answers.filter(is_correct=True).first()
-                if correct_answer and text_answer.lower() == correct_answer.answer_text.lower():
-                    is_correct = True
-
-            elif question.question_type in ['MATCH', 'MATI']:
-                matching_answers = submitted_answers.get(question_id_str, {})
-                student_answer_obj.matching_answer = matching_answers
-                correct_matches = sum(1 for prompt_id, match_id in matching_answers.items() if str(prompt_id) == str(match_id))
-                if question.matching_pairs.count() > 0 and correct_matches == question.matching_pairs.count():
-                    is_correct = True
-            
-            if is_correct:
-                correct_answers_count += 1
-            
-            student_answer_obj.is_correct = is_correct
-            student_answer_obj.save()
-
-        total_questions = questions.count()
+        # Find the in-progress quiz attempt. If it doesn't exist, something is wrong,
+        # unless this is a retry whose first try was saved after the client gave up.
+        result = QuizResult.objects.filter(student=request.user, unit=unit, completed_at__isnull=True).first()
+        if result is None:
+            completed = get_object_or_404(QuizResult, student=request.user, unit=unit, completed_at__isnull=False)
+            return JsonResponse({
+                'success': True,
+                'redirect_url': reverse('quizzes:quiz_result', kwargs={'result_id': completed.id})
+            })
+
+        # Answers sent with the submission win over the autosaved draft, so nothing
+        # is lost when the page was reloaded or the timer forced the submit.
+        submitted_answers = {**load_draft_answers(result), **submitted_answers}
+
+        # Grade in memory against the unit's cached answer key.
+        answer_key = get_answer_key(unit)
+        graded_answers, correct_answers_count = grade_submission(answer_key, submitted_answers)
+
+        total_questions = len(graded_answers)
         score = (correct_answers_count / total_questions) * 100 if total_questions > 0 else 0
-        
-        # Update the existing result object instead of creating a new one
-        result.score = score
-        result.completed_at = timezone.now()
-        result.time_taken_seconds = time_taken
-        result.save()
-
-        check_and_award_badges(request.user, result)
-        
+        completed_at = timezone.now()
+
+        submission = {
+            'result': result,
+            'unit': unit,
+            'student_id': request.user.id,
+            'graded_answers': graded_answers,
+            'score': score,
+            'time_taken': time_taken,
+            'completed_at': completed_at,
+        }
+        if settings.SUBMISSION_QUEUE_ENABLED:
+            # The single writer thread commits the submission; a full queue or a slow
+            # writer sends the client back to retry instead of piling up requests.
+            try:
+                saved = submission_writer.submit(**submission).result(timeout=settings.SUBMISSION_WAIT_SECONDS)
+            except (SubmissionQueueFull, FutureTimeoutError):
+                response = JsonResponse({
+                    'success': False,
+                    'error': 'The server is busy. Your answers will be sent again shortly.',
+                    'retry_after': settings.SUBMISSION_RETRY_AFTER_SECONDS,
+                }, status=503)
+                response['Retry-After'] = str(settings.SUBMISSION_RETRY_AFTER_SECONDS)
+                return response
+        else:
+            with transaction.atomic():
+                saved = save_submission(**submission)
+        if not saved:
+            # A retry that was queued while its first try was still being written finds
+            # the attempt completed: it gets the same answer as the first try would have.
+            if QuizResult.objects.filter(pk=result.pk, completed_at__isnull=False).exists():
+                return JsonResponse({
+                    'success': True,
+                    'redirect_url': reverse('quizzes:quiz_result', kwargs={'result_id': result.id})
+                })
+            return JsonResponse({'success': False, 'error': 'This quiz has already been submitted.'}, status=409)
+
         return JsonResponse({
             'success': True,
             'redirect_url': reverse('quizzes:quiz_result', kwargs={'result_id': result.id})
@@ -164,12 +164,51 @@ def submit_quiz_view(request, unit_id):
 
 
 @login_required
+@require_POST
+def autosave_quiz_view(request, unit_id):
+    """
+    Stores a debounced batch of partial answers in the attempt's draft.
+    The quiz page calls this every few seconds while the student is answering.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+
+    partial_answers = data.get('answers')
+    if not isinstance(partial_answers, dict):
+        return JsonResponse({'success': False, 'error': 'Answers must be an object.'}, status=400)
+
+    unit = get_object_or_404(Unit, id=unit_id, grade_id=request.user.grade_id, is_published=True)
+    result = QuizResult.objects.filter(student=request.user, unit=unit, completed_at__isnull=True).first()
+    if result is None or timezone.now() >= result.start_time + timedelta(minutes=unit.duration_minutes):
+        return JsonResponse({'success': False, 'error': 'This quiz is no longer in progress.'}, status=409)
+
+    # Only keep answers for questions that belong to this unit.
+    question_ids = {str(question_id) for question_id, _ in get_answer_key(unit)['questions']}
+    partial_answers = {key: value for key, value in partial_answers.items() if key in question_ids}
+    if partial_answers:
+        merge_draft_answers(result, partial_answers)
+
+    return JsonResponse({'success': True, 'saved': len(partial_answers)})
+
+
+def result_etag(request, result_id):
+    stamp = result_stamp(result_id, request.user.pk)
+    if stamp is None:
+        return None  # Not found.
+    return page_etag(request, result_id, stamp)
+
+
+@login_required
+@conditional_page(result_etag)
 def quiz_result_view(request, result_id):
     result = get_object_or_404(QuizResult, id=result_id, student=request.user)
     return render(request, 'quizzes/quiz_result.html', {'result': result})
 
 
 @login_required
+@conditional_page(result_etag)
 def certificate_view(request, result_id):
     result = get_object_or_404(QuizResult, id=result_id, student=request.user)
 
@@ -177,49 +216,3 @@ def certificate_view(request, result_id):
         return HttpResponseForbidden("You are not authorized to view this certificate.")
 
     return render(request, 'quizzes/certificate.html', {'result': result})
-
-
-def award_badge(student, badge_slug):
-    """
-    دالة مساعدة لمنح شارة للطالب أو زيادة عدّادها.
-    """
-    try:
-        badge = Badge.objects.get(slug=badge_slug)
-        student_badge, created = StudentBadge.objects.get_or_create(
-            student=student,
-            badge=badge
-        )
-        if not created:
-            student_badge.count += 1
-            student_badge.save()
-    except Badge.DoesNotExist:
-        pass
-
-def check_and_award_badges(student, quiz_result):
-    """
-    الدالة الرئيسية التي تتحقق من جميع الشارات بعد تسليم الاختبار.
-    """
-    # 1. شارة "العلامة الكاملة"
-    if quiz_result.score == 100:
-        award_badge(student, 'perfect_score')
-
-    # 2. شارة "المثابر" (عند إكمال 5 اختبارات)
-    total_quizzes = QuizResult.objects.filter(student=student, completed_at__isnull=False).count()
-    if total_quizzes == 5:
-        award_badge(student, 'persistent_learner')
-
-    # 3. شارة "المحترف" (عندما يتجاوز متوسط الدرجات 90%)
-    avg_score = QuizResult.objects.filter(student=student, completed_at__isnull=False).aggregate(average=Avg('score'))['average']
-    if avg_score and avg_score >= 90:
-        try:
-            badge = Badge.objects.get(slug='pro_student')
-            StudentBadge.objects.get_or_create(student=student, badge=badge)
-        except Badge.DoesNotExist:
-            pass
-
-    # 4. شارة "الصاروخ" (إذا أنهى الاختبار في أقل من نصف الوقت المحدد وحصل على 80% أو أعلى)
-    if quiz_result.time_taken_seconds and quiz_result.unit.duration_minutes:
-        time_limit_seconds = quiz_result.unit.duration_minutes * 60
-        # --- THIS IS THE MODIFIED LOGIC ---
-        if quiz_result.time_taken_seconds < (time_limit_seconds / 2) and quiz_result.score >= 80:
-            award_badge(student, 'rocket_solver')
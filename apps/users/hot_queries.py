@@ -0,0 +1,16 @@
+# /apps/users/hot_queries.py
+
+from apps.core.queryplans import register_hot_query
+from .models import User
+
+
+@register_hot_query('users.students')
+def students():
+    # The student count of the dashboard and the student list.
+    return User.objects.filter(user_type=User.UserType.STUDENT).values_list('id', flat=True)
+
+
+@register_hot_query('users.grade_students')
+def grade_students():
+    # Roster promotion and the per-grade student lists.
+    return User.objects.filter(user_type=User.UserType.STUDENT, grade_id=1)
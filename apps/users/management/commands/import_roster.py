@@ -0,0 +1,42 @@
+# /apps/users/management/commands/import_roster.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.roster import RosterError, create_students, credentials_csv, read_roster
+
+
+class Command(BaseCommand):
+    help = ('Creates student accounts from a roster CSV (username, first_name, last_name, email, grade, password) '
+            'and writes a credentials sheet. Blank passwords are generated.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', type=str, help='The path to the roster CSV file.')
+        parser.add_argument('--credentials', type=str, help='Where to write the credentials CSV (default: <roster>-credentials.csv).')
+        parser.add_argument('--workers', type=int, help='Number of processes used to hash passwords (default: one per CPU).')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the roster.')
+
+    def handle(self, *args, **options):
+        with open(options['roster'], 'r', encoding='utf-8-sig', newline='') as f:
+            try:
+                rows = read_roster(f)
+            except RosterError as exc:
+                for line, message in exc.errors:
+                    self.stderr.write(self.style.ERROR(f'Line {line}: {message}'))
+                raise CommandError(f'The roster has {len(exc.errors)} problem(s); no students were created.')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'The roster is valid: {len(rows)} student(s) would be created.'))
+            return
+
+        started = time.monotonic()
+        credentials = create_students(rows, workers=options['workers'])
+        credentials_path = options['credentials'] or f'{os.path.splitext(options["roster"])[0]}-credentials.csv'
+        with open(credentials_path, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(credentials_csv(credentials))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(credentials)} student(s) in {time.monotonic() - started:.1f}s. '
+            f'Credentials written to {credentials_path}.'
+        ))
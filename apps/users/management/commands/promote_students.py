@@ -0,0 +1,37 @@
+# /apps/users/management/commands/promote_students.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academics.models import Grade
+from apps.users.roster import promote_students
+
+
+class Command(BaseCommand):
+    help = 'Moves students between grades in one update, e.g. at the end of the school year.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--move', action='append', default=[], metavar='FROM=TO',
+            help='Grade names, e.g. --move "Grade 1=Grade 2". Leave TO empty to clear the grade. Repeatable.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['move']:
+            raise CommandError('Give at least one --move FROM=TO.')
+        grades = {grade.name: grade.id for grade in Grade.objects.all()}
+        promotions = {}
+        for move in options['move']:
+            from_name, separator, to_name = (part.strip() for part in move.partition('='))
+            if not separator:
+                raise CommandError(f'Invalid move "{move}"; use FROM=TO.')
+            for name in filter(None, (from_name, to_name)):
+                if name not in grades:
+                    raise CommandError(f'Grade "{name}" does not exist.')
+            if not from_name:
+                raise CommandError(f'Invalid move "{move}"; FROM is required.')
+            if grades[from_name] in promotions:
+                raise CommandError(f'Grade "{from_name}" is moved more than once.')
+            promotions[grades[from_name]] = grades[to_name] if to_name else None
+
+        moved = promote_students(promotions)
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} student(s).'))
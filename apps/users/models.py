@@ -38,4 +38,6 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
+        # Student lists and counts, overall and per grade.
+        indexes = [models.Index(fields=['user_type', 'grade'], name='users_user_type_grade')]
 
@@ -0,0 +1,170 @@
+# /apps/users/roster.py
+
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.crypto import get_random_string
+
+from apps.academics.models import Grade
+from apps.quizzes.leaderboards import refresh_leaderboard_entries
+
+from .models import User
+
+ROSTER_COLUMNS = ('username', 'first_name', 'last_name', 'email', 'grade', 'password')
+REQUIRED_COLUMNS = ('username', 'grade')
+CREDENTIAL_COLUMNS = ('username', 'password', 'first_name', 'last_name', 'grade')
+
+# Generated passwords avoid look-alike characters (0/O, 1/l/I) so they can be read off paper.
+PASSWORD_ALPHABET = 'abcdefghjkmnpqrstuvwxyzABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+PASSWORD_LENGTH = 10
+
+# Below this many passwords, starting worker processes costs more than it saves.
+PARALLEL_HASH_THRESHOLD = 20
+ROSTER_BATCH_SIZE = 500
+
+
+class RosterError(Exception):
+    """
+    A roster failed validation. `errors` lists (line number, message) for every bad row.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f'line {line}: {message}' for line, message in errors))
+
+
+def read_roster(stream):
+    """
+    Parses and validates a whole roster CSV before anything is written. Returns the rows
+    as dicts with the grade resolved and a password filled in (generated when the
+    roster leaves it blank), or raises RosterError listing every problem found.
+    """
+    reader = csv.DictReader(stream)
+    header = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise RosterError([(1, f"Missing column(s): {', '.join(missing)}.")])
+    reader.fieldnames = header
+
+    rows, errors, seen = [], [], {}
+    for line, raw in enumerate(reader, start=2):
+        row = {name: (raw.get(name) or '').strip() for name in ROSTER_COLUMNS}
+        if not any(row.values()):
+            continue
+        row['line'] = line
+        try:
+            User.username_validator(row['username'])
+        except ValidationError as exc:
+            errors.append((line, f'Invalid username "{row["username"]}": {exc.messages[0]}'))
+        if len(row['username']) > 150:
+            errors.append((line, 'Username is longer than 150 characters.'))
+        if row['username'] in seen:
+            errors.append((line, f'Username "{row["username"]}" is repeated (first on line {seen[row["username"]]}).'))
+        seen.setdefault(row['username'], line)
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                errors.append((line, f'Invalid email "{row["email"]}".'))
+        rows.append(row)
+
+    # Usernames and grades are checked against the database with one query each.
+    taken = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+    grades = {grade.name: grade for grade in Grade.objects.filter(name__in={row['grade'] for row in rows})}
+    for row in rows:
+        if row['username'] in taken:
+            errors.append((row['line'], f'Username "{row["username"]}" already exists.'))
+        row['grade'] = grades.get(row['grade'], row['grade'])
+        if not isinstance(row['grade'], Grade):
+            errors.append((row['line'], f'Grade "{row["grade"]}" does not exist.'))
+    if errors:
+        raise RosterError(sorted(errors))
+
+    for row in rows:
+        row['password'] = row['password'] or get_random_string(PASSWORD_LENGTH, PASSWORD_ALPHABET)
+    return rows
+
+
+def _setup_worker():
+    # Spawned workers start without Django configured; forked ones already have it.
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes the passwords with the configured hasher, spreading the work over a pool
+    of processes. The hash is deliberately slow, so this is what dominates a large import.
+    """
+    passwords = list(passwords)
+    if workers == 1 or len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 64)))
+
+
+def create_students(rows, workers=None):
+    """
+    Creates the validated roster rows as student accounts with bulk inserts.
+    Returns the credentials sheet rows.
+    """
+    hashes = hash_passwords((row['password'] for row in rows), workers=workers)
+    users = [
+        User(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            grade=row['grade'],
+            user_type=User.UserType.STUDENT,
+            password=password_hash,
+        )
+        for row, password_hash in zip(rows, hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=ROSTER_BATCH_SIZE)
+    return [
+        {
+            'username': row['username'],
+            'password': row['password'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'grade': row['grade'].name,
+        }
+        for row in rows
+    ]
+
+
+def credentials_csv(credentials):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CREDENTIAL_COLUMNS)
+    writer.writeheader()
+    writer.writerows(credentials)
+    return buffer.getvalue()
+
+
+def promote_students(promotions):
+    """
+    Moves every student between grades with a single UPDATE. `promotions` maps a grade
+    id to the grade id its students move to, or to None to clear their grade (e.g. the
+    final year). The CASE is evaluated against the old values, so chains such as
+    1 -> 2 and 2 -> 3 move each student exactly once. Returns the number of students moved.
+    """
+    promotions = {from_id: to_id for from_id, to_id in promotions.items() if from_id != to_id}
+    if not promotions:
+        return 0
+    students = User.objects.filter(user_type=User.UserType.STUDENT, grade_id__in=promotions)
+    with transaction.atomic():
+        student_ids = list(students.values_list('id', flat=True))
+        moved = students.update(grade_id=Case(
+            *[When(grade_id=from_id, then=Value(to_id)) for from_id, to_id in promotions.items()],
+            output_field=IntegerField(),
+        ))
+        # The update bypasses the save signals that normally move leaderboard entries.
+        refresh_leaderboard_entries(student_ids)
+    return moved
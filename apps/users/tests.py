@@ -1,3 +1,102 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from apps.academics.models import Grade
+from apps.quizzes.models import LeaderboardEntry, StudentStats
+
+from .models import User
+from .roster import PASSWORD_LENGTH, RosterError, create_students, promote_students, read_roster
+
+
+def roster(*lines):
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = Grade.objects.create(name='Grade 1')
+        User.objects.create(username='taken', grade=cls.grade)
+
+    def test_valid_roster(self):
+        rows = read_roster(roster(
+            'Username,Grade,First_Name,Password',
+            'amal,Grade 1,Amal,secret123',
+            ',,,',
+            'omar,Grade 1,Omar,',
+        ))
+        self.assertEqual([(row['username'], row['grade'], row['line']) for row in rows], [('amal', self.grade, 2), ('omar', self.grade, 4)])
+        self.assertEqual(rows[0]['password'], 'secret123')
+        self.assertEqual(len(rows[1]['password']), PASSWORD_LENGTH)
+
+        credentials = create_students(rows, workers=1)
+        self.assertEqual([row['password'] for row in credentials], [row['password'] for row in rows])
+        for row in rows:
+            student = User.objects.get(username=row['username'])
+            self.assertEqual((student.user_type, student.grade), (User.UserType.STUDENT, self.grade))
+            self.assertTrue(student.check_password(row['password']))
+
+    def test_every_problem_is_reported(self):
+        with self.assertRaises(RosterError) as raised:
+            read_roster(roster(
+                'username,grade,email',
+                'amal,Grade 1,not-an-email',
+                'amal,Grade 1,',
+                'taken,Grade 1,',
+                'bad name,Grade 9,',
+            ))
+        self.assertEqual([line for line, _ in raised.exception.errors], [2, 3, 4, 5, 5])
+        messages = ' '.join(message for _, message in raised.exception.errors)
+        for expected in ('Invalid email', 'repeated (first on line 2)', '"taken" already exists', 'Invalid username', '"Grade 9" does not exist'):
+            self.assertIn(expected, messages)
+
+        with self.assertRaises(RosterError) as raised:
+            read_roster(roster('username,first_name', 'amal,Amal'))
+        self.assertEqual(raised.exception.errors, [(1, 'Missing column(s): grade.')])
+
+    def test_import_roster_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'roster.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('username,grade\namal,Grade 1\nomar,Grade 1\n')
+
+        call_command('import_roster', path, dry_run=True, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username='amal').exists())
+
+        call_command('import_roster', path, workers=1, stdout=io.StringIO())
+        with open(os.path.join(directory, 'roster-credentials.csv'), encoding='utf-8-sig') as f:
+            credentials = f.read().splitlines()
+        self.assertEqual(credentials[0], 'username,password,first_name,last_name,grade')
+        self.assertEqual([line.split(',')[0] for line in credentials[1:]], ['amal', 'omar'])
+
+        # Importing it again fails as a whole.
+        with self.assertRaises(CommandError):
+            call_command('import_roster', path, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(User.objects.filter(username__in=['amal', 'omar']).count(), 2)
+
+
+class PromoteStudentsTests(TestCase):
+
+    def test_chained_promotions_move_each_student_once(self):
+        grades = [Grade.objects.create(name=f'Grade {n}') for n in range(1, 4)]
+        students = [User.objects.create(username=f'student{n}', grade=grade) for n, grade in enumerate(grades)]
+        admin = User.objects.create(username='admin', user_type=User.UserType.ADMIN, grade=grades[0])
+        StudentStats.objects.create(student=students[0], completed_count=1, score_sum=80, average_score=80)
+        LeaderboardEntry.objects.create(student=students[0], grade=grades[0], average_score=80, completed_count=1)
+
+        moved = promote_students({grades[0].id: grades[1].id, grades[1].id: grades[2].id, grades[2].id: None})
+        self.assertEqual(moved, 3)
+        self.assertEqual(
+            [User.objects.get(pk=student.pk).grade_id for student in students], [grades[1].id, grades[2].id, None],
+        )
+        self.assertEqual(User.objects.get(pk=admin.pk).grade, grades[0])
+        # Leaderboard rows follow their students; a student without a grade has none.
+        self.assertEqual(LeaderboardEntry.objects.get().grade, grades[1])
@@ -39,6 +39,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Answers static file requests before any other middleware runs.
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Before the session and auth middleware, so the session and user lookups are counted too.
+    'apps.core.middleware.QueryStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +79,33 @@ DATABASES = {
     }
 }
 
+# Production SQLite mode, switched on with SQLITE_PRODUCTION_MODE=True:
+# - WAL journaling, so readers never wait for the writer (the database must be on a local disk).
+# - Every transaction starts with BEGIN IMMEDIATE and waits up to 20s for the write lock, instead
+#   of failing with "database is locked" when two transactions try to upgrade their read locks.
+# - Connections are kept open between requests and checked before being reused.
+# `python manage.py benchmark_concurrent_submits` compares it with the default mode.
+SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', 'False') == 'True'
+SQLITE_PRODUCTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA mmap_size=134217728',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA temp_store=MEMORY',
+]
+SQLITE_PRODUCTION_DATABASE = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'init_command': ';'.join(SQLITE_PRODUCTION_PRAGMAS),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
+}
+if SQLITE_PRODUCTION_MODE:
+    DATABASES['default'].update(SQLITE_PRODUCTION_DATABASE)
+
 
 # --- Password validation ---
 AUTH_PASSWORD_VALIDATORS = [
@@ -109,6 +140,23 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+# collectstatic stores every file under a content-hashed name (css/app.3f2a….css) with
+# gzip and brotli copies next to it. WhiteNoise serves those copies to browsers that accept
+# them, and the hashed names with a far-future Cache-Control header, since a changed file
+# gets a new name. On PythonAnywhere, remove the /static/ mapping of the Web tab so the
+# requests reach WhiteNoise.
+# Deploying a change to templates or static files:
+#   1. `python manage.py build_css` on a development machine when classes in templates, forms
+#      or static/js changed, and commit static/css/app.css with them;
+#   2. `python manage.py collectstatic --noinput` on the server after pulling (STATIC_ROOT is
+#      not in the repository), then reload the web app.
+# With DEBUG off, wsgi.py refuses to start while a static file is missing from the manifest.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# The Tailwind CLI that build_css runs to produce static/css/app.css.
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', 'tailwindcss')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -120,5 +168,31 @@ AUTH_USER_MODEL = 'users.User'
 LOGIN_REDIRECT_URL = 'users:redirect_after_login'
 LOGOUT_REDIRECT_URL = '/'
 
+# --- Background Jobs ---
+# By default jobs run right after the request that enqueued them, so no worker is needed.
+# Deployments that run `python manage.py run_jobs` as a separate process set
+# JOB_QUEUE_EAGER=False: jobs are then stored in the database and executed by that worker,
+# which keeps the badge checks of a submission out of the request.
+JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER', 'True') == 'True'
+
+# --- Submission Queue ---
+# With SUBMISSION_QUEUE_ENABLED=True, graded submissions are written by a single writer
+# thread per process that commits up to SUBMISSION_BATCH_SIZE of them per transaction
+# (see apps/quizzes/submissions.py). A request waits up to SUBMISSION_WAIT_SECONDS for its
+# submission to be committed; when the queue is full or the wait runs out it answers
+# 503 with a Retry-After header, and the quiz page sends the answers again.
+SUBMISSION_QUEUE_ENABLED = os.environ.get('SUBMISSION_QUEUE_ENABLED', 'False') == 'True'
+SUBMISSION_QUEUE_SIZE = 200
+SUBMISSION_BATCH_SIZE = 50
+SUBMISSION_WAIT_SECONDS = 10
+SUBMISSION_RETRY_AFTER_SECONDS = 3
+
+# --- Query Stats ---
+# QueryStatsMiddleware counts the SQL queries of every request per view (see
+# apps/core/querystats.py for the per-view budgets); the figures are written to the
+# database at most every QUERY_STATS_FLUSH_SECONDS and listed on the dashboard.
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', 'True') == 'True'
+QUERY_STATS_FLUSH_SECONDS = 60
+
 # Add your domain here for security when using HTTPS
 CSRF_TRUSTED_ORIGINS = ['https://7ellhaonline.pythonanywhere.com']
\ No newline at end of file
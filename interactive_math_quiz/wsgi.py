@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'interactive_math_quiz.settings')
 
 application = get_wsgi_application()
+
+# Fails here, with the command to run, instead of on every page when collectstatic was skipped.
+from apps.core.staticfiles import check_static_manifest
+
+check_static_manifest()
@@ -0,0 +1,40 @@
+// /static/js/certificate.js
+// Draws the certificate (quizzes/certificate.html) and downloads it as a PDF.
+
+function generatePDF() {
+    const certificate = document.getElementById('certificate-to-download');
+    const studentName = document.getElementById('student-name').textContent.trim();
+    const fileName = `Certificate-${studentName}.pdf`;
+
+    const statusText = document.getElementById('status-text');
+    const spinner = document.getElementById('loading-spinner');
+    const actionButtons = document.getElementById('action-buttons');
+    
+    statusText.textContent = 'Capturing certificate design...';
+    spinner.style.display = 'block';
+    actionButtons.style.display = 'none';
+
+    html2canvas(certificate, { scale: 2, useCORS: true })
+        .then(canvas => {
+            statusText.textContent = 'Converting to PDF...';
+            const imgData = canvas.toDataURL('image/png');
+            const { jsPDF } = window.jspdf;
+            const pdf = new jsPDF({ orientation: 'landscape', unit: 'in', format: [11, 8.5] });
+            pdf.addImage(imgData, 'PNG', 0, 0, 11, 8.5);
+            
+            statusText.textContent = 'Download starting...';
+            pdf.save(fileName);
+
+            statusText.textContent = 'Certificate downloaded successfully!';
+            spinner.style.display = 'none';
+            actionButtons.style.display = 'block';
+        })
+        .catch(err => {
+            console.error("PDF Generation Error:", err);
+            statusText.textContent = 'Sorry, an error occurred while generating the PDF.';
+        });
+}
+
+window.addEventListener('load', generatePDF);
+
+document.getElementById('download-again').addEventListener('click', generatePDF);
@@ -0,0 +1,315 @@
+// /static/js/quiz.js
+// The quiz page (quizzes/quiz.html).
+
+document.addEventListener('DOMContentLoaded', function() {
+    const quizForm = document.getElementById('quiz-form');
+    const submitBtn = document.getElementById('submit-btn');
+    const viewResultBtn = document.getElementById('view-result-btn');
+    const timerDisplay = document.getElementById('timer');
+    const progressText = document.getElementById('progress-text');
+    const progressBar = document.getElementById('progress-bar');
+    const totalQuestions = document.querySelectorAll('.question-card').length;
+    const csrfToken = quizForm.querySelector('input[name="csrfmiddlewaretoken"]').value;
+    
+    let timeRemaining = parseInt(quizForm.dataset.timeRemaining, 10);
+    const startTime = Date.now();
+    let quizSubmitted = false;
+    let isForcedSubmit = false; // Flag to indicate if submission is forced by the timer
+
+    // --- Main Submit Handler ---
+    quizForm.addEventListener('submit', function(event) {
+        event.preventDefault();
+        if (quizSubmitted) return;
+
+        // Validation: Only check for unanswered questions if the user clicked manually
+        if (!isForcedSubmit) {
+            const firstUnanswered = findFirstUnansweredQuestion();
+            if (firstUnanswered) {
+                firstUnanswered.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                firstUnanswered.style.transition = 'border 0.3s';
+                firstUnanswered.style.border = '3px solid #e57373';
+                setTimeout(() => { firstUnanswered.style.border = ''; }, 2000);
+                return;
+            }
+        }
+
+        quizSubmitted = true;
+        submitBtn.disabled = true;
+        submitBtn.textContent = 'Submitting...';
+        const timeTakenSeconds = Math.round((Date.now() - startTime) / 1000);
+
+        // Lock inputs and collect answers
+        quizForm.querySelectorAll('input, select, textarea').forEach(el => el.disabled = true);
+        document.querySelectorAll('.connect-point').forEach(p => p.style.pointerEvents = 'none');
+
+        const collectedAnswers = {};
+        document.querySelectorAll('.question-card').forEach(card => {
+            card.classList.add('answered');
+            const qId = card.dataset.questionId;
+            const qType = card.dataset.questionType;
+            const feedbackIcon = card.querySelector('.feedback-icon');
+
+            if (qType === 'MCQ' || qType === 'MCQI' || qType === 'TF') {
+                const selected = card.querySelector('input[type="radio"]:checked');
+                if (selected) {
+                    collectedAnswers[qId] = selected.value;
+                    const isCorrect = selected.dataset.isCorrect === 'true';
+                    feedbackIcon.textContent = isCorrect ? '✅' : '❌';
+                    selected.parentElement.classList.add(isCorrect ? 'correct' : 'incorrect');
+                    if (!isCorrect) card.querySelector('input[data-is-correct="true"]').parentElement.classList.add('correct');
+                }
+            } else if (qType === 'SA' || qType === 'FITB') {
+                const input = card.querySelector('input[type="text"]');
+                collectedAnswers[qId] = input.value;
+                const isCorrect = input.value.trim().toLowerCase() === input.dataset.correctAnswer;
+                feedbackIcon.textContent = isCorrect ? '✅' : '❌';
+                input.classList.add(isCorrect ? 'border-green-500' : 'border-red-500', 'border-2');
+            } else if (qType === 'MATCH' || qType === 'MATI') {
+                const container = card.querySelector('.matching-container');
+                collectedAnswers[qId] = container.connections;
+            }
+        });
+
+        // Send data to the server. A busy server answers 503 with a Retry-After
+        // header; the same answers are then sent again after that delay.
+        const sendSubmission = () => fetch(quizForm.dataset.submitUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+            body: JSON.stringify({ answers: collectedAnswers, time_taken_seconds: timeTakenSeconds })
+        })
+        .then(response => {
+            if (response.status === 503) {
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 3;
+                submitBtn.textContent = 'Server busy, retrying...';
+                return new Promise(resolve => setTimeout(resolve, retryAfter * 1000)).then(sendSubmission);
+            }
+            return response.json().then(data => {
+                if (data.success) {
+                    viewResultBtn.href = data.redirect_url;
+                    submitBtn.style.display = 'none';
+                    viewResultBtn.style.display = 'inline-block';
+                } else {
+                    alert('An error occurred. Please try again.');
+                    submitBtn.disabled = false;
+                    submitBtn.textContent = 'Submit Quiz';
+                    quizSubmitted = false;
+                }
+            });
+        });
+        sendSubmission();
+    });
+
+    // --- Timer Logic ---
+    const timerInterval = setInterval(() => {
+        if (quizSubmitted) {
+            clearInterval(timerInterval);
+            return;
+        }
+        timeRemaining--;
+        const minutes = Math.floor(timeRemaining / 60);
+        const seconds = timeRemaining % 60;
+        timerDisplay.textContent = `${minutes}:${seconds < 10 ? '0' : ''}${seconds}`;
+
+        if (timeRemaining <= 0) {
+            clearInterval(timerInterval);
+            timerDisplay.textContent = "Time's Up!";
+            if (!quizSubmitted) {
+                isForcedSubmit = true; // Set flag to bypass validation
+                quizForm.dispatchEvent(new Event('submit'));
+            }
+        }
+    }, 1000);
+
+    // --- Helper Functions ---
+    function findFirstUnansweredQuestion() {
+        for (const card of document.querySelectorAll('.question-card')) {
+            const qType = card.dataset.questionType;
+            let isAnswered = false;
+            if (qType === 'MCQ' || qType === 'MCQI' || qType === 'TF') {
+                if (card.querySelector('input[type="radio"]:checked')) isAnswered = true;
+            } else if (qType === 'SA' || qType === 'FITB') {
+                if (card.querySelector('input[type="text"]').value.trim() !== '') isAnswered = true;
+            } else if (qType === 'MATCH' || qType === 'MATI') {
+                const connections = card.querySelector('.matching-container').connections;
+                if (connections && Object.keys(connections).length > 0) isAnswered = true;
+            }
+            if (!isAnswered) return card;
+        }
+        return null;
+    }
+
+    function updateProgress() {
+        let answeredCount = 0;
+        document.querySelectorAll('.question-card').forEach(card => {
+            if (card.querySelector('input[type="radio"]:checked') || (card.querySelector('input[type="text"]') && card.querySelector('input[type="text"]').value.trim() !== '') || (card.querySelector('.matching-container') && card.querySelector('.matching-container').connections && Object.keys(card.querySelector('.matching-container').connections).length > 0)) {
+                answeredCount++;
+            }
+        });
+        progressText.textContent = `${answeredCount} / ${totalQuestions}`;
+        progressBar.style.width = `${(totalQuestions > 0 ? (answeredCount / totalQuestions) * 100 : 0)}%`;
+    }
+    quizForm.addEventListener('input', updateProgress);
+    quizForm.addEventListener('change', updateProgress);
+    
+    // --- UI Interaction Logic (unchanged from original) ---
+    document.querySelectorAll('.quiz-option').forEach(label => {
+        label.addEventListener('click', () => {
+            if (label.closest('.question-card').classList.contains('answered')) return;
+            label.parentElement.querySelectorAll('.quiz-option').forEach(option => option.classList.remove('selected'));
+            label.classList.add('selected');
+        });
+    });
+
+    function speakQuestion(questionCard) {
+        window.speechSynthesis.cancel();
+        let textToSpeak = questionCard.querySelector('p.font-semibold').textContent;
+        const utterance = new SpeechSynthesisUtterance(textToSpeak);
+        utterance.lang = 'en-US';
+        window.speechSynthesis.speak(utterance);
+    }
+    document.querySelectorAll('.speak-button').forEach(button => {
+        button.addEventListener('click', () => speakQuestion(button.closest('.question-card')));
+    });
+
+    document.querySelectorAll('.matching-container').forEach(container => {
+        const svg = container.querySelector('.matching-svg-overlay');
+        let startPoint = null;
+        container.connections = {};
+        
+        const getPointCenter = (point) => {
+            const rect = point.getBoundingClientRect();
+            const containerRect = container.getBoundingClientRect();
+            return { x: rect.left + rect.width / 2 - containerRect.left, y: rect.top + rect.height / 2 - containerRect.top };
+        };
+
+        const drawLine = (start, end) => {
+            const line = document.createElementNS('http://www.w3.org/2000/svg', 'line');
+            line.setAttribute('x1', start.x); line.setAttribute('y1', start.y);
+            line.setAttribute('x2', end.x); line.setAttribute('y2', end.y);
+            line.setAttribute('stroke', '#4fc3f7'); line.setAttribute('stroke-width', 4);
+            line.setAttribute('stroke-linecap', 'round');
+            return line;
+        };
+
+        const findPoint = (pointId, side) => container.querySelector(`.connect-point[data-point-id="${pointId}"][data-side="${side}"]`);
+
+        const connect = (promptPoint, matchPoint) => {
+            Object.values(container.connections).forEach((mId, index) => {
+                const pId = Object.keys(container.connections)[index];
+                if (mId === matchPoint.dataset.pointId || pId === promptPoint.dataset.pointId) {
+                    const oldLine = svg.querySelector(`line[data-prompt-id="${pId}"]`);
+                    if (oldLine) oldLine.remove();
+                    findPoint(pId, 'prompt').classList.remove('connected');
+                    findPoint(mId, 'match').classList.remove('connected');
+                    delete container.connections[pId];
+                }
+            });
+
+            const finalLine = drawLine(getPointCenter(promptPoint), getPointCenter(matchPoint));
+            finalLine.dataset.promptId = promptPoint.dataset.pointId;
+            svg.appendChild(finalLine);
+            container.connections[promptPoint.dataset.pointId] = matchPoint.dataset.pointId;
+            promptPoint.classList.add('connected');
+            matchPoint.classList.add('connected');
+        };
+
+        // Used to restore autosaved connections when the page is reloaded.
+        container.restoreConnection = (promptId, matchId) => {
+            const promptPoint = findPoint(promptId, 'prompt');
+            const matchPoint = findPoint(matchId, 'match');
+            if (promptPoint && matchPoint) connect(promptPoint, matchPoint);
+        };
+
+        container.addEventListener('click', function(e) {
+            if (!e.target.classList.contains('connect-point') || quizSubmitted) return;
+            const point = e.target;
+            if (!startPoint) {
+                startPoint = point;
+                point.classList.add('selected');
+            } else {
+                if (point.dataset.side !== startPoint.dataset.side) {
+                    const promptPoint = (startPoint.dataset.side === 'prompt') ? startPoint : point;
+                    const matchPoint = (startPoint.dataset.side === 'match') ? startPoint : point;
+                    connect(promptPoint, matchPoint);
+                    queueAutosave(container.closest('.question-card'));
+                }
+                startPoint.classList.remove('selected');
+                startPoint = null;
+                updateProgress();
+            }
+        });
+        container.addEventListener('click', () => setTimeout(updateProgress, 100));
+    });
+
+    // --- Autosave Logic ---
+    // Changed answers are batched and sent at most once every few seconds, so the
+    // server only sees one small draft update per interval.
+    const AUTOSAVE_DELAY_MS = 3000;
+    let pendingAnswers = {};
+    let autosaveTimer = null;
+
+    function readCardAnswer(card) {
+        const qType = card.dataset.questionType;
+        if (qType === 'MCQ' || qType === 'MCQI' || qType === 'TF') {
+            const selected = card.querySelector('input[type="radio"]:checked');
+            return selected ? selected.value : null;
+        } else if (qType === 'SA' || qType === 'FITB') {
+            return card.querySelector('input[type="text"]').value;
+        } else if (qType === 'MATCH' || qType === 'MATI') {
+            return Object.assign({}, card.querySelector('.matching-container').connections);
+        }
+        return null;
+    }
+
+    function queueAutosave(card) {
+        if (quizSubmitted || !card) return;
+        pendingAnswers[card.dataset.questionId] = readCardAnswer(card);
+        if (!autosaveTimer) autosaveTimer = setTimeout(flushAutosave, AUTOSAVE_DELAY_MS);
+    }
+
+    function flushAutosave(keepalive = false) {
+        clearTimeout(autosaveTimer);
+        autosaveTimer = null;
+        if (quizSubmitted || Object.keys(pendingAnswers).length === 0) return;
+        const batch = pendingAnswers;
+        pendingAnswers = {};
+        fetch(quizForm.dataset.autosaveUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken },
+            body: JSON.stringify({ answers: batch }),
+            keepalive: keepalive
+        })
+        .then(response => { if (!response.ok) throw new Error('Autosave failed'); })
+        .catch(() => {
+            // Keep the batch (newer answers win) and retry with the next change.
+            pendingAnswers = Object.assign(batch, pendingAnswers);
+        });
+    }
+
+    quizForm.addEventListener('change', (e) => queueAutosave(e.target.closest('.question-card')));
+    quizForm.addEventListener('input', (e) => queueAutosave(e.target.closest('.question-card')));
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flushAutosave(true);
+    });
+
+    // --- Restore Autosaved Answers ---
+    const draftAnswers = JSON.parse(document.getElementById('draft-answers').textContent);
+    document.querySelectorAll('.question-card').forEach(card => {
+        const saved = draftAnswers[card.dataset.questionId];
+        if (saved === undefined || saved === null) return;
+        const qType = card.dataset.questionType;
+        if (qType === 'MCQ' || qType === 'MCQI' || qType === 'TF') {
+            const input = card.querySelector(`input[type="radio"][value="${saved}"]`);
+            if (input) {
+                input.checked = true;
+                input.parentElement.classList.add('selected');
+            }
+        } else if (qType === 'SA' || qType === 'FITB') {
+            card.querySelector('input[type="text"]').value = saved;
+        } else if (qType === 'MATCH' || qType === 'MATI') {
+            const container = card.querySelector('.matching-container');
+            Object.entries(saved).forEach(([promptId, matchId]) => container.restoreConnection(promptId, matchId));
+        }
+    });
+    updateProgress();
+});